@@ -2,5 +2,12 @@
 
 # Ожидает запуска СУБД в течении 5 секунд
 # Применяет миграции базы данных (будет иметь эффект только при первом запуске)
-# Запускает сервер приложений gunicorn на порту 8000
-sleep 5 && python manage.py migrate && gunicorn menu_backend.wsgi:application --bind 0.0.0.0:8000
+# Выгружает изменившиеся общедоступные меню ресторанов в статические файлы
+# Запускает сервер приложений gunicorn на порту 8000, при ASGI=1 - с асинхронными
+# процессами uvicorn
+if [ "$ASGI" = "1" ]; then
+    SERVER="gunicorn menu_backend.asgi:application -k uvicorn.workers.UvicornWorker"
+else
+    SERVER="gunicorn menu_backend.wsgi:application"
+fi
+sleep 5 && python manage.py migrate && python manage.py export_public_menus && $SERVER --bind 0.0.0.0:8000
@@ -0,0 +1,247 @@
+"""
+Постраничная выдача данных
+--------------------------
+
+По умолчанию списки объектов выдаются по страницам с номерами (параметр
+`page`) вместе с общим числом объектов. Для больших списков это дорого: чтобы
+получить страницу с номером N, база данных пропускает все объекты предыдущих
+страниц, а общее число объектов подсчитывается отдельным запросом.
+
+Параметр запроса `pagination` выбирает другой режим выдачи:
+
+*   `cursor` - выдача по курсору: объекты упорядочиваются по первичному ключу,
+    как и в моделях проекта, а ссылка `next` содержит курсор - первичный ключ
+    последнего выданного объекта. Следующая страница выбирается условием на
+    первичный ключ, поэтому любая страница загружается так же быстро, как первая.
+
+*   `nocount` - выдача по номерам страниц без общего числа объектов. Вместо
+    подсчета объектов загружается на один объект больше размера страницы, чтобы
+    узнать, есть ли следующая страница.
+
+*   `estimate` - выдача по номерам страниц с примерным общим числом объектов.
+    На PostgreSQL оно берется из оценки планировщика запросов, а если оценка
+    мала или используется другая СУБД - подсчитывается, но не больше чем до
+    `EstimatedCountPagination.count_limit`. Признак `count_estimated` в ответе
+    показывает, что число объектов может быть неточным.
+
+Фильтры наборов API-обработчиков применяются до разбиения на страницы и
+работают в любом режиме.
+
+Режим выдачи по умолчанию можно изменить для набора API-обработчиков атрибутом
+`pagination_mode`.
+"""
+
+import json
+
+from collections import OrderedDict
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+PAGES = 'pages'
+CURSOR = 'cursor'
+NO_COUNT = 'nocount'
+ESTIMATE = 'estimate'
+
+
+def get_planner_estimate(queryset):
+    """
+    Оценка числа строк результата запроса queryset, которую дает планировщик
+    запросов PostgreSQL, или None для других СУБД
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset, limit):
+    """
+    Примерное число объектов в запросе queryset. Возвращает кортеж из числа
+    объектов и признака того, что оно может быть неточным. Объекты
+    подсчитываются, только если их меньше limit либо оценка планировщика
+    запросов недоступна, и тогда подсчет останавливается на limit объектах.
+    """
+    queryset = queryset.order_by()
+    estimate = get_planner_estimate(queryset)
+    if estimate is not None and estimate >= limit:
+        return estimate, True
+    count = queryset[:limit].count()
+    return count, count >= limit
+
+
+class UncountedPaginator(Paginator):
+    """
+    Разбиение на страницы без подсчета объектов. Для каждой страницы загружается
+    на один объект больше ее размера, и известное число страниц - номер
+    загруженной страницы и еще одна, если за ней есть объекты.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self.__num_pages
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        self.__num_pages = number + 1 if len(items) > self.per_page else number
+        return self._get_page(items[:self.per_page], number, self)
+
+
+class PkCursorPagination(CursorPagination):
+    """
+    Выдача по курсору в порядке первичных ключей. Пустой курсор (`?cursor=`)
+    соответствует первой странице.
+    """
+    ordering = 'pk'
+
+
+class NoCountPagination(PageNumberPagination):
+    """
+    Выдача по номерам страниц без общего числа объектов: ответ содержит только
+    ссылки на следующую и предыдущую страницы
+    """
+    django_paginator_class = UncountedPaginator
+    # Номер последней страницы неизвестен
+    last_page_strings = ()
+    template = 'rest_framework/pagination/previous_and_next.html'
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        del response_schema['properties']['count']
+        return response_schema
+
+
+class EstimatedCountPagination(NoCountPagination):
+    """
+    Выдача по номерам страниц с примерным общим числом объектов
+    """
+    # Число объектов, до которого объекты подсчитываются точно
+    count_limit = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_estimated = estimate_count(queryset, self.count_limit)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_estimated', self.count_estimated),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = PageNumberPagination.get_paginated_response_schema(self, schema)
+        response_schema['properties']['count_estimated'] = {'type': 'boolean', 'example': False}
+        return response_schema
+
+
+class SelectablePagination(PageNumberPagination):
+    """
+    Постраничная выдача с выбором режима параметром запроса `pagination`. Без
+    параметра используется режим из атрибута `pagination_mode` набора
+    API-обработчиков или выдача по номерам страниц.
+    """
+    mode_query_param = 'pagination'
+    mode_query_description = _('Pagination mode: pages, cursor, nocount or estimate.')
+    mode_classes = {
+        CURSOR: PkCursorPagination,
+        NO_COUNT: NoCountPagination,
+        ESTIMATE: EstimatedCountPagination,
+    }
+
+    delegate = None
+
+    def get_mode(self, request, view=None):
+        """Режим выдачи, запрошенный клиентом"""
+        default = getattr(view, 'pagination_mode', PAGES)
+        mode = request.query_params.get(self.mode_query_param) or default
+        if mode != PAGES and mode not in self.mode_classes:
+            raise ParseError(_("Unknown pagination mode: %(mode)s") % {'mode': mode})
+        return mode
+
+    def paginate_queryset(self, queryset, request, view=None):
+        mode = self.get_mode(request, view)
+        if mode == PAGES:
+            self.delegate = None
+            return super().paginate_queryset(queryset, request, view)
+        self.delegate = self.mode_classes[mode]()
+        page = self.delegate.paginate_queryset(queryset, request, view)
+        # Признак используется при выводе ссылок на страницы в браузерном API
+        self.display_page_controls = getattr(self.delegate, 'display_page_controls', False)
+        return page
+
+    def get_paginated_response(self, data):
+        if self.delegate is not None:
+            return self.delegate.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.delegate is not None:
+            return self.delegate.to_html()
+        return super().to_html()
+
+    def get_schema_fields(self, view):
+        assert coreapi is not None, 'coreapi must be installed to use `get_schema_fields()`'
+        assert coreschema is not None, 'coreschema must be installed to use `get_schema_fields()`'
+        cursor = PkCursorPagination()
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=self.mode_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Pagination mode',
+                    description=str(self.mode_query_description)
+                )
+            ),
+            coreapi.Field(
+                name=cursor.cursor_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Cursor',
+                    description=str(cursor.cursor_query_description)
+                )
+            ),
+        ]
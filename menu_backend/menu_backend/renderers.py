@@ -0,0 +1,93 @@
+"""
+Быстрый JSON-рендерер для Django REST Framework
+-----------------------------------------------
+
+FastJSONRenderer выводит тот же JSON, что и стандартный JSONRenderer, но
+использует библиотеку orjson, которая кодирует документы в несколько раз
+быстрее модуля json. Типы, которые orjson не кодирует сам (Decimal, timedelta,
+даты и время, ленивые строки переводов и т.д.), кодируются тем же методом
+`default`, что и в JSONRenderer, поэтому их представление не меняется.
+
+Если orjson не установлен, либо запрошен JSON с отступами, либо в документе
+встречается значение, которое orjson закодировать не может (например, целое
+число больше 64 бит), то документ кодируется стандартным JSONRenderer.
+
+Отличия от JSONRenderer касаются только чисел с плавающей точкой: очень большие
+и очень маленькие числа orjson записывает как 1e16 вместо 1e+16 (значения при
+этом совпадают), а NaN и бесконечность - как null вместо ошибки кодирования.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Символы, которые JSONRenderer всегда экранирует, чтобы результат был
+# допустимым кодом на JavaScript
+LINE_SEPARATOR = ('\u2028'.encode(), b'\\u2028')
+PARAGRAPH_SEPARATOR = ('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на основе orjson, совместимый по формату с JSONRenderer.
+    Подключается в настройке REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] или
+    в атрибуте renderer_classes представления.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__encoder_default = self.encoder_class().default
+        # Без собственного класса encoder_class самые частые типы кодируются
+        # без цепочки проверок метода JSONEncoder.default
+        if self.encoder_class is JSONEncoder:
+            self.__default = self.__fast_default
+        else:
+            self.__default = self.__encoder_default
+        if orjson is not None:
+            # Дата и время передаются методу default, чтобы UTC записывалось
+            # как 'Z', а dataclass-объекты - чтобы они кодировались как в json
+            self.__options = (
+                orjson.OPT_NON_STR_KEYS |
+                orjson.OPT_PASSTHROUGH_DATETIME |
+                orjson.OPT_PASSTHROUGH_DATACLASS
+            )
+
+    def __fast_default(self, obj):
+        """
+        Кодирует значение, которое orjson не кодирует сам. Самые частые в меню
+        типы кодируются так же, как в JSONEncoder, остальные передаются методу
+        JSONEncoder.default.
+        """
+        if type(obj) is Decimal:
+            return float(obj)
+        if type(obj) is timedelta:
+            return str(obj.total_seconds())
+        return self.__encoder_default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Кодирует data в JSON и возвращает байтовую строку
+        """
+        if data is None:
+            return b''
+        if (
+            orjson is None or self.ensure_ascii or not self.compact or
+            self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.__default, option=self.__options)
+        except TypeError:
+            # orjson.JSONEncodeError - подкласс TypeError
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(*LINE_SEPARATOR).replace(*PARAGRAPH_SEPARATOR)
+        return ret
@@ -28,6 +28,10 @@ DEBUG = bool(int(os.getenv('DEBUG', '1')))
 # URL сайта для генерации QR-кодов
 SITE_URL = os.getenv("SITE_URL", "http://127.0.0.1:8000")
 
+# Сервер запускается под ASGI, и общедоступные меню ресторанов отдаются
+# асинхронными представлениями
+ASGI = bool(int(os.getenv('ASGI', '0')))
+
 # Допустимые значения адреса продакшн-сервера
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
 
@@ -117,6 +121,32 @@ DATABASES = {
 DATABASES['default'] = DATABASES['testing']
 
 
+# Настройки кэша. По умолчанию используется кэш в памяти процесса, для
+# нескольких процессов сервера лучше использовать общий кэш: файловый,
+# redis или memcached. Значение CACHE_LOCATION зависит от вида кэша - это
+# каталог для файлового кэша или адрес сервера для redis и memcached.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Время хранения общедоступных меню ресторанов в кэше в секундах. Меню
+# удаляются из кэша при изменении и раньше этого времени.
+PUBLIC_MENU_CACHE_TIMEOUT = int(os.getenv('PUBLIC_MENU_CACHE_TIMEOUT', '86400'))
+
+# Подсчет попаданий и промахов кэша общедоступных меню (команда
+# public_menu_cache_stats). Каждый подсчет - еще одно обращение к кэшу.
+PUBLIC_MENU_CACHE_STATS = bool(int(os.getenv('PUBLIC_MENU_CACHE_STATS', '0')))
+
+
 # Проверки надежности паролей пользователей
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -164,6 +194,11 @@ MEDIA_URL = 'media/'
 # Каталог для загруженных файлов
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Каталог, в который выгружаются общедоступные меню ресторанов для отдачи
+# через nginx, и признак выгрузки меню при каждом его изменении
+PUBLIC_MENU_EXPORT_ROOT = os.getenv('PUBLIC_MENU_EXPORT_ROOT', str(STATIC_ROOT / 'menus'))
+PUBLIC_MENU_EXPORT_ON_CHANGE = bool(int(os.getenv('PUBLIC_MENU_EXPORT_ON_CHANGE', '0')))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -171,7 +206,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Настройки REST API
 REST_FRAMEWORK = {
     # Для постраничной выдачи данных
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'menu_backend.pagination.SelectablePagination',
     'PAGE_SIZE': 20,
     # Права доступа по умолчанию - доступ только администратора.
     # Фактически для большинства классов будут определены более мягкие
@@ -182,7 +217,13 @@ REST_FRAMEWORK = {
     # Используем авторизацию пользователей по токенам
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
-    ]
+    ],
+    # JSON выводится быстрым рендерером на основе orjson. Его можно заменить
+    # стандартным 'rest_framework.renderers.JSONRenderer', формат не изменится.
+    'DEFAULT_RENDERER_CLASSES': [
+        'menu_backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # Поддерживаемые языки
@@ -0,0 +1,108 @@
+"""
+Выбор выводимых полей в ответах API
+-----------------------------------
+
+Параметр запроса `fields` задает через запятую поля объекта, которые нужно
+вывести, а параметр `expand` - вложенные объекты (например, текущее меню
+ресторана), которые нужно вывести в дополнение к ним. Если указан хотя бы один
+из этих параметров, то вложенные объекты выводятся только тогда, когда они
+перечислены в `fields` или `expand`; так, `?expand=` возвращает ресторан без
+категории и текущего меню. Если не указан ни один из параметров, то выводятся
+все поля.
+
+Невыводимые вложенные сериализаторы не вызываются, а представления не
+загружают для них данные из базы данных (см. `SparseFieldsViewSetMixin.is_field_requested`).
+Параметры учитываются только при чтении: при создании и изменении объектов
+сериализатор всегда работает со всеми полями.
+"""
+
+from rest_framework.permissions import SAFE_METHODS
+
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_names(value):
+    """
+    Множество имен полей из значения параметра запроса value, в котором они
+    перечислены через запятую, или None, если параметр не указан
+    """
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def is_field_requested(name, expandable, fields, expand):
+    """
+    Возвращает True, если поле name нужно вывести при запрошенных полях fields
+    и вложенных объектах expand. Параметр expandable - признак того, что поле
+    является вложенным объектом.
+    """
+    if fields is None and expand is None:
+        return True
+    if fields is not None and name in fields:
+        return True
+    if expandable:
+        return expand is not None and name in expand
+    return fields is None
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Примесь для сериализаторов, которая оставляет в сериализаторе только
+    запрошенные поля. Вложенные объекты, которые выводятся только по запросу,
+    перечисляются в атрибуте Meta.expandable_fields.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.requested_fields = fields
+        self.requested_expand = expand
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        """Поля сериализатора, которые нужно вывести"""
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+        return {
+            name: field for name, field in fields.items()
+            if is_field_requested(
+                name, name in expandable, self.requested_fields, self.requested_expand
+            )
+        }
+
+
+class SparseFieldsViewSetMixin:
+    """
+    Примесь для наборов API-обработчиков, которая передает сериализатору поля,
+    запрошенные параметрами `fields` и `expand`
+    """
+
+    def get_requested_fields(self):
+        """
+        Запрошенные поля и вложенные объекты. При создании и изменении объектов
+        параметры не учитываются.
+        """
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+        return (
+            parse_field_names(request.query_params.get(FIELDS_PARAM)),
+            parse_field_names(request.query_params.get(EXPAND_PARAM)),
+        )
+
+    def is_field_requested(self, name):
+        """
+        Возвращает True, если поле name будет выведено, то есть для него нужно
+        загружать данные
+        """
+        fields, expand = self.get_requested_fields()
+        meta = getattr(self.get_serializer_class(), 'Meta', None)
+        expandable = getattr(meta, 'expandable_fields', ())
+        return is_field_requested(name, name in expandable, fields, expand)
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_requested_fields()
+        kwargs.setdefault('fields', fields)
+        kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,33 @@
+"""
+Транзакции при изменении данных через API
+-----------------------------------------
+
+Изменение объекта через API сохраняет сам объект и его переводы несколькими
+запросами, и каждый из них вызывает сигнал сохранения. Общедоступные меню
+ресторанов пересобираются после завершения транзакции (см.
+`restaurants.signals`), а вне транзакции - при каждом сигнале. Поэтому
+создание, изменение и удаление объектов выполняется в одной транзакции, и меню
+каждого измененного ресторана пересобирается один раз на запрос. Запросы на
+чтение выполняются вне транзакции.
+"""
+
+from django.db import transaction
+
+
+class AtomicWriteViewSetMixin:
+    """
+    Примесь для наборов API-обработчиков, которая выполняет создание, изменение
+    и удаление объекта в одной транзакции
+    """
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
@@ -31,7 +31,12 @@ from restaurants.viewsets import (
     RestaurantViewSet,
     RestaurantStaffViewSet
 )
-from restaurants.views import UnauthorizedRestaturantView
+from restaurants.views import (
+    AsyncUnauthorizedRestaurantBySlugView,
+    AsyncUnauthorizedRestaurantView,
+    UnauthorizedRestaturantView,
+    UnauthorizedRestaurantBySlugView
+)
 from tariffs.viewsets import TariffViewSet
 from users.views import (
     UserCreationView,
@@ -64,6 +69,15 @@ schema_view = get_schema_view(
 )
 
 
+# Под ASGI общедоступные меню отдаются асинхронными представлениями
+if settings.ASGI:
+    public_restaurant_view = AsyncUnauthorizedRestaurantView
+    public_restaurant_by_slug_view = AsyncUnauthorizedRestaurantBySlugView
+else:
+    public_restaurant_view = UnauthorizedRestaturantView
+    public_restaurant_by_slug_view = UnauthorizedRestaurantBySlugView
+
+
 urlpatterns = [
     # Встроенная админка
     path('admin/', admin.site.urls),
@@ -85,10 +99,16 @@ urlpatterns = [
         schema_view.with_ui('swagger', cache_timeout=0),
         name='schema-swagger'
     ),
+    # Получение меню ресторана неавторизованным пользователем по никнейму ресторана
+    path(
+        'api/v1/public/restaurants/by_slug/<slug:slug>/',
+        public_restaurant_by_slug_view.as_view(),
+        name='public_restaurant_by_slug'
+    ),
     # Получение меню ресторана неавторизованным пользователем
     path(
         'api/v1/public/restaurants/<pk>/',
-        UnauthorizedRestaturantView.as_view(),
+        public_restaurant_view.as_view(),
         name='public_restaurant'
     ),
     # API-обработчики для работы с данными по протоколу REST
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class MenusConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menus'
+
+    def ready(self):
+        """
+        Подключение обработчиков сигналов, поддерживающих видимость разделов
+        меню и блюд
+        """
+        super().ready()
+        import menus.signals  # noqa: F401
@@ -0,0 +1,242 @@
+"""
+Массовое создание, изменение и удаление объектов меню
+-----------------------------------------------------
+
+При заполнении меню ресторана добавляются сотни блюд, и отдельный запрос к API
+на каждое блюдо означает сотни проверок прав доступа и сотни транзакций. Здесь
+собраны функции, которые записывают список объектов целиком: данные
+проверяются сериализатором для всех объектов сразу, права доступа проверяются
+один раз для каждого ресторана, а объекты и их переводы записываются запросами
+`bulk_create` и `bulk_update` в одной транзакции.
+
+Запись в обход сигналов сохранения моделей требует явно пересчитать поле
+effective_published (см. `menus.signals`) и сообщить об изменении
+общедоступных меню (см. `restaurants.signals.public_menu_changed`).
+"""
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Value
+from django.utils.translation import gettext_lazy as _
+
+from parler import appsettings as parler_settings
+from parler.cache import get_translation_cache_key
+
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from menus.models import Menu, MenuCourse, MenuSection
+from restaurants.roles import to_pk, get_restaurant_roles
+from restaurants.signals import public_menu_changed
+
+
+# Наибольшее число объектов в одном запросе
+BULK_LIMIT = 1000
+
+
+def get_bulk_items(request, limit=BULK_LIMIT):
+    """
+    Список объектов из данных запроса request. Данные должны быть непустым
+    списком не длиннее limit элементов.
+    """
+    items = request.data
+    if not isinstance(items, list):
+        raise ValidationError({'non_field_errors': [_("Expected a list of items")]})
+    if not items:
+        raise ValidationError({'non_field_errors': [_("The list of items is empty")]})
+    if len(items) > limit:
+        raise ValidationError({
+            'non_field_errors': [_("No more than %(limit)d items are allowed") % {'limit': limit}]
+        })
+    return items
+
+
+def get_bulk_ids(items):
+    """
+    Первичные ключи объектов из списка items, каждый элемент которого - ключ
+    или словарь с ключом в поле id
+    """
+    ids = []
+    errors = []
+    for item in items:
+        pk = to_pk(item.get('id') if isinstance(item, dict) else item)
+        ids.append(pk)
+        errors.append({'id': [_("A valid integer is required")]} if pk is None else {})
+    if any(errors):
+        raise ValidationError(errors)
+    if len(set(ids)) != len(ids):
+        raise ValidationError({'non_field_errors': [_("Each object may be listed only once")]})
+    return ids
+
+
+def preload_menu_objects(items):
+    """
+    Контекст сериализатора с меню и разделами меню, на которые ссылаются поля
+    menu и section объектов items. Каждая модель загружается одним запросом,
+    чтобы проверка данных не выполняла запрос для каждого объекта.
+    """
+    menu_ids, section_ids = set(), set()
+    for item in items:
+        if isinstance(item, dict):
+            menu_ids.add(to_pk(item.get('menu')))
+            section_ids.add(to_pk(item.get('section')))
+    menu_ids.discard(None)
+    section_ids.discard(None)
+    return {
+        'menus': Menu.objects.in_bulk(menu_ids) if menu_ids else {},
+        'sections': MenuSection.objects.in_bulk(section_ids) if section_ids else {},
+    }
+
+
+def check_restaurants_permission(request, restaurant_ids):
+    """
+    Проверяет, что текущий пользователь может редактировать меню всех
+    ресторанов с первичными ключами restaurant_ids. Должности пользователя
+    загружаются один раз на весь запрос.
+    """
+    if request.user.is_staff:
+        return
+    roles = get_restaurant_roles(request)
+    if not all(roles.is_owner_or_worker(restaurant_id) for restaurant_id in restaurant_ids):
+        raise PermissionDenied()
+
+
+def save_translations(model, translations, created=False):
+    """
+    Записывает переводы объектов модели model. Параметр translations - список
+    пар из объекта и словаря, сопоставляющего коду языка значения переводимых
+    полей. Существующие переводы изменяются одним запросом `bulk_update`,
+    новые добавляются одним запросом `bulk_create`. Если все объекты только что
+    созданы (created), то существующие переводы не загружаются.
+    """
+    Translation = model._parler_meta.root_model
+    translations = [(obj, data) for obj, data in translations if data]
+    if not translations:
+        return
+    existing = {}
+    if not created:
+        existing = {
+            (item.master_id, item.language_code): item
+            for item in Translation.objects.filter(
+                master_id__in={obj.pk for obj, _data in translations}
+            )
+        }
+    to_create, to_update, fields = [], [], set()
+    for obj, data in translations:
+        for language_code, values in data.items():
+            translation = existing.get((obj.pk, language_code))
+            if translation is None:
+                to_create.append(Translation(master=obj, language_code=language_code, **values))
+                continue
+            for name, value in values.items():
+                setattr(translation, name, value)
+            fields.update(values)
+            to_update.append(translation)
+    if to_create:
+        Translation.objects.bulk_create(to_create)
+    if to_update and fields:
+        Translation.objects.bulk_update(to_update, fields)
+    if parler_settings.PARLER_ENABLE_CACHING:
+        # Кеш переводов parler сбрасывается при сохранении перевода, а
+        # массовая запись сигналов сохранения не вызывает
+        cache.delete_many([
+            get_translation_cache_key(Translation, item.master_id, item.language_code)
+            for item in to_create + to_update
+        ])
+
+
+def create_courses(validated_data):
+    """
+    Создает блюда по списку проверенных сериализатором данных validated_data
+    и возвращает список созданных блюд
+    """
+    translations = []
+    courses = []
+    for data in validated_data:
+        data = dict(data)
+        translations.append(data.pop('translations', None))
+        courses.append(MenuCourse(**data))
+    courses = MenuCourse.objects.bulk_create(courses)
+    save_translations(MenuCourse, zip(courses, translations), created=True)
+    MenuCourse.update_effective_published(
+        MenuCourse.objects.filter(pk__in=[course.pk for course in courses])
+    )
+    public_menu_changed(*{course.menu.restaurant_id for course in courses})
+    return courses
+
+
+def update_courses(changes):
+    """
+    Изменяет блюда. Параметр changes - список пар из блюда и проверенных
+    сериализатором данных, которые нужно в него записать. Блюда должны быть
+    загружены вместе с меню.
+    """
+    restaurant_ids = {course.menu.restaurant_id for course, _data in changes}
+    translations = []
+    fields = set()
+    for course, data in changes:
+        data = dict(data)
+        translations.append((course, data.pop('translations', None)))
+        for name, value in data.items():
+            setattr(course, name, value)
+        fields.update(data)
+    courses = [course for course, _data in changes]
+    if fields:
+        MenuCourse.objects.bulk_update(courses, fields)
+    save_translations(MenuCourse, translations)
+    MenuCourse.update_effective_published(
+        MenuCourse.objects.filter(pk__in=[course.pk for course in courses])
+    )
+    restaurant_ids.update(course.menu.restaurant_id for course in courses)
+    public_menu_changed(*restaurant_ids)
+    return courses
+
+
+def create_sections(validated_data):
+    """
+    Создает разделы меню вместе с их блюдами по списку проверенных
+    сериализатором данных validated_data и возвращает список созданных
+    разделов. Разделы, блюда и переводы каждой модели добавляются запросами
+    `bulk_create`, поэтому число запросов не зависит от числа разделов и блюд.
+    """
+    translations = []
+    courses = []
+    sections = []
+    for data in validated_data:
+        data = dict(data)
+        translations.append(data.pop('translations', None))
+        courses.append(data.pop('courses', []))
+        sections.append(MenuSection(**data))
+    sections = MenuSection.objects.bulk_create(sections)
+    save_translations(MenuSection, zip(sections, translations), created=True)
+    MenuSection.update_effective_published(
+        MenuSection.objects.filter(pk__in=[section.pk for section in sections])
+    )
+    courses = [
+        {**course, 'menu': section.menu, 'section': section}
+        for section, section_courses in zip(sections, courses)
+        for course in section_courses
+    ]
+    if courses:
+        create_courses(courses)
+    public_menu_changed(*{section.menu.restaurant_id for section in sections})
+    return sections
+
+
+def set_sections_published(sections, published):
+    """
+    Публикует или скрывает разделы меню. Параметр sections - словарь,
+    сопоставляющий первичному ключу раздела первичный ключ ресторана.
+    Выполняет один запрос UPDATE к таблице разделов и один - к таблице блюд.
+    """
+    section_ids = list(sections)
+    if published:
+        effective_published = Exists(Menu.objects.filter(pk=OuterRef('menu_id'), published=True))
+    else:
+        effective_published = Value(False)
+    # Выражения в SET вычисляются по старым значениям строки, поэтому
+    # effective_published считается по новому значению published явно
+    MenuSection.objects.filter(pk__in=section_ids).update(
+        published=published,
+        effective_published=ExpressionWrapper(effective_published, output_field=BooleanField())
+    )
+    MenuCourse.update_effective_published(MenuCourse.objects.filter(section_id__in=section_ids))
+    public_menu_changed(*set(sections.values()))
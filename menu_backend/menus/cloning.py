@@ -0,0 +1,179 @@
+"""
+Копирование меню
+----------------
+
+Сезонное меню обычно начинается с копии текущего. Копия меню со всеми
+разделами, блюдами и их переводами создается фиксированным числом запросов
+INSERT ... SELECT, которые копируют строки внутри базы данных, не загружая их
+в Python, поэтому время копирования почти не зависит от размера меню.
+
+Первичные ключи разделов и блюд копии выделяются заранее одним запросом,
+который читает первичные ключи исходных строк и записывает пары "исходный
+ключ - ключ копии" во временную таблицу. Последующие запросы копируют строки
+с ключами из этой таблицы и по ней же переназначают ссылки блюд на разделы и
+переводов на объекты, поэтому соответствие не зависит ни от порядка выдачи
+первичных ключей при вставке, ни от изменений исходного меню между запросами.
+
+Ключи выделяются по-разному в зависимости от базы данных
+
+*   В PostgreSQL ключи берутся из последовательности первичного ключа
+    таблицы, а исходные строки блокируются (FOR UPDATE) до конца транзакции,
+    чтобы их нельзя было удалить или перенести в другой раздел во время
+    копирования.
+
+*   В SQLite ключи следуют за наибольшим первичным ключом таблицы. Это
+    безопасно, потому что транзакция копирования уже записала меню и до
+    своего завершения единолично владеет блокировкой записи базы данных.
+
+Для других баз данных копирование не поддерживается.
+"""
+
+from django.db import NotSupportedError, connections, router, transaction
+
+from menus.models import Menu, MenuCourse, MenuSection
+
+
+def _map_table(model, qn):
+    """Название временной таблицы соответствия первичных ключей модели model"""
+    return qn(f"clone_map_{model._meta.db_table}")
+
+
+def _create_pk_map(cursor, connection, model, qn, menu_id):
+    """
+    Создает временную таблицу, сопоставляющую первичному ключу src_id каждого
+    объекта модели model из меню menu_id выделенный для его копии первичный
+    ключ dst_id
+    """
+    table = qn(model._meta.db_table)
+    pk = qn(model._meta.pk.column)
+    menu = qn(model._meta.get_field('menu').column)
+    map_table = _map_table(model, qn)
+    if connection.vendor == 'postgresql':
+        dst_id = "nextval(pg_get_serial_sequence(%s, %s))"
+        dst_params = [model._meta.db_table, model._meta.pk.column]
+        lock = " FOR UPDATE"
+    elif connection.vendor == 'sqlite':
+        # Первичные ключи таблиц с AUTOINCREMENT не должны повторять ключи
+        # удаленных строк, поэтому учитывается и счетчик sqlite_sequence
+        dst_id = (
+            f"MAX((SELECT COALESCE(MAX({pk}), 0) FROM {table}), "
+            f"(SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = %s)) "
+            f"+ ROW_NUMBER() OVER (ORDER BY t.{pk})"
+        )
+        dst_params = [model._meta.db_table]
+        lock = ""
+    else:
+        raise NotSupportedError(f"Menu cloning is not supported on {connection.vendor}")
+    cursor.execute(
+        f"CREATE TEMPORARY TABLE {map_table} (src_id bigint NOT NULL PRIMARY KEY, dst_id bigint NOT NULL)"
+    )
+    cursor.execute(
+        f"INSERT INTO {map_table} (src_id, dst_id) "
+        f"SELECT t.{pk}, {dst_id} FROM {table} t WHERE t.{menu} = %s ORDER BY t.{pk}{lock}",
+        dst_params + [menu_id]
+    )
+
+
+def _drop_pk_map(cursor, model, qn):
+    """Удаляет временную таблицу соответствия первичных ключей модели model"""
+    cursor.execute(f"DROP TABLE {_map_table(model, qn)}")
+
+
+def _copy_rows(cursor, model, qn, values, join='', where='', where_params=()):
+    """
+    Копирует строки таблицы модели model запросом INSERT ... SELECT. Параметр
+    values сопоставляет названию поля пару из выражения SQL для его значения в
+    копии и параметров выражения; остальные поля копируются как есть, кроме
+    первичного ключа, который без значения в values выдает база данных.
+    """
+    table = qn(model._meta.db_table)
+    columns, expressions, params = [], [], []
+    for field in model._meta.concrete_fields:
+        if field.primary_key and field.name not in values:
+            continue
+        columns.append(qn(field.column))
+        if field.name in values:
+            expression, expression_params = values[field.name]
+            expressions.append(expression)
+            params.extend(expression_params)
+        else:
+            expressions.append(f"t.{qn(field.column)}")
+    sql = [
+        f"INSERT INTO {table} ({', '.join(columns)})",
+        f"SELECT {', '.join(expressions)} FROM {table} t",
+    ]
+    if join:
+        sql.append(join)
+    if where:
+        sql.append(f"WHERE {where}")
+    cursor.execute(' '.join(sql), params + list(where_params))
+
+
+def _copy_translations(cursor, model, qn):
+    """
+    Копирует переводы всех объектов модели model, перечисленных во временной
+    таблице соответствия первичных ключей, в переводы их копий
+    """
+    Translation = model._parler_meta.root_model
+    _copy_rows(
+        cursor, Translation, qn,
+        {'master': ("m.dst_id", ())},
+        join=f"JOIN {_map_table(model, qn)} m ON m.src_id = t.{qn('master_id')}"
+    )
+
+
+def clone_menu(menu):
+    """
+    Копирует меню menu вместе со всеми разделами, блюдами и переводами и
+    возвращает копию. Копия относится к тому же ресторану и не опубликована,
+    поэтому общедоступное меню ресторана не меняется.
+
+    Выполняет один запрос INSERT для самого меню, один запрос INSERT ... SELECT
+    для переводов меню и по пять запросов для разделов и для блюд: создание,
+    заполнение и удаление временной таблицы соответствия первичных ключей и
+    INSERT ... SELECT для самих объектов и для их переводов.
+    """
+    using = router.db_for_write(Menu, instance=menu)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    with transaction.atomic(using=using):
+        clone = Menu(restaurant_id=menu.restaurant_id, published=False)
+        clone.save(using=using)
+        with connection.cursor() as cursor:
+            _copy_rows(
+                cursor, Menu._parler_meta.root_model, qn,
+                {'master': ("%s", (clone.pk,))},
+                where=f"t.{qn('master_id')} = %s", where_params=(menu.pk,)
+            )
+            _create_pk_map(cursor, connection, MenuSection, qn, menu.pk)
+            _create_pk_map(cursor, connection, MenuCourse, qn, menu.pk)
+            # Разделы и блюда неопубликованного меню не видны посетителям
+            _copy_rows(
+                cursor, MenuSection, qn,
+                {
+                    'id': ("m.dst_id", ()),
+                    'menu': ("%s", (clone.pk,)),
+                    'effective_published': ("%s", (False,)),
+                },
+                join=f"JOIN {_map_table(MenuSection, qn)} m ON m.src_id = t.{qn('id')}"
+            )
+            _copy_translations(cursor, MenuSection, qn)
+            # Блюдо без раздела или с разделом, которого нет в таблице
+            # соответствия, остается в копии без раздела
+            _copy_rows(
+                cursor, MenuCourse, qn,
+                {
+                    'id': ("m.dst_id", ()),
+                    'menu': ("%s", (clone.pk,)),
+                    'section': ("s.dst_id", ()),
+                    'effective_published': ("%s", (False,)),
+                },
+                join=(
+                    f"JOIN {_map_table(MenuCourse, qn)} m ON m.src_id = t.{qn('id')} "
+                    f"LEFT JOIN {_map_table(MenuSection, qn)} s ON s.src_id = t.{qn('section_id')}"
+                )
+            )
+            _copy_translations(cursor, MenuCourse, qn)
+            _drop_pk_map(cursor, MenuCourse, qn)
+            _drop_pk_map(cursor, MenuSection, qn)
+    return clone
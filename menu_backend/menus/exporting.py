@@ -0,0 +1,208 @@
+"""
+Выгрузка меню в файлы JSON Lines и CSV
+--------------------------------------
+
+Меню или все меню ресторана выгружаются полностью, по одной записи в строке.
+Тип записи задается полем `type`:
+
+*   `menu` - меню: `id`, переводы заголовка `translations` и `published`;
+*   `section` - раздел меню: `id`, `menu`, названия раздела на всех языках
+    `section` и `published`, в том числе разделы без блюд;
+*   `course` - блюдо в том же формате, в котором его принимает импорт (см.
+    `menus.importing`), с дополнительными полями `id` и `menu`.
+
+Сначала выгружаются все меню, затем их разделы и блюда. Поэтому выгруженный
+файл можно импортировать в другое меню: записи меню при импорте пропускаются,
+а разделы создаются вместе с признаками публикации.
+
+В CSV тип записи указывается в первом столбце `type`. Заголовки меню
+записываются в столбцы `title_<язык>`, названия разделов - в столбцы
+`section_<язык>`, а признак публикации меню и разделов - в столбец `published`.
+
+Меню и разделы загружаются сразу, их намного меньше, чем блюд. Блюда
+читаются из базы данных итератором пачками по `chunk_size` (на PostgreSQL -
+через курсор на стороне сервера) вместе с переводами, а строки файла выдаются
+генератором для `StreamingHttpResponse`. Поэтому потребление памяти не
+зависит от числа блюд и языков.
+"""
+
+import csv
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.duration import duration_string
+
+from menus.importing import (
+    COURSE,
+    CSV,
+    JSON_LINES,
+    MENU,
+    PLAIN_COLUMNS,
+    SECTION,
+    SECTION_COLUMN,
+    TRANSLATED_COLUMNS
+)
+from menus.models import Menu, MenuCourse, MenuSection
+
+
+CHUNK_SIZE = 1000
+
+CONTENT_TYPES = {
+    CSV: 'text/csv; charset=utf-8',
+    JSON_LINES: 'application/jsonl; charset=utf-8',
+}
+
+
+def _get_titles(model, masters):
+    """
+    Заголовки объектов model (меню или разделов), выбранных набором запросов
+    masters, на всех языках в виде словаря по первичному ключу объекта
+    """
+    Translation = model._parler_meta.root_model
+    titles = {}
+    for master_id, language_code, title in Translation.objects.filter(
+        master__in=masters
+    ).values_list('master_id', 'language_code', 'title').iterator(chunk_size=CHUNK_SIZE):
+        titles.setdefault(master_id, {})[language_code] = title
+    return titles
+
+
+def get_section_titles(menus):
+    """
+    Названия разделов меню menus на всех языках в виде словаря по первичному
+    ключу раздела
+    """
+    return _get_titles(MenuSection, MenuSection.objects.filter(menu__in=menus))
+
+
+def iter_menus(menus):
+    """Данные меню menus"""
+    titles = _get_titles(Menu, menus)
+    for menu_id, published in menus.order_by('pk').values_list('pk', 'published'):
+        yield {
+            'type': MENU,
+            'id': menu_id,
+            'translations': {
+                language: {'title': title} for language, title in titles.get(menu_id, {}).items()
+            },
+            'published': published,
+        }
+
+
+def iter_sections(menus, titles):
+    """Данные разделов меню menus с названиями titles (см. get_section_titles)"""
+    for section_id, menu_id, published in MenuSection.objects.filter(menu__in=menus).order_by(
+        'menu_id', 'pk'
+    ).values_list('pk', 'menu_id', 'published'):
+        yield {
+            'type': SECTION,
+            'id': section_id,
+            'menu': menu_id,
+            'section': titles.get(section_id),
+            'published': published,
+        }
+
+
+def iter_courses(menus, chunk_size=CHUNK_SIZE, sections=None):
+    """
+    Данные блюд меню menus в формате импорта. Названия разделов sections
+    (см. get_section_titles) загружаются, если не переданы.
+    """
+    if sections is None:
+        sections = get_section_titles(menus)
+    courses = MenuCourse.objects.filter(menu__in=menus).order_by(
+        'menu_id', 'section_id', 'pk'
+    ).prefetch_related('translations').iterator(chunk_size=chunk_size)
+    for course in courses:
+        yield {
+            'type': COURSE,
+            'id': course.pk,
+            'menu': course.menu_id,
+            'section': sections.get(course.section_id),
+            'translations': {
+                translation.language_code: {
+                    name: getattr(translation, name) for name in TRANSLATED_COLUMNS
+                }
+                for translation in course.translations.all()
+            },
+            'price': str(course.price),
+            'cooking_time': (
+                duration_string(course.cooking_time) if course.cooking_time is not None else None
+            ),
+            'published': course.published,
+            'options': course.options,
+        }
+
+
+def iter_records(menus, chunk_size=CHUNK_SIZE):
+    """Данные меню menus, их разделов и блюд"""
+    sections = get_section_titles(menus)
+    yield from iter_menus(menus)
+    yield from iter_sections(menus, sections)
+    yield from iter_courses(menus, chunk_size=chunk_size, sections=sections)
+
+
+def iter_json_lines(records):
+    """Строки файла JSON Lines с записями records"""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+class _Echo:
+    """Файл, метод write которого возвращает записанную строку"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(records):
+    """
+    Строки файла CSV с записями records. Столбцы с переводами выводятся
+    для всех языков из настройки LANGUAGES.
+    """
+    languages = [code for code, _name in settings.LANGUAGES]
+    writer = csv.writer(_Echo())
+    yield writer.writerow(
+        ['type', 'id', 'menu'] +
+        [f"{SECTION_COLUMN}_{language}" for language in languages] +
+        [f"{name}_{language}" for name in TRANSLATED_COLUMNS for language in languages] +
+        list(PLAIN_COLUMNS) + ['options']
+    )
+    for record in records:
+        section = record.get('section') or {}
+        translations = record.get('translations', {})
+        options = record.get('options')
+        yield writer.writerow(
+            [record['type'], record['id'], record.get('menu', '')] +
+            [section.get(language, '') for language in languages] +
+            [
+                translations.get(language, {}).get(name) or ''
+                for name in TRANSLATED_COLUMNS for language in languages
+            ] +
+            [
+                record.get('price', ''),
+                record.get('cooking_time') or '',
+                'true' if record['published'] else 'false',
+                json.dumps(options, ensure_ascii=False) if options is not None else '',
+            ]
+        )
+
+
+WRITERS = {
+    CSV: iter_csv,
+    JSON_LINES: iter_json_lines,
+}
+
+
+def export_response(menus, data_format, file_name, chunk_size=CHUNK_SIZE):
+    """
+    Потоковый ответ с файлом формата data_format, в который выгружаются меню
+    menus (набор запросов) со всеми разделами и блюдами
+    """
+    response = StreamingHttpResponse(
+        WRITERS[data_format](iter_records(menus, chunk_size=chunk_size)),
+        content_type=CONTENT_TYPES[data_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{file_name}.{data_format}"'
+    return response
@@ -0,0 +1,336 @@
+"""
+Импорт меню из файлов JSON Lines и CSV
+--------------------------------------
+
+Файл описывает разделы и блюда меню, по одному блюду в строке. В формате
+JSON Lines каждая строка - объект JSON:
+
+    {"section": {"en": "Soups", "ru": "Супы"},
+     "translations": {"en": {"title": "Borscht"}, "ru": {"title": "Борщ", "composition": "Свекла"}},
+     "price": "350.00", "cooking_time": "00:15:00", "published": true, "options": null}
+
+В формате CSV первая строка содержит названия столбцов: `section_<язык>`,
+`title_<язык>`, `composition_<язык>` для каждого языка, а также `price`,
+`cooking_time`, `published` и `options` (объект JSON). Все столбцы, кроме
+`price` и заголовка блюда хотя бы на одном языке, необязательны.
+
+Блюда с одинаковыми названиями раздела на всех языках попадают в один раздел,
+который создается при импорте; блюда без названия раздела не входят ни в один
+раздел.
+
+Файл, выгруженный из меню (см. `menus.exporting`), содержит также записи
+других типов, которые задаются полем (столбцом) `type`. Записи меню (`menu`)
+пропускаются, а записи разделов (`section`) с названиями на всех языках в поле
+`section` и признаком `published` создают разделы, в том числе без блюд.
+Раздел создается один раз для одинаковых названий, поэтому признак публикации
+берется из первой записи раздела или первого блюда с этим разделом.
+
+Файл читается по строкам и не загружается в память целиком. Строки проверяются
+сериализатором блюд пачками по `batch_size`, а разделы, блюда и их переводы
+записываются запросами `bulk_create` по мере чтения в одной транзакции. Если
+хотя бы одна строка содержит ошибку, то транзакция отменяется, а отчет об
+импорте содержит ошибки с номерами строк.
+"""
+
+import codecs
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import BooleanField
+
+from menus.bulk import save_translations
+from menus.models import MenuCourse, MenuSection
+from menus.serializers import NestedMenuCourseSerializer
+from restaurants.signals import public_menu_changed
+
+
+CSV = 'csv'
+JSON_LINES = 'jsonl'
+FORMATS = (CSV, JSON_LINES)
+
+# Расширения файлов, по которым определяется формат
+EXTENSIONS = {
+    '.csv': CSV,
+    '.jsonl': JSON_LINES,
+    '.ndjson': JSON_LINES,
+}
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+
+# Столбцы CSV с переводами блюда и раздела
+TRANSLATED_COLUMNS = ('title', 'composition')
+SECTION_COLUMN = 'section'
+# Столбцы CSV, значения которых передаются сериализатору как есть
+PLAIN_COLUMNS = ('price', 'cooking_time', 'published')
+
+# Типы записей файла (см. `menus.exporting`). Запись без типа - блюдо.
+MENU = 'menu'
+SECTION = 'section'
+COURSE = 'course'
+RECORD_TYPES = (MENU, SECTION, COURSE)
+
+
+class RowError(ValueError):
+    """Ошибка в строке файла, найденная до проверки сериализатором"""
+
+
+def guess_format(file_name):
+    """Формат файла по расширению его имени или None"""
+    for extension, data_format in EXTENSIONS.items():
+        if file_name and file_name.lower().endswith(extension):
+            return data_format
+    return None
+
+
+def check_data_format(data_format):
+    """Проверяет, что формат файла data_format известен, и возвращает его"""
+    if data_format not in FORMATS:
+        raise ValidationError({'data_format': [
+            _("Unknown data format, expected one of: %(formats)s") % {'formats': ', '.join(FORMATS)}
+        ]})
+    return data_format
+
+
+def read_json_lines(stream):
+    """
+    Читает строки файла JSON Lines из двоичного потока stream и возвращает
+    для каждой непустой строки пару из ее номера и данных блюда либо
+    исключения RowError
+    """
+    for number, line in enumerate(codecs.getreader('utf-8-sig')(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield number, RowError(_("Invalid JSON: %(error)s") % {'error': exc})
+            continue
+        if not isinstance(data, dict):
+            yield number, RowError(_("Expected a JSON object"))
+            continue
+        yield number, data
+
+
+def read_csv(stream):
+    """
+    Читает строки файла CSV из двоичного потока stream и возвращает для
+    каждой строки данных пару из ее номера и данных блюда в том же виде, что и
+    для JSON Lines, либо исключения RowError
+    """
+    reader = csv.DictReader(codecs.getreader('utf-8-sig')(stream))
+    for row in reader:
+        # Первая строка файла - названия столбцов
+        number = reader.line_num
+        try:
+            yield number, _csv_row_to_data(row)
+        except RowError as exc:
+            yield number, exc
+
+
+def _csv_row_to_data(row):
+    """Данные блюда из строки CSV row"""
+    data = {'translations': {}}
+    section = {}
+    for column, value in row.items():
+        if column is None:
+            raise RowError(_("The row has more values than the header"))
+        value = (value or '').strip()
+        if not value:
+            continue
+        if column in PLAIN_COLUMNS or column == 'type':
+            data[column] = value
+        elif column == 'options':
+            try:
+                data['options'] = json.loads(value)
+            except ValueError as exc:
+                raise RowError(_("Invalid JSON in options: %(error)s") % {'error': exc})
+        else:
+            name, _separator, language = column.rpartition('_')
+            if name in TRANSLATED_COLUMNS and language:
+                data['translations'].setdefault(language, {})[name] = value
+            elif name == SECTION_COLUMN and language:
+                section[language] = value
+    if section:
+        data['section'] = section
+    return data
+
+
+READERS = {
+    CSV: read_csv,
+    JSON_LINES: read_json_lines,
+}
+
+
+def _section_key(value):
+    """
+    Ключ раздела из значения поля section данных блюда: кортеж пар из кода
+    языка и названия раздела или None для блюда без раздела
+    """
+    if value is None or value == {}:
+        return None
+    if not isinstance(value, dict) or not all(
+        isinstance(title, str) and 0 < len(title.strip()) <= 250 for title in value.values()
+    ):
+        raise RowError(_("Section must be an object mapping language codes to titles"))
+    return tuple(sorted((language, title.strip()) for language, title in value.items()))
+
+
+class MenuImport:
+    """
+    Импорт разделов и блюд в меню menu. Разделы и блюда добавляются к
+    имеющимся в меню.
+    """
+
+    def __init__(self, menu, batch_size=BATCH_SIZE, max_errors=MAX_ERRORS):
+        self.menu = menu
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.errors = []
+        self.sections = {}
+        self.sections_created = 0
+        self.courses_created = 0
+        self.rows = 0
+        self.write_time = 0.0
+        self.__pending_rows = []
+        self.__pending_sections = []
+
+    def run(self, stream, data_format):
+        """
+        Импортирует блюда из двоичного потока stream в формате data_format и
+        возвращает отчет об импорте
+        """
+        started = time.monotonic()
+        with transaction.atomic():
+            for number, data in READERS[data_format](stream):
+                self.rows += 1
+                if isinstance(data, RowError):
+                    self.__add_error(number, {'non_field_errors': [str(data)]})
+                    continue
+                record_type = data.pop('type', COURSE)
+                if record_type == COURSE:
+                    self.__pending_rows.append((number, data))
+                    if len(self.__pending_rows) >= self.batch_size:
+                        self.__process_batch()
+                elif record_type == SECTION:
+                    self.__add_section(number, data)
+                elif record_type != MENU:
+                    self.__add_error(number, {'type': [
+                        _("Unknown record type, expected one of: %(types)s") % {
+                            'types': ', '.join(RECORD_TYPES)
+                        }
+                    ]})
+                if len(self.errors) >= self.max_errors:
+                    break
+            self.__process_batch()
+            if self.errors:
+                transaction.set_rollback(True)
+            elif self.courses_created or self.sections_created:
+                self.__finish()
+        return self.report(time.monotonic() - started)
+
+    def report(self, total_time):
+        """Отчет об импорте"""
+        return {
+            'rows': self.rows,
+            'sections': self.sections_created if not self.errors else 0,
+            'courses': self.courses_created if not self.errors else 0,
+            'errors': self.errors,
+            'timings': {
+                'total': round(total_time, 3),
+                'write': round(self.write_time, 3),
+            },
+        }
+
+    def __add_error(self, number, errors):
+        self.errors.append({'row': number, 'errors': errors})
+
+    def __add_section(self, number, data):
+        """Проверяет запись раздела и откладывает его создание до записи блюд"""
+        try:
+            key = _section_key(data.get('section'))
+        except RowError as exc:
+            self.__add_error(number, {'section': [str(exc)]})
+            return
+        if key is None:
+            self.__add_error(number, {'section': [_("This field is required.")]})
+            return
+        try:
+            published = BooleanField().to_internal_value(data.get('published', True))
+        except ValidationError as exc:
+            self.__add_error(number, {'published': exc.detail})
+            return
+        self.__pending_sections.append((key, published))
+
+    def __process_batch(self):
+        """Проверяет накопленные строки и, если ошибок еще нет, записывает их"""
+        rows, self.__pending_rows = self.__pending_rows, []
+        sections, self.__pending_sections = self.__pending_sections, []
+        if not rows:
+            if sections and not self.errors:
+                self.__write([], [], sections)
+            return
+        section_keys = []
+        for number, data in rows:
+            try:
+                section_keys.append(_section_key(data.pop('section', None)))
+            except RowError as exc:
+                section_keys.append(None)
+                self.__add_error(number, {'section': [str(exc)]})
+        serializer = NestedMenuCourseSerializer(data=[data for _number, data in rows], many=True)
+        if not serializer.is_valid():
+            for (number, _data), errors in zip(rows, serializer.errors):
+                if errors:
+                    self.__add_error(number, errors)
+        if self.errors:
+            return
+        self.__write(serializer.validated_data, section_keys, sections)
+
+    def __write(self, validated_data, section_keys, sections):
+        """
+        Записывает проверенные данные блюд, разделы из записей sections (пары
+        из ключа раздела и признака публикации) и новые разделы блюд
+        """
+        started = time.monotonic()
+        new_sections = []
+        for key, published in list(sections) + [(key, True) for key in section_keys if key is not None]:
+            if key not in self.sections:
+                self.sections[key] = MenuSection(menu=self.menu, published=published)
+                new_sections.append(key)
+        if new_sections:
+            created = MenuSection.objects.bulk_create([self.sections[key] for key in new_sections])
+            save_translations(
+                MenuSection,
+                [(section, {language: {'title': title} for language, title in key})
+                 for section, key in zip(created, new_sections)],
+                created=True
+            )
+            self.sections_created += len(created)
+        translations = []
+        courses = []
+        for data, key in zip(validated_data, section_keys):
+            data = dict(data)
+            translations.append(data.pop('translations', None))
+            courses.append(MenuCourse(
+                menu=self.menu,
+                section=self.sections[key] if key is not None else None,
+                **data
+            ))
+        if courses:
+            courses = MenuCourse.objects.bulk_create(courses)
+            save_translations(MenuCourse, zip(courses, translations), created=True)
+            self.courses_created += len(courses)
+        self.write_time += time.monotonic() - started
+
+    def __finish(self):
+        """Пересчитывает видимость разделов и блюд меню после записи"""
+        started = time.monotonic()
+        MenuSection.update_effective_published(MenuSection.objects.filter(menu=self.menu))
+        MenuCourse.update_effective_published(MenuCourse.objects.filter(menu=self.menu))
+        public_menu_changed(self.menu.restaurant_id)
+        self.write_time += time.monotonic() - started
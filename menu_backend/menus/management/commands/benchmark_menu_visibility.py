@@ -0,0 +1,133 @@
+"""
+Сравнение скорости условий видимости блюд для сотрудника многих ресторанов
+"""
+
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from menus.models import Menu, MenuCourse
+from restaurants.models import Restaurant, RestaurantStaff
+from users.models import User
+
+
+class Rollback(Exception):
+    """Исключение для отмены транзакции с тестовыми данными"""
+
+
+def create_data(restaurants, staff_restaurants, courses, stdout):
+    """
+    Создает restaurants ресторанов с одним меню каждый (меню каждого второго
+    ресторана не опубликовано), courses блюд в этих меню и пользователя,
+    работающего в staff_restaurants ресторанах. Возвращает пользователя.
+    """
+    user = User.objects.create_user(username='benchmark_visibility', password='benchmark')
+    objects = Restaurant.objects.bulk_create(
+        [
+            Restaurant(
+                slug=f'benchmark-{number}', stars=3, country='Russia', city='Moscow',
+                building=str(number), zip_code='123456'
+            )
+            for number in range(restaurants)
+        ],
+        batch_size=1000
+    )
+    RestaurantStaff.objects.bulk_create(
+        [
+            RestaurantStaff(user=user, restaurant=restaurant, position='worker')
+            for restaurant in objects[:staff_restaurants]
+        ],
+        batch_size=1000
+    )
+    menus = Menu.objects.bulk_create(
+        [
+            Menu(restaurant=restaurant, published=bool(number % 2))
+            for number, restaurant in enumerate(objects)
+        ],
+        batch_size=1000
+    )
+    batch = 10000
+    for start in range(0, courses, batch):
+        MenuCourse.objects.bulk_create([
+            MenuCourse(menu=menus[number % len(menus)], price=number, published=bool(number % 3))
+            for number in range(start, min(start + batch, courses))
+        ])
+    MenuCourse.update_effective_published(MenuCourse.objects.all())
+    stdout.write(f"{courses} courses created")
+    return user
+
+
+def set_predicate(user):
+    """
+    Прежнее условие: список ресторанов пользователя загружается отдельным
+    запросом и подставляется в условие IN
+    """
+    restaurant_ids = set(user.restaurant_staff.values_list('restaurant_id', flat=True))
+    return MenuCourse.objects.filter(
+        Q(menu__published=True, published=True) |
+        Q(menu__restaurant__id__in=restaurant_ids)
+    )
+
+
+def subquery_predicate(user):
+    """Условие с подзапросом, которое используют наборы API-обработчиков"""
+    return MenuCourse.objects.filter(
+        Q(effective_published=True) |
+        RestaurantStaff.works_in(user, 'menu__restaurant')
+    )
+
+
+class Command(BaseCommand):
+    """
+    Создает в транзакции рестораны, меню, блюда и пользователя, работающего во
+    многих ресторанах, и сравнивает время выборки первой, последней страницы и
+    подсчета видимых ему блюд с прежним условием (список ресторанов в IN) и с
+    подзапросом к таблице сотрудников ресторанов. По окончании транзакция
+    отменяется.
+    """
+
+    help = "Compare course visibility predicates for a user working in many restaurants"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=2000, help="Number of restaurants")
+        parser.add_argument(
+            '--staff-restaurants', type=int, default=1000,
+            help="Number of restaurants the user works in"
+        )
+        parser.add_argument('--courses', type=int, default=1000000, help="Number of courses")
+        parser.add_argument('--repeat', type=int, default=5, help="Number of runs of each query")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = create_data(
+                    options['restaurants'], options['staff_restaurants'], options['courses'],
+                    self.stdout
+                )
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+                self.__compare(user, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def __compare(self, user, repeat):
+        """Сравнивает время выполнения запросов с каждым условием"""
+        expected = None
+        for name, predicate in [('IN (list)', set_predicate), ('IN (subquery)', subquery_predicate)]:
+            count = predicate(user).count()
+            if expected is not None and count != expected:
+                self.stderr.write(f"{name}: {count} courses instead of {expected}")
+            expected = count
+            tasks = {
+                'first page': lambda: list(predicate(user)[:20]),
+                'last page': lambda: list(predicate(user)[max(count - 20, 0):]),
+                'count': lambda: predicate(user).count(),
+            }
+            for task, func in tasks.items():
+                seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+                self.stdout.write(f"{name}, {task}: {seconds * 1000:.1f} ms")
+        self.stdout.write(f"{expected} courses visible to the user")
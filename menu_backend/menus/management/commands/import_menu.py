@@ -0,0 +1,51 @@
+"""
+Импорт разделов и блюд меню из файла JSON Lines или CSV
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menus.importing import BATCH_SIZE, FORMATS, MenuImport, guess_format
+from menus.models import Menu
+
+
+class Command(BaseCommand):
+    """
+    Добавляет в меню разделы и блюда из файла (см. `menus.importing`) и
+    выводит отчет об импорте. Если в файле есть ошибки, то ничего не
+    добавляется.
+    """
+
+    help = "Import menu sections and courses from a JSON Lines or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('menu', type=int, help="The id of the menu to import into")
+        parser.add_argument('path', help="The file to import")
+        parser.add_argument(
+            '--format', choices=FORMATS, dest='data_format',
+            help="The file format, by default it is guessed from the file name"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help="The number of rows validated and written at once"
+        )
+
+    def handle(self, *args, **options):
+        menu = Menu.objects.filter(pk=options['menu']).first()
+        if menu is None:
+            raise CommandError(f"Menu {options['menu']} does not exist")
+        data_format = options['data_format'] or guess_format(options['path'])
+        if data_format is None:
+            raise CommandError("Unable to guess the file format, use --format")
+        with open(options['path'], 'rb') as stream:
+            report = MenuImport(menu, batch_size=options['batch_size']).run(stream, data_format)
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(
+            f"Rows: {report['rows']}, sections: {report['sections']}, "
+            f"courses: {report['courses']}, errors: {len(report['errors'])}, "
+            f"time: {report['timings']['total']}s (writing {report['timings']['write']}s)"
+        )
+        if report['errors']:
+            raise CommandError("Nothing was imported")
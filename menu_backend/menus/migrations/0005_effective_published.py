@@ -0,0 +1,44 @@
+# Generated by Django 4.1.5 on 2026-10-17 14:40
+
+from django.db import migrations, models
+from django.db.models import Exists, ExpressionWrapper, OuterRef, Q
+
+
+def fill_effective_published(apps, schema_editor):
+    """Заполняет поле effective_published имеющихся разделов меню и блюд"""
+    Menu = apps.get_model('menus', 'Menu')
+    MenuSection = apps.get_model('menus', 'MenuSection')
+    MenuCourse = apps.get_model('menus', 'MenuCourse')
+    published_menu = Exists(Menu.objects.filter(pk=OuterRef('menu_id'), published=True))
+    MenuSection.objects.update(effective_published=ExpressionWrapper(
+        Q(published=True) & published_menu,
+        output_field=models.BooleanField()
+    ))
+    MenuCourse.objects.update(effective_published=ExpressionWrapper(
+        Q(published=True) & published_menu & (
+            Q(section=None) |
+            Exists(MenuSection.objects.filter(pk=OuterRef('section_id'), published=True))
+        ),
+        output_field=models.BooleanField()
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0004_alter_menucourse_published_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menucourse',
+            name='effective_published',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Published with the menu'),
+        ),
+        migrations.AddField(
+            model_name='menusection',
+            name='effective_published',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Published with the menu'),
+        ),
+        migrations.RunPython(fill_effective_published, migrations.RunPython.noop),
+    ]
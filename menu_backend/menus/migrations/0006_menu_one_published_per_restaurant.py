@@ -0,0 +1,45 @@
+# Generated by Django 4.1.5 on 2026-10-17 15:30
+
+from django.db import migrations, models
+
+
+def unpublish_extra_menus(apps, schema_editor):
+    """
+    Оставляет опубликованным только последнее добавленное опубликованное меню
+    каждого ресторана, чтобы имеющиеся данные удовлетворяли ограничению
+    """
+    Menu = apps.get_model('menus', 'Menu')
+    MenuSection = apps.get_model('menus', 'MenuSection')
+    MenuCourse = apps.get_model('menus', 'MenuCourse')
+    latest = (
+        Menu.objects.filter(published=True)
+        .values('restaurant_id')
+        .annotate(latest=models.Max('pk'))
+        .values('latest')
+    )
+    extra = Menu.objects.filter(published=True).exclude(pk__in=latest)
+    extra_ids = list(extra.values_list('pk', flat=True))
+    if not extra_ids:
+        return
+    Menu.objects.filter(pk__in=extra_ids).update(published=False)
+    MenuSection.objects.filter(menu_id__in=extra_ids).update(effective_published=False)
+    MenuCourse.objects.filter(menu_id__in=extra_ids).update(effective_published=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0005_effective_published'),
+    ]
+
+    operations = [
+        migrations.RunPython(unpublish_extra_menus, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='menu',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('published', True)),
+                fields=('restaurant',),
+                name='menus_menu_one_published_per_restaurant'
+            ),
+        ),
+    ]
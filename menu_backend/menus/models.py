@@ -9,8 +9,8 @@
 *   Блюдо
 """
 
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q
 from django.utils.translation import gettext_lazy as _
 
 from parler.models import TranslatableModel, TranslatedFields
@@ -31,6 +31,14 @@ class Menu(TranslatableModel):
         ordering = ['pk']
         verbose_name = _('menu')
         verbose_name_plural = _('menus')
+        constraints = [
+            # У ресторана может быть не больше одного опубликованного меню
+            models.UniqueConstraint(
+                fields=['restaurant'],
+                condition=Q(published=True),
+                name='menus_menu_one_published_per_restaurant'
+            ),
+        ]
 
     translations = TranslatedFields(
         title=models.CharField(
@@ -58,7 +66,12 @@ class Menu(TranslatableModel):
 
     @property
     def extra_published_courses(self):
-        """Список опубликованных блюд меню, не входящих ни в один подраздел"""
+        """
+        Список опубликованных блюд меню, не входящих ни в один подраздел. Если
+        блюда загружены заранее (см. `menus.prefetch`), то запрос не выполняется.
+        """
+        if hasattr(self, 'prefetched_extra_published_courses'):
+            return self.prefetched_extra_published_courses
         return self.courses.filter(section__isnull=True, published=True)
 
     def check_published(self):
@@ -85,16 +98,39 @@ class Menu(TranslatableModel):
             )
         )
 
+    def validate_constraints(self, exclude=None):
+        """
+        Проверка ограничений модели при проверке формы. Опубликованное меню
+        снимает публикацию с других меню ресторана при сохранении, поэтому
+        ограничение на одно опубликованное меню ресторана здесь не проверяется.
+        """
+        exclude = set(exclude or ())
+        exclude.add('restaurant')
+        super().validate_constraints(exclude=exclude)
+
     def save(self, *args, **kwargs):
         """
         Если меню сделано опубликованным, то автоматически все другие меню того же
-        ресторана должны стать неопубликованными
+        ресторана должны стать неопубликованными. Публикация с них снимается
+        одним запросом UPDATE до сохранения меню, чтобы не нарушить ограничение
+        на одно опубликованное меню ресторана.
         """
-        super().save(*args, **kwargs)
-        if self.restaurant and self.published:
-            for other_menu in self.restaurant.menus.exclude(pk=self.pk).all():
-                other_menu.published = False
-                other_menu.save()
+        with transaction.atomic(using=kwargs.get('using')):
+            if self.restaurant_id is not None and self.published:
+                unpublished = Menu.objects.filter(
+                    restaurant_id=self.restaurant_id, published=True
+                ).exclude(pk=self.pk).update(published=False)
+                if unpublished:
+                    # Разделы и блюда остальных меню ресторана больше не видны.
+                    # Общедоступное меню ресторана обновляется по сигналу
+                    # сохранения этого меню.
+                    MenuSection.objects.filter(
+                        menu__restaurant_id=self.restaurant_id, effective_published=True
+                    ).exclude(menu_id=self.pk).update(effective_published=False)
+                    MenuCourse.objects.filter(
+                        menu__restaurant_id=self.restaurant_id, effective_published=True
+                    ).exclude(menu_id=self.pk).update(effective_published=False)
+            super().save(*args, **kwargs)
 
 
 class MenuSection(TranslatableModel):
@@ -129,20 +165,44 @@ class MenuSection(TranslatableModel):
         verbose_name=_('Published'),
         default=True, blank=False, null=False
     )
+    # Раздел опубликован, и меню, к которому он относится, тоже опубликовано.
+    # Поле обновляется методом update_effective_published при изменении
+    # раздела или меню.
+    effective_published = models.BooleanField(
+        verbose_name=_('Published with the menu'),
+        default=False, blank=False, null=False,
+        editable=False, db_index=True
+    )
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def update_effective_published(cls, queryset):
+        """
+        Пересчитывает поле effective_published разделов меню queryset одним
+        запросом к базе данных
+        """
+        queryset.update(effective_published=ExpressionWrapper(
+            Q(published=True) & Exists(Menu.objects.filter(pk=OuterRef('menu_id'), published=True)),
+            output_field=BooleanField()
+        ))
+
     @property
     def published_courses(self):
-        """Список опубликованных блюд, входящих в подраздел"""
+        """
+        Список опубликованных блюд, входящих в подраздел. Если блюда загружены
+        заранее (см. `menus.prefetch`), то запрос не выполняется.
+        """
+        if hasattr(self, 'prefetched_published_courses'):
+            return self.prefetched_published_courses
         return self.courses.filter(published=True)
 
     def check_published(self):
         """
-        Проверить, что меню, к которому относится этот раздел, опубликовано
+        Проверить, что раздел и меню, к которому он относится, опубликованы
         """
-        return self.published and self.menu.check_published()
+        return self.effective_published
 
     def check_restaurant_staff(self, user):
         """
@@ -206,16 +266,39 @@ class MenuCourse(TranslatableModel):
         verbose_name=_('Options'),
         blank=True, null=True
     )
+    # Блюдо опубликовано, меню, к которому оно относится, опубликовано, и
+    # раздел блюда, если он есть, тоже опубликован. Поле обновляется методом
+    # update_effective_published при изменении блюда, раздела или меню.
+    effective_published = models.BooleanField(
+        verbose_name=_('Published with the menu'),
+        default=False, blank=False, null=False,
+        editable=False, db_index=True
+    )
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def update_effective_published(cls, queryset):
+        """
+        Пересчитывает поле effective_published блюд queryset одним запросом к
+        базе данных
+        """
+        queryset.update(effective_published=ExpressionWrapper(
+            Q(published=True) &
+            Exists(Menu.objects.filter(pk=OuterRef('menu_id'), published=True)) & (
+                Q(section=None) |
+                Exists(MenuSection.objects.filter(pk=OuterRef('section_id'), published=True))
+            ),
+            output_field=BooleanField()
+        ))
+
     def check_published(self):
         """
         Проверить, что меню, к которому относится это блюдо, опубликовано и
-        само блюдо также опубликовано.
+        само блюдо также опубликовано, как и его раздел, если он есть.
         """
-        return self.published and self.section.check_published()
+        return self.effective_published
 
     def check_restaurant_staff(self, user):
         """
@@ -6,6 +6,17 @@ from rest_framework import permissions
 
 from menus.models import Menu
 from restaurants.models import Restaurant
+from restaurants.roles import get_restaurant_roles
+
+
+def get_menu_restaurant_id(menu_id):
+    """
+    Первичный ключ ресторана, к которому относится меню с первичным ключом
+    menu_id из данных запроса, или None, если такого меню нет
+    """
+    if menu_id is None:
+        return None
+    return Menu.objects.filter(pk=menu_id).values_list('restaurant_id', flat=True).first()
 
 
 class MenuPermission(permissions.BasePermission):
@@ -26,15 +37,19 @@ class MenuPermission(permissions.BasePermission):
             return True
         if not request.user.is_authenticated or not request.user.is_active:
             return False
+        if getattr(view, 'action', None) in ('import_file', 'clone'):
+            # Права на меню проверяются в has_object_permission
+            return True
         if request.method == 'POST':
             # При добавлении нового меню придется извлекать идентификатор
             # ресторана из данных запроса и проверять права для него...
             restaurant_id = request.data.get('restaurant', None)
-            if restaurant_id is None or not Restaurant.objects.filter(pk=restaurant_id).exists():
+            if restaurant_id is None:
                 return False
-            restaurant = Restaurant.objects.get(pk=restaurant_id)
-            return restaurant.check_owner_or_worker(request.user) or request.user.is_staff
-        return request.user.is_staff or request.user.restaurant_staff.exists()
+            if request.user.is_staff:
+                return Restaurant.objects.filter(pk=restaurant_id).exists()
+            return get_restaurant_roles(request).is_owner_or_worker(restaurant_id)
+        return request.user.is_staff or get_restaurant_roles(request).has_any()
 
     def has_object_permission(self, request, view, obj):
         """
@@ -46,7 +61,23 @@ class MenuPermission(permissions.BasePermission):
             return True
         if not request.user.is_authenticated:
             return False
-        return request.user.is_staff or obj.check_restaurant_staff(request.user)
+        return request.user.is_staff or get_restaurant_roles(request).is_owner_or_worker(obj.restaurant_id)
+
+
+class MenuExportPermission(permissions.BasePermission):
+    """
+    Права доступа к выгрузке меню или всех меню ресторана. Выгрузка содержит
+    и неопубликованные разделы и блюда, поэтому выгружать меню могут только
+    администратор и работники ресторана.
+    """
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.is_active
+
+    def has_object_permission(self, request, view, obj):
+        """Объект obj - меню или ресторан"""
+        restaurant_id = obj.restaurant_id if isinstance(obj, Menu) else obj.pk
+        return request.user.is_staff or get_restaurant_roles(request).is_owner_or_worker(restaurant_id)
 
 
 class MenuSectionPermission(permissions.BasePermission):
@@ -64,15 +95,18 @@ class MenuSectionPermission(permissions.BasePermission):
             return True
         if not request.user.is_authenticated or not request.user.is_active:
             return False
+        if getattr(view, 'action', None) in ('bulk', 'publish'):
+            # Данные массовых операций - список разделов, и права на меню
+            # каждого раздела проверяются при их обработке (см. `menus.bulk`)
+            return True
         if request.method == 'POST':
             # При добавлении нового раздела придется извлекать идентификатор
             # меню из данных запроса и проверять права для него...
-            menu_id = request.data.get('menu', None)
-            if menu_id is None or not Menu.objects.filter(pk=menu_id).exists():
+            restaurant_id = get_menu_restaurant_id(request.data.get('menu', None))
+            if restaurant_id is None:
                 return False
-            menu = Menu.objects.get(pk=menu_id)
-            return menu.check_restaurant_staff(request.user) or request.user.is_staff
-        return request.user.is_staff or request.user.restaurant_staff.exists()
+            return request.user.is_staff or get_restaurant_roles(request).is_owner_or_worker(restaurant_id)
+        return request.user.is_staff or get_restaurant_roles(request).has_any()
 
     def has_object_permission(self, request, view, obj):
         """
@@ -84,7 +118,7 @@ class MenuSectionPermission(permissions.BasePermission):
             return True
         if not request.user.is_authenticated:
             return False
-        return request.user.is_staff or obj.check_restaurant_staff(request.user)
+        return request.user.is_staff or get_restaurant_roles(request).is_owner_or_worker(obj.menu.restaurant_id)
 
 
 class MenuCoursePermission(permissions.BasePermission):
@@ -101,15 +135,19 @@ class MenuCoursePermission(permissions.BasePermission):
             return True
         if not request.user.is_authenticated or not request.user.is_active:
             return False
+        if getattr(view, 'action', None) in ('bulk', 'adjust_prices'):
+            # Данные массовых операций - список блюд, и права на меню каждого
+            # блюда проверяются при их обработке (см. `menus.bulk`). Права на
+            # изменение цен применяются условием запроса (см. `menus.prices`)
+            return True
         if request.method == 'POST':
             # При добавлении нового блюда придется извлекать идентификатор
             # меню из данных запроса и проверять права для него...
-            menu_id = request.data.get('menu', None)
-            if menu_id is None or not Menu.objects.filter(pk=menu_id).exists():
+            restaurant_id = get_menu_restaurant_id(request.data.get('menu', None))
+            if restaurant_id is None:
                 return False
-            menu = Menu.objects.get(pk=menu_id)
-            return menu.check_restaurant_staff(request.user) or request.user.is_staff
-        return request.user.is_staff or request.user.restaurant_staff.exists()
+            return request.user.is_staff or get_restaurant_roles(request).is_owner_or_worker(restaurant_id)
+        return request.user.is_staff or get_restaurant_roles(request).has_any()
 
     def has_object_permission(self, request, view, obj):
         """
@@ -121,4 +159,4 @@ class MenuCoursePermission(permissions.BasePermission):
             return True
         if not request.user.is_authenticated:
             return False
-        return request.user.is_staff or obj.check_restaurant_staff(request.user)
+        return request.user.is_staff or get_restaurant_roles(request).is_owner_or_worker(obj.menu.restaurant_id)
@@ -0,0 +1,66 @@
+"""
+Предварительная загрузка содержимого меню
+-----------------------------------------
+
+Сериализаторы меню выводят разделы меню, опубликованные блюда каждого раздела
+и опубликованные блюда вне разделов вместе с переводами. Свойства моделей,
+которые возвращают опубликованные блюда, выполняют отдельный запрос для
+каждого объекта, если блюда не загружены заранее. Функции из этого модуля
+добавляют к запросу предварительную загрузку всего содержимого меню, после
+которой эти свойства берут данные из загруженных списков, и список любого
+числа меню выводится фиксированным числом запросов.
+"""
+
+from django.db.models import Prefetch
+
+from menus.models import Menu, MenuCourse, MenuSection
+
+
+def published_courses_queryset():
+    """Запрос опубликованных блюд вместе с их переводами"""
+    return MenuCourse.objects.filter(published=True).prefetch_related('translations')
+
+
+def prefetch_sections(queryset=None, courses=True):
+    """
+    Добавляет к запросу разделов меню queryset предварительную загрузку
+    переводов и, если courses равен True, опубликованных блюд (свойство
+    `MenuSection.published_courses`)
+    """
+    if queryset is None:
+        queryset = MenuSection.objects.all()
+    queryset = queryset.prefetch_related('translations')
+    if courses:
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                'courses',
+                queryset=published_courses_queryset(),
+                to_attr='prefetched_published_courses'
+            )
+        )
+    return queryset
+
+
+def prefetch_menus(queryset=None, sections=True, extra_courses=True):
+    """
+    Добавляет к запросу меню queryset предварительную загрузку переводов,
+    а также, если sections равен True, разделов меню с их содержимым и, если
+    extra_courses равен True, опубликованных блюд вне разделов (свойство
+    `Menu.extra_published_courses`)
+    """
+    if queryset is None:
+        queryset = Menu.objects.all()
+    queryset = queryset.prefetch_related('translations')
+    if sections:
+        queryset = queryset.prefetch_related(
+            Prefetch('sections', queryset=prefetch_sections())
+        )
+    if extra_courses:
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                'courses',
+                queryset=published_courses_queryset().filter(section__isnull=True),
+                to_attr='prefetched_extra_published_courses'
+            )
+        )
+    return queryset
@@ -0,0 +1,157 @@
+"""
+Массовое изменение цен блюд
+---------------------------
+
+Когда поставщики поднимают цены, цены всех блюд ресторана (или всех
+ресторанов владельца) меняются на процент или на фиксированную сумму с
+округлением. Новая цена вычисляется выражением SQL, поэтому все цены
+изменяются одним запросом UPDATE, а права доступа применяются условием этого
+же запроса. Предварительный просмотр (dry run) выполняет вместо изменения
+один запрос с итоговыми значениями цен до и после изменения.
+"""
+
+from decimal import Decimal
+
+from django.db.models import (
+    Avg,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    Sum,
+    Value
+)
+from django.db.models.functions import Ceil, Floor, Greatest, Round
+
+from menus.models import MenuCourse
+from restaurants.models import RestaurantStaff
+from restaurants.roles import OWNER
+from restaurants.signals import public_menu_changed
+
+
+ROUND_NEAREST = 'nearest'
+ROUND_UP = 'up'
+ROUND_DOWN = 'down'
+ROUNDING_MODES = (ROUND_NEAREST, ROUND_UP, ROUND_DOWN)
+
+ROUNDING_FUNCTIONS = {
+    ROUND_NEAREST: Round,
+    ROUND_UP: Ceil,
+    ROUND_DOWN: Floor,
+}
+
+CENT = Decimal('0.01')
+
+
+def _price_field():
+    return DecimalField(max_digits=10, decimal_places=2)
+
+
+class DecimalValue(Value):
+    """
+    Десятичное число в выражении SQL. SQLite превращает строку '110.00' в
+    целое число, и деление на него становится целочисленным, поэтому там
+    число явно приводится к REAL.
+    """
+
+    def __init__(self, value):
+        super().__init__(Decimal(value), output_field=_price_field())
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = self.as_sql(compiler, connection, **extra_context)
+        return f"CAST({sql} AS REAL)", params
+
+
+def new_price_expression(percent=None, amount=None, step=CENT, rounding=ROUND_NEAREST):
+    """
+    Выражение для новой цены блюда: цена, увеличенная на percent процентов
+    или на сумму amount (отрицательные значения уменьшают цену), округленная
+    до кратного step способом rounding. Цена не может стать отрицательной.
+    """
+    price = F('price')
+    if percent is not None:
+        price = price * DecimalValue(Decimal(100) + percent) / DecimalValue(100)
+    else:
+        price = price + DecimalValue(amount)
+    # Частное предварительно округляется, чтобы погрешность вычислений с
+    # плавающей точкой (SQLite) не сдвигала округление вверх или вниз на шаг
+    steps = Round(ExpressionWrapper(price / DecimalValue(step), output_field=_price_field()), 6)
+    price = ROUNDING_FUNCTIONS[rounding](steps) * DecimalValue(step)
+    return ExpressionWrapper(Greatest(price, DecimalValue(0)), output_field=_price_field())
+
+
+def get_editable_courses(user, restaurant_id=None, menu_id=None):
+    """
+    Блюда, цены которых изменяет пользователь user: блюда ресторана
+    restaurant_id (если пользователь - администратор или работает в нем) или,
+    если ресторан не задан, всех ресторанов, которыми владеет пользователь.
+    Если задано меню menu_id, то только блюда этого меню. Права доступа
+    применяются подзапросом, а не загрузкой списка ресторанов.
+    """
+    courses = MenuCourse.objects.all()
+    if restaurant_id is not None:
+        courses = courses.filter(menu__restaurant_id=restaurant_id)
+        if not user.is_staff:
+            courses = courses.filter(RestaurantStaff.works_in(user, 'menu__restaurant'))
+    else:
+        courses = courses.filter(menu__restaurant__in=RestaurantStaff.objects.filter(
+            user=user, position=OWNER
+        ).values('restaurant'))
+    if menu_id is not None:
+        courses = courses.filter(menu_id=menu_id)
+    return courses
+
+
+def _money(value):
+    """Денежная сумма строкой с двумя знаками после запятой или None"""
+    if value is None:
+        return None
+    return str(Decimal(value).quantize(CENT))
+
+
+def get_price_stats(courses, new_price):
+    """
+    Итоговые значения цен блюд courses до и после изменения цены выражением
+    new_price. Выполняет один запрос к базе данных.
+    """
+    stats = courses.aggregate(
+        courses=Count('pk'),
+        restaurants=Count('menu__restaurant', distinct=True),
+        before_total=Sum('price'),
+        before_min=Min('price'),
+        before_max=Max('price'),
+        before_avg=Avg('price'),
+        after_total=Sum(new_price),
+        after_min=Min(new_price),
+        after_max=Max(new_price),
+        after_avg=Avg(new_price),
+    )
+    return {
+        'courses': stats['courses'],
+        'restaurants': stats['restaurants'],
+        'before': {name: _money(stats[f'before_{name}']) for name in ('total', 'min', 'max', 'avg')},
+        'after': {name: _money(stats[f'after_{name}']) for name in ('total', 'min', 'max', 'avg')},
+    }
+
+
+def adjust_prices(courses, new_price, dry_run=False):
+    """
+    Изменяет цены блюд courses (набор запросов с условиями прав доступа)
+    выражением new_price одним запросом UPDATE и возвращает итоговые значения
+    цен до и после изменения. Если dry_run, то цены не изменяются.
+
+    Об изменении общедоступных меню сообщается один раз для каждого ресторана,
+    видимые блюда которого изменились.
+    """
+    stats = get_price_stats(courses, new_price)
+    stats['dry_run'] = dry_run
+    if dry_run or not stats['courses']:
+        return stats
+    restaurant_ids = set(
+        courses.filter(effective_published=True).values_list('menu__restaurant_id', flat=True).distinct()
+    )
+    courses.update(price=new_price)
+    public_menu_changed(*restaurant_ids)
+    return stats
@@ -2,15 +2,81 @@
 Сериализация данных о меню, разделах меню и блюдах
 """
 
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+
 from parler_rest.serializers import TranslatableModelSerializer
 from parler_rest.fields import TranslatedFieldsField
 
+from menu_backend.sparse_fields import SparseFieldsSerializerMixin
+
+from menus.bulk import BULK_LIMIT
 from menus.models import Menu, MenuSection, MenuCourse
+from menus.prices import CENT, ROUND_NEAREST, ROUNDING_MODES
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Ссылка на объект по первичному ключу. Если в контексте сериализатора под
+    ключом context_key есть словарь заранее загруженных объектов (см.
+    `menus.bulk.preload_menu_objects`), то объект ищется в нем без запроса к
+    базе данных.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        objects = self.context.get(self.context_key)
+        if objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return objects[int(data)]
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class TranslationsField(TranslatedFieldsField):
+    """
+    Переводы объекта. В отличие от `TranslatedFieldsField` проверяет переводы
+    на всех языках одним сериализатором перевода, который создается один раз
+    на поле: при проверке списка из тысяч объектов построение полей
+    сериализатора для каждого перевода занимает большую часть времени.
+    """
+
+    def to_internal_value(self, data):
+        if data is None:
+            return None
+        if not isinstance(data, dict):
+            self.fail('invalid')
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        if getattr(self, '_translation_serializer', None) is None:
+            self._translation_serializer = self.serializer_class()
+        result, errors = {}, {}
+        for language_code, model_fields in data.items():
+            try:
+                result[language_code] = self._translation_serializer.run_validation(model_fields)
+            except serializers.ValidationError as exc:
+                errors[language_code] = serializers.as_serializer_error(exc)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return result
 
 
 class MenuCourseSerializer(TranslatableModelSerializer):
     """Сериализатор для блюд"""
-    translations = TranslatedFieldsField(shared_model=MenuCourse)
+    translations = TranslationsField(shared_model=MenuCourse)
+    menu = PreloadedPrimaryKeyRelatedField('menus', queryset=Menu.objects.all())
+    section = PreloadedPrimaryKeyRelatedField(
+        'sections', queryset=MenuSection.objects.all(), allow_null=True, required=False
+    )
 
     class Meta:
         model = MenuCourse
@@ -25,8 +91,93 @@ class MenuCourseSerializer(TranslatableModelSerializer):
             'options',
         ]
 
+    def validate(self, attrs):
+        """
+        Раздел блюда должен относиться к тому же меню, что и блюдо. Проверка
+        действует и при добавлении или изменении одного блюда, и при массовых
+        операциях, так что перенос блюда в другое меню требует указать и
+        раздел этого меню (или пустой раздел).
+        """
+        if 'menu' not in attrs and 'section' not in attrs:
+            return attrs
+        menu_id = attrs['menu'].pk if 'menu' in attrs else self.instance.menu_id
+        section = attrs['section'] if 'section' in attrs else self.instance.section
+        if section is not None and section.menu_id != menu_id:
+            raise serializers.ValidationError({'section': [_("The section belongs to another menu")]})
+        return attrs
+
+
+class NestedMenuCourseSerializer(MenuCourseSerializer):
+    """
+    Сериализатор для блюд, которые добавляются вместе с разделом меню: меню
+    и раздел блюда задаются разделом
+    """
+    menu = None
+    section = None
+
+    class Meta(MenuCourseSerializer.Meta):
+        fields = [
+            'id',
+            'published',
+            'translations',
+            'price',
+            'cooking_time',
+            'options',
+        ]
+
+
+class MenuSectionTreeSerializer(TranslatableModelSerializer):
+    """Сериализатор для массового добавления разделов меню вместе с блюдами"""
+    translations = TranslationsField(shared_model=MenuSection)
+    menu = PreloadedPrimaryKeyRelatedField('menus', queryset=Menu.objects.all())
+    courses = NestedMenuCourseSerializer(many=True, required=False)
+
+    class Meta:
+        model = MenuSection
+        fields = [
+            'id',
+            'translations',
+            'published',
+            'menu',
+            'courses',
+        ]
+
+
+class MenuSectionPublishSerializer(serializers.Serializer):
+    """Сериализатор для публикации и скрытия списка разделов меню"""
+    sections = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=BULK_LIMIT
+    )
+    published = serializers.BooleanField()
+
+
+class PriceAdjustmentSerializer(serializers.Serializer):
+    """
+    Сериализатор для массового изменения цен блюд. Цены изменяются либо на
+    процент percent, либо на сумму amount.
+    """
+    restaurant = serializers.IntegerField(required=False)
+    menu = serializers.IntegerField(required=False)
+    percent = serializers.DecimalField(
+        max_digits=7, decimal_places=2, min_value=-100, required=False
+    )
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    rounding_step = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=CENT, default=CENT
+    )
+    rounding = serializers.ChoiceField(choices=ROUNDING_MODES, default=ROUND_NEAREST)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        """Должно быть задано ровно одно из полей percent и amount"""
+        if ('percent' in attrs) == ('amount' in attrs):
+            raise serializers.ValidationError({
+                'non_field_errors': [_("Either percent or amount must be given")]
+            })
+        return attrs
+
 
-class MenuSectionSerializer(TranslatableModelSerializer):
+class MenuSectionSerializer(SparseFieldsSerializerMixin, TranslatableModelSerializer):
     """Сериализатор для разделов меню"""
     translations = TranslatedFieldsField(shared_model=MenuSection)
 
@@ -39,13 +190,14 @@ class MenuSectionSerializer(TranslatableModelSerializer):
             'menu',
             'published_courses'
         ]
+        expandable_fields = ['published_courses']
 
     # Вместе с разделом меню возвращаем информацию обо всех опубликованных
     # блюдах этого раздела
     published_courses = MenuCourseSerializer(many=True, read_only=True)
 
 
-class MenuSerializer(TranslatableModelSerializer):
+class MenuSerializer(SparseFieldsSerializerMixin, TranslatableModelSerializer):
     """Сериализатор для меню"""
     translations = TranslatedFieldsField(shared_model=Menu)
 
@@ -59,6 +211,7 @@ class MenuSerializer(TranslatableModelSerializer):
             'sections',
             'extra_published_courses',
         ]
+        expandable_fields = ['sections', 'extra_published_courses']
 
     # При возврате меню расписать все его разделы а также все опубликованные
     # блюда, не входящие в раздел
@@ -0,0 +1,51 @@
+"""
+Обработчики сигналов, поддерживающие поле effective_published
+-------------------------------------------------------------
+
+Раздел меню виден всем, если опубликованы он сам и его меню, а блюдо - если
+опубликованы оно само, его меню и его раздел, если он есть. Чтобы проверка
+видимости была проверкой одного поля, результат хранится в поле
+effective_published разделов меню и блюд и пересчитывается одним запросом
+UPDATE для всех разделов и блюд, на которые влияет сохраненный или удаленный
+объект.
+
+Код, изменяющий меню, разделы меню или блюда в обход сигналов сохранения
+моделей (например, через `bulk_create` или `QuerySet.update`), должен сам
+вызывать методы `update_effective_published` моделей.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from menus.models import Menu, MenuCourse, MenuSection
+
+
+@receiver(post_save, sender=Menu)
+def menu_saved(sender, instance, **kwargs):
+    """Сохранено меню: видимость всех его разделов и блюд могла измениться"""
+    MenuSection.update_effective_published(MenuSection.objects.filter(menu_id=instance.pk))
+    MenuCourse.update_effective_published(MenuCourse.objects.filter(menu_id=instance.pk))
+
+
+@receiver(post_save, sender=MenuSection)
+def section_saved(sender, instance, **kwargs):
+    """Сохранен раздел меню: видимость его и его блюд могла измениться"""
+    MenuSection.update_effective_published(MenuSection.objects.filter(pk=instance.pk))
+    MenuCourse.update_effective_published(MenuCourse.objects.filter(section_id=instance.pk))
+
+
+@receiver(post_delete, sender=MenuSection)
+def section_deleted(sender, instance, **kwargs):
+    """
+    Удален раздел меню. Его блюда остались без раздела, и их видимость теперь
+    зависит только от них самих и меню.
+    """
+    MenuCourse.update_effective_published(
+        MenuCourse.objects.filter(menu_id=instance.menu_id, section=None)
+    )
+
+
+@receiver(post_save, sender=MenuCourse)
+def course_saved(sender, instance, **kwargs):
+    """Сохранено блюдо"""
+    MenuCourse.update_effective_published(MenuCourse.objects.filter(pk=instance.pk))
@@ -0,0 +1,213 @@
+"""
+Встроенная документация для API-обработчиков для работы с меню
+"""
+
+from django.utils.translation import gettext_lazy as _
+
+from drf_yasg import openapi
+from drf_yasg.utils import no_body, swagger_auto_schema
+
+from menus.serializers import (
+    MenuCourseSerializer,
+    MenuSerializer,
+    PriceAdjustmentSerializer,
+    MenuSectionPublishSerializer,
+    MenuSectionTreeSerializer
+)
+
+
+swagger_course_bulk_create = swagger_auto_schema(
+    method='post',
+    operation_summary=_("Create courses in bulk"),
+    operation_description=_(
+        "Create a list of courses in a single transaction. If any course is "
+        "invalid, no course is created."
+    ),
+    request_body=MenuCourseSerializer(many=True),
+    responses={
+        201: openapi.Response(_("Created courses"), schema=MenuCourseSerializer(many=True)),
+        400: openapi.Response(_("Invalid data, errors are listed for each course")),
+        403: openapi.Response(_("No permission to edit one of the menus")),
+    }
+)
+
+
+swagger_course_bulk_update = swagger_auto_schema(
+    method='patch',
+    operation_summary=_("Update courses in bulk"),
+    operation_description=_(
+        "Partially update a list of courses in a single transaction. Each item "
+        "contains the course identifier 'id' and the fields to change."
+    ),
+    request_body=openapi.Schema(
+        type=openapi.TYPE_ARRAY,
+        items=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'id': openapi.Schema(
+                    type=openapi.TYPE_INTEGER,
+                    description=_("The identifier of the course")
+                ),
+            },
+            required=['id']
+        )
+    ),
+    responses={
+        200: openapi.Response(_("Updated courses"), schema=MenuCourseSerializer(many=True)),
+        400: openapi.Response(_("Invalid data, errors are listed for each course")),
+        403: openapi.Response(_("No permission to edit one of the menus")),
+    }
+)
+
+
+swagger_course_bulk_delete = swagger_auto_schema(
+    method='delete',
+    operation_summary=_("Delete courses in bulk"),
+    operation_description=_(
+        "Delete a list of courses given by their identifiers in a single transaction"
+    ),
+    request_body=openapi.Schema(
+        type=openapi.TYPE_ARRAY,
+        items=openapi.Schema(type=openapi.TYPE_INTEGER)
+    ),
+    responses={
+        204: openapi.Response(_("Courses deleted")),
+        400: openapi.Response(_("Invalid or unknown identifiers")),
+        403: openapi.Response(_("No permission to edit one of the menus")),
+    }
+)
+
+
+swagger_section_bulk_create = swagger_auto_schema(
+    operation_summary=_("Create menu sections with their courses in bulk"),
+    operation_description=_(
+        "Create a list of menu sections, each with a nested list of courses, in "
+        "a single transaction. If any section or course is invalid, nothing is "
+        "created."
+    ),
+    request_body=MenuSectionTreeSerializer(many=True),
+    responses={
+        201: openapi.Response(_("Created sections"), schema=MenuSectionTreeSerializer(many=True)),
+        400: openapi.Response(_("Invalid data, errors are listed for each section")),
+        403: openapi.Response(_("No permission to edit one of the menus")),
+    }
+)
+
+
+swagger_section_publish = swagger_auto_schema(
+    operation_summary=_("Publish or unpublish menu sections"),
+    operation_description=_(
+        "Publish or unpublish a list of menu sections and update the visibility "
+        "of their courses"
+    ),
+    request_body=MenuSectionPublishSerializer(),
+    responses={
+        204: openapi.Response(_("Sections updated")),
+        400: openapi.Response(_("Invalid or unknown identifiers")),
+        403: openapi.Response(_("No permission to edit one of the menus")),
+    }
+)
+
+
+swagger_menu_import = swagger_auto_schema(
+    operation_summary=_("Import sections and courses into a menu from a file"),
+    operation_description=_(
+        "Add sections and courses from a JSON Lines or CSV file to the menu in a "
+        "single transaction. If any row is invalid, nothing is added and the "
+        "errors are reported with row numbers."
+    ),
+    manual_parameters=[
+        openapi.Parameter(
+            'file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True,
+            description=_("The file to import")
+        ),
+        openapi.Parameter(
+            'data_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['csv', 'jsonl'],
+            description=_("The file format, by default it is guessed from the file name")
+        ),
+    ],
+    request_body=no_body,
+    responses={
+        200: openapi.Response(_("Import report")),
+        400: openapi.Response(_("Invalid file, the report lists errors for each row")),
+        403: openapi.Response(_("No permission to edit the menu")),
+    }
+)
+
+
+# Параметр формата выгрузки меню
+export_format_parameter = openapi.Parameter(
+    'data_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['jsonl', 'csv'],
+    description=_("The file format, JSON Lines by default")
+)
+
+
+swagger_menu_export = swagger_auto_schema(
+    operation_summary=_("Export the menu to a file"),
+    operation_description=_(
+        "Stream the menu with all its sections (including empty ones), courses "
+        "and translations as a JSON Lines or CSV file, one menu, section or "
+        "course record per line. The file can be imported into another menu."
+    ),
+    manual_parameters=[export_format_parameter],
+    responses={
+        200: openapi.Response(_("The exported file")),
+        400: openapi.Response(_("Unknown data format")),
+        403: openapi.Response(_("No permission to export the menu")),
+    }
+)
+
+
+swagger_menu_clone = swagger_auto_schema(
+    operation_summary=_("Clone the menu"),
+    operation_description=_(
+        "Create an unpublished copy of the menu with all its sections, courses "
+        "and translations"
+    ),
+    request_body=no_body,
+    responses={
+        201: openapi.Response(_("The copy of the menu"), schema=MenuSerializer()),
+        403: openapi.Response(_("No permission to edit the menu")),
+        404: openapi.Response(_("Menu not found")),
+    }
+)
+
+
+# Итоговые значения цен блюд
+price_stats_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        name: openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DECIMAL)
+        for name in ('total', 'min', 'max', 'avg')
+    }
+)
+
+
+swagger_course_adjust_prices = swagger_auto_schema(
+    operation_summary=_("Change course prices in bulk"),
+    operation_description=_(
+        "Change the prices of all courses of a restaurant (optionally of one of "
+        "its menus) or, if no restaurant is given, of all restaurants owned by "
+        "the user, by a percentage or a fixed amount with rounding to a multiple "
+        "of rounding_step. All prices are changed with a single query. With "
+        "dry_run the prices are not changed and only the statistics are returned."
+    ),
+    request_body=PriceAdjustmentSerializer(),
+    responses={
+        200: openapi.Response(
+            _("Price statistics before and after the change"),
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'courses': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'restaurants': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'dry_run': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                    'before': price_stats_schema,
+                    'after': price_stats_schema,
+                }
+            )
+        ),
+        400: openapi.Response(_("Invalid data")),
+        403: openapi.Response(_("No permission to edit the menus of the restaurant")),
+    }
+)
@@ -2,9 +2,23 @@
 Тесты для API для работы с меню
 """
 
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
 from restaurants.tests._fixtures import BaseTestCase
 
-from menus.models import Menu
+from menus.cloning import clone_menu
+from menus.exporting import iter_courses
+from menus.models import Menu, MenuCourse, MenuSection
 
 
 class MenuListTest(BaseTestCase):
@@ -77,6 +91,33 @@ class MenuListTest(BaseTestCase):
         self.assertEqual(len(info['results']), 3)
 
 
+class MenuSparseFieldsTest(BaseTestCase):
+    """
+    Тесты для выбора выводимых полей меню параметрами fields и expand
+    """
+
+    URL = '/api/v1/menu/'
+
+    def test_no_expand(self):
+        """С пустым параметром expand разделы и блюда меню не выводятся и не загружаются"""
+        # Число меню, меню и их переводы
+        with self.assertNumQueries(3):
+            ans = self.client.get(self.URL, {'expand': ''})
+        self.assertEqual(ans.status_code, 200)
+        for item in ans.json()['results']:
+            self.assertEqual(set(item), {'id', 'translations', 'restaurant', 'published'})
+
+    def test_expand(self):
+        """Выводятся только перечисленные вложенные объекты"""
+        menu = self._data['cheap_menu']
+        ans = self.client.get(f"{self.URL}{menu.pk}/", {'fields': 'id', 'expand': 'sections'})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(set(info), {'id', 'sections'})
+        self.assertEqual(len(info['sections']), 2)
+        self.assertIn('published_courses', info['sections'][0])
+
+
 class PublishedMenuRetrieveTest(BaseTestCase):
     """
     Тесты для API получения информации об определенном опубликованном меню
@@ -883,6 +924,42 @@ class InactiveMenuPartialUpdateTest(BaseTestCase):
         self.__verify_inactive_menu_changed()
 
 
+class MenuPublishConflictTest(BaseTestCase):
+    """
+    Тесты одновременной публикации двух меню ресторана. Другое меню успевает
+    стать опубликованным после того, как публикация с меню ресторана снята, что
+    имитируется отменой запроса UPDATE, снимающего публикацию.
+    """
+
+    def __publish(self, method, url, data):
+        """Выполнить запрос от имени работника ресторана при одновременной публикации"""
+        with self.logged_in('cheap_worker'), mock.patch(
+            'django.db.models.query.QuerySet.update', return_value=0
+        ):
+            return getattr(self.client, method)(url, data, format='json')
+
+    def test_partial_update(self):
+        """Публикация существующего меню возвращает ошибку 409"""
+        ans = self.__publish(
+            'patch', f"/api/v1/menu/{self._data['inactive_menu'].pk}/", {'published': True}
+        )
+        self.assertEqual(ans.status_code, 409)
+        self.assertIn('detail', ans.json())
+        self.assertTrue(Menu.objects.get(pk=self._data['cheap_menu'].pk).published)
+        self.assertFalse(Menu.objects.get(pk=self._data['inactive_menu'].pk).published)
+
+    def test_create(self):
+        """Создание опубликованного меню возвращает ошибку 409"""
+        ans = self.__publish('post', "/api/v1/menu/", {
+            'translations': {'en': {'title': "Winter menu"}},
+            'restaurant': self._data['cheap_restaurant'].pk,
+            'published': True,
+        })
+        self.assertEqual(ans.status_code, 409)
+        self.assertIn('detail', ans.json())
+        self.assertEqual(Menu.objects.count(), 3)
+
+
 class MenuDeleteTest(BaseTestCase):
     """
     Тесты для API удаления меню
@@ -963,3 +1040,488 @@ class MenuDeleteTest(BaseTestCase):
         # Проверить, что меню удалено
         self.assertEqual(Menu.objects.count(), 2)
         self.assertFalse(Menu.objects.filter(pk=self._data['inactive_menu'].pk).exists())
+
+
+class MenuPublishSwitchTest(BaseTestCase):
+    """
+    Тесты для переключения опубликованного меню ресторана
+    """
+
+    def test_single_update(self):
+        """Публикация с других меню снимается одним запросом без их загрузки"""
+        for number in range(10):
+            Menu.objects.create(restaurant=self._data['cheap_restaurant'], title=f"Old menu {number}")
+        menu = self._data['inactive_menu']
+        menu.published = True
+        with CaptureQueriesContext(connection) as queries:
+            menu.save()
+        sql = [item['sql'] for item in queries.captured_queries]
+        self.assertEqual(len([item for item in sql if item.startswith('UPDATE "menus_menu" ')]), 2)
+        self.assertFalse([item for item in sql if item.startswith('SELECT "menus_menu"."id"')])
+        self.assertEqual(
+            list(Menu.objects.filter(restaurant=self._data['cheap_restaurant'], published=True)),
+            [menu]
+        )
+        self.assertFalse(MenuSection.objects.filter(menu=self._data['cheap_menu'], effective_published=True).exists())
+        self.assertFalse(MenuCourse.objects.filter(menu=self._data['cheap_menu'], effective_published=True).exists())
+        self.assertTrue(MenuSection.objects.get(pk=self._data['inactive_section'].pk).effective_published)
+
+    def test_constraint(self):
+        """База данных не допускает двух опубликованных меню одного ресторана"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Menu.objects.filter(restaurant=self._data['cheap_restaurant']).update(published=True)
+        self.assertFalse(Menu.objects.get(pk=self._data['inactive_menu'].pk).published)
+
+    def test_form_validation(self):
+        """Ограничение не мешает опубликовать другое меню через форму"""
+        menu = self._data['inactive_menu']
+        menu.published = True
+        menu.full_clean()
+        menu.save()
+        self.assertFalse(Menu.objects.get(pk=self._data['cheap_menu'].pk).published)
+
+
+class MenuImportTest(BaseTestCase):
+    """
+    Тесты для импорта разделов и блюд меню из файла
+    -----------------------------------------------
+
+    Добавляет разделы и блюда в неактивное меню дешевого ресторана. Сделать это
+    могут только сотрудник или владелец дешевого ресторана либо администратор.
+    """
+
+    CSV_DATA = (
+        "section_en,section_ru,title_en,title_ru,composition_ru,price,cooking_time,published,options\n"
+        "Soups,Супы,Borscht,Борщ,Свекла,350.00,00:15:00,true,\n"
+        "Soups,Супы,Solyanka,Солянка,,400.00,,false,\"{\"\"spicy\"\": true}\"\n"
+        ",,Bread,Хлеб,,20.00,,true,\n"
+    )
+
+    def __get_url(self, data_format=None):
+        url = f"/api/v1/menu/{self._data['inactive_menu'].pk}/import/"
+        if data_format:
+            url += f"?data_format={data_format}"
+        return url
+
+    def __post(self, name, content, data_format=None):
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post(self.__get_url(data_format), {'file': upload}, format='multipart')
+
+    @staticmethod
+    def __json_lines(rows):
+        return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+    @staticmethod
+    def __course(number, section="Drinks"):
+        return {
+            'section': {'en': section} if section else None,
+            'translations': {'en': {'title': f"Course {number}"}},
+            'price': f"{number}.00",
+        }
+
+    def test_unauthorized(self):
+        """Неавторизованный пользователь не может импортировать блюда"""
+        ans = self.__post('menu.csv', self.CSV_DATA)
+        self.assertEqual(ans.status_code, 401)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_premium_owner(self):
+        """Хозяин другого ресторана не может импортировать блюда"""
+        with self.logged_in('premium_owner'):
+            ans = self.__post('menu.csv', self.CSV_DATA)
+        self.assertEqual(ans.status_code, 404)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_published_menu(self):
+        """Посторонний пользователь не может импортировать блюда в опубликованное меню"""
+        upload = SimpleUploadedFile('menu.csv', self.CSV_DATA.encode('utf-8'))
+        with self.logged_in('some_user'):
+            ans = self.client.post(
+                f"/api/v1/menu/{self._data['cheap_menu'].pk}/import/", {'file': upload}, format='multipart'
+            )
+        self.assertEqual(ans.status_code, 403)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_csv(self):
+        """Работник ресторана импортирует блюда из CSV"""
+        menu = self._data['inactive_menu']
+        with self.logged_in('cheap_worker'):
+            ans = self.__post('menu.csv', self.CSV_DATA)
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['rows'], 3)
+        self.assertEqual(ans.data['sections'], 1)
+        self.assertEqual(ans.data['courses'], 3)
+        self.assertEqual(ans.data['errors'], [])
+        self.assertIn('write', ans.data['timings'])
+        section = MenuSection.objects.exclude(pk=self._data['inactive_section'].pk).get(menu=menu)
+        self.assertEqual(section.safe_translation_getter('title', language_code='ru'), "Супы")
+        borscht = MenuCourse.objects.get(translations__title="Borscht")
+        self.assertEqual(borscht.section, section)
+        self.assertEqual(str(borscht.price), "350.00")
+        self.assertEqual(borscht.safe_translation_getter('composition', language_code='ru'), "Свекла")
+        self.assertTrue(borscht.published)
+        # Меню не опубликовано, поэтому его блюда не видны посетителям
+        self.assertFalse(borscht.effective_published)
+        solyanka = MenuCourse.objects.get(translations__title="Solyanka")
+        self.assertEqual(solyanka.options, {'spicy': True})
+        self.assertFalse(solyanka.published)
+        bread = MenuCourse.objects.get(translations__title="Bread")
+        self.assertIsNone(bread.section)
+        self.assertEqual(bread.menu, menu)
+
+    def test_json_lines(self):
+        """Хозяин ресторана импортирует блюда из JSON Lines, формат задан параметром"""
+        rows = [self.__course(number, "Drinks" if number % 2 else "Desserts") for number in range(1, 11)]
+        with self.logged_in('cheap_owner'):
+            ans = self.__post('menu.txt', self.__json_lines(rows), data_format='jsonl')
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['sections'], 2)
+        self.assertEqual(ans.data['courses'], 10)
+        self.assertEqual(MenuCourse.objects.filter(menu=self._data['inactive_menu']).count(), 10)
+
+    def test_errors(self):
+        """При ошибках в строках файла ничего не добавляется, ошибки указаны по номерам строк"""
+        rows = [self.__course(1), {'price': "1.00"}, self.__course(3)]
+        content = self.__json_lines(rows) + "not json\n"
+        with self.logged_in('cheap_owner'):
+            ans = self.__post('menu.jsonl', content)
+        self.assertEqual(ans.status_code, 400)
+        self.assertEqual([error['row'] for error in ans.data['errors']], [4, 2])
+        self.assertIn('translations', ans.data['errors'][1]['errors'])
+        self.assertEqual(ans.data['courses'], 0)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+        self.assertEqual(MenuSection.objects.count(), 3)
+
+    def test_record_types(self):
+        """Записи меню пропускаются, записи разделов создают разделы, в том числе без блюд"""
+        rows = [
+            {'type': 'menu', 'id': 1, 'translations': {'en': {'title': "Menu"}}, 'published': True},
+            {'type': 'section', 'id': 2, 'menu': 1, 'section': {'en': "Drinks"}, 'published': True},
+            {'type': 'section', 'id': 3, 'menu': 1, 'section': {'en': "Specials"}, 'published': False},
+            dict(self.__course(1), type='course'),
+        ]
+        with self.logged_in('cheap_owner'):
+            ans = self.__post('menu.jsonl', self.__json_lines(rows))
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['rows'], 4)
+        self.assertEqual(ans.data['sections'], 2)
+        self.assertEqual(ans.data['courses'], 1)
+        specials = MenuSection.objects.get(menu=self._data['inactive_menu'], translations__title="Specials")
+        self.assertFalse(specials.published)
+        self.assertFalse(specials.courses.exists())
+        drinks = MenuSection.objects.get(menu=self._data['inactive_menu'], translations__title="Drinks")
+        self.assertTrue(drinks.published)
+        self.assertEqual(drinks.courses.count(), 1)
+
+    def test_record_errors(self):
+        """Неизвестный тип записи и запись раздела без названия - ошибки"""
+        rows = [
+            {'type': 'restaurant', 'id': 1},
+            {'type': 'section', 'id': 2, 'published': True},
+            {'type': 'section', 'id': 3, 'section': {'en': "Soups"}, 'published': "maybe"},
+        ]
+        with self.logged_in('cheap_owner'):
+            ans = self.__post('menu.jsonl', self.__json_lines(rows))
+        self.assertEqual(ans.status_code, 400)
+        self.assertEqual(
+            [(error['row'], list(error['errors'])) for error in ans.data['errors']],
+            [(1, ['type']), (2, ['section']), (3, ['published'])]
+        )
+        self.assertEqual(MenuSection.objects.count(), 3)
+
+    def test_errors_rollback_written_batches(self):
+        """Ошибка в последней пачке отменяет запись предыдущих"""
+        rows = [self.__course(number) for number in range(1, 6)] + [{'price': "bad"}]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as stream:
+            stream.write(self.__json_lines(rows))
+        try:
+            with self.assertRaises(CommandError):
+                call_command(
+                    'import_menu', str(self._data['inactive_menu'].pk), stream.name,
+                    '--batch-size', '2', stdout=StringIO(), stderr=StringIO()
+                )
+        finally:
+            os.unlink(stream.name)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+        self.assertEqual(MenuSection.objects.count(), 3)
+
+    def test_unknown_format(self):
+        """Формат файла должен быть известен"""
+        with self.logged_in('cheap_owner'):
+            ans = self.__post('menu.xml', self.CSV_DATA)
+        self.assertEqual(ans.status_code, 400)
+        self.assertIn('data_format', ans.data)
+
+    def test_batched_queries(self):
+        """Число запросов зависит от числа пачек, а не от числа строк"""
+        rows = [self.__course(number, f"Section {number % 3}") for number in range(1, 2001)]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as stream:
+            stream.write(self.__json_lines(rows))
+        out = StringIO()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                call_command('import_menu', str(self._data['inactive_menu'].pk), stream.name, stdout=out)
+        finally:
+            os.unlink(stream.name)
+        self.assertIn("courses: 2000", out.getvalue())
+        self.assertLess(len(queries), 40)
+        self.assertEqual(MenuCourse.objects.filter(menu=self._data['inactive_menu']).count(), 2000)
+        self.assertEqual(MenuSection.objects.filter(menu=self._data['inactive_menu']).count(), 4)
+
+
+class MenuExportTest(BaseTestCase):
+    """
+    Тесты для выгрузки меню в файл
+    ------------------------------
+
+    Выгружает меню дешевого ресторана. Сделать это могут только сотрудник или
+    владелец дешевого ресторана либо администратор, даже если меню опубликовано.
+    """
+
+    def __get_url(self, menu='cheap_menu', data_format=None):
+        url = f"/api/v1/menu/{self._data[menu].pk}/export/"
+        if data_format:
+            url += f"?data_format={data_format}"
+        return url
+
+    @staticmethod
+    def __content(ans):
+        return b''.join(ans.streaming_content).decode('utf-8')
+
+    def test_unauthorized(self):
+        """Неавторизованный пользователь не может выгрузить меню"""
+        ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.status_code, 401)
+
+    def test_premium_owner(self):
+        """Хозяин другого ресторана не может выгрузить даже опубликованное меню"""
+        with self.logged_in('premium_owner'):
+            ans = self.client.get(self.__get_url())
+            self.assertEqual(ans.status_code, 403)
+            ans = self.client.get(self.__get_url('inactive_menu'))
+            self.assertEqual(ans.status_code, 404)
+
+    def test_json_lines(self):
+        """Работник ресторана выгружает меню в JSON Lines"""
+        menu = self._data['cheap_menu']
+        with self.logged_in('cheap_worker'):
+            ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.status_code, 200)
+        self.assertTrue(ans.streaming)
+        self.assertIn('menu_', ans['Content-Disposition'])
+        rows = [json.loads(line) for line in self.__content(ans).splitlines()]
+        # Сначала меню, затем его разделы и блюда
+        self.assertEqual(
+            [row['type'] for row in rows],
+            ['menu'] + ['section'] * menu.sections.count() + ['course'] * menu.courses.count()
+        )
+        self.assertEqual(
+            rows[0],
+            {
+                'type': 'menu',
+                'id': menu.pk,
+                'translations': {'en': {'title': "Menu"}, 'ru': {'title': "Меню"}},
+                'published': True,
+            }
+        )
+        self.assertIn(
+            {
+                'type': 'section',
+                'id': self._data['drinks_section'].pk,
+                'menu': menu.pk,
+                'section': {'en': "Drinks", 'ru': "Напитки"},
+                'published': True,
+            },
+            rows
+        )
+        courses = [row for row in rows if row['type'] == 'course']
+        self.assertEqual(
+            sorted(row['id'] for row in courses),
+            sorted(MenuCourse.objects.filter(menu=menu).values_list('pk', flat=True))
+        )
+        row = next(row for row in courses if row['id'] == self._data['sparkling_water'].pk)
+        course = MenuCourse.objects.get(pk=self._data['sparkling_water'].pk)
+        self.assertEqual(row['menu'], menu.pk)
+        self.assertEqual(row['price'], str(course.price))
+        self.assertEqual(
+            row['translations']['en']['title'],
+            course.safe_translation_getter('title', language_code='en')
+        )
+        self.assertEqual(
+            row['section']['en'],
+            self._data['drinks_section'].safe_translation_getter('title', language_code='en')
+        )
+
+    def test_csv_round_trip(self):
+        """Выгруженный в CSV файл импортируется в другое меню"""
+        count = MenuCourse.objects.filter(menu=self._data['cheap_menu']).count()
+        with self.logged_in('cheap_owner'):
+            ans = self.client.get(self.__get_url(data_format='csv'))
+            self.assertEqual(ans.status_code, 200)
+            self.assertTrue(ans['Content-Type'].startswith('text/csv'))
+            upload = SimpleUploadedFile('menu.csv', b''.join(ans.streaming_content))
+            ans = self.client.post(
+                f"/api/v1/menu/{self._data['inactive_menu'].pk}/import/", {'file': upload}, format='multipart'
+            )
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['courses'], count)
+        self.assertEqual(MenuCourse.objects.filter(menu=self._data['inactive_menu']).count(), count)
+
+    def test_csv_round_trip_sections(self):
+        """Разделы без блюд и признаки публикации разделов переносятся через CSV"""
+        menu = self._data['cheap_menu']
+        empty = MenuSection.objects.create(menu=menu, title="Specials", published=False)
+        empty.set_current_language('ru')
+        empty.title = "Особые блюда"
+        empty.save()
+        with self.logged_in('cheap_owner'):
+            ans = self.client.get(self.__get_url(data_format='csv'))
+            content = b''.join(ans.streaming_content)
+            upload = SimpleUploadedFile('menu.csv', content)
+            ans = self.client.post(
+                f"/api/v1/menu/{self._data['inactive_menu'].pk}/import/", {'file': upload}, format='multipart'
+            )
+        self.assertTrue(content.startswith(b'type,id,menu,'))
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['sections'], menu.sections.count())
+        copy = MenuSection.objects.get(menu=self._data['inactive_menu'], translations__title="Особые блюда")
+        self.assertFalse(copy.published)
+        self.assertEqual(copy.safe_translation_getter('title', language_code='en'), "Specials")
+        self.assertFalse(copy.courses.exists())
+
+    def test_unknown_format(self):
+        """Формат файла должен быть известен"""
+        with self.logged_in('admin'):
+            ans = self.client.get(self.__get_url(data_format='xml'))
+        self.assertEqual(ans.status_code, 400)
+
+    def test_chunked_queries(self):
+        """Блюда читаются пачками: запросы выполняются по мере чтения"""
+        menus = Menu.objects.filter(pk=self._data['cheap_menu'].pk)
+        with CaptureQueriesContext(connection) as queries:
+            courses = iter_courses(menus, chunk_size=2)
+            next(courses)
+            first = len(queries)
+            rows = 1 + len(list(courses))
+        self.assertEqual(rows, MenuCourse.objects.filter(menu__in=menus).count())
+        # Названия разделов, первая пачка блюд и ее переводы
+        self.assertEqual(first, 3)
+        self.assertGreater(len(queries), first)
+
+
+class MenuCloneTest(BaseTestCase):
+    """
+    Тесты для копирования меню
+    --------------------------
+
+    Копирует опубликованное меню дешевого ресторана. Сделать это могут только
+    сотрудник или владелец дешевого ресторана либо администратор.
+    """
+
+    def __get_url(self):
+        return f"/api/v1/menu/{self._data['cheap_menu'].pk}/clone/"
+
+    @staticmethod
+    def __tree(menu):
+        """Разделы и блюда меню с переводами без первичных ключей"""
+        sections = {
+            section.pk: sorted(section.translations.values_list('language_code', 'title'))
+            for section in MenuSection.objects.filter(menu=menu)
+        }
+        return sorted(
+            (
+                str(sections.get(course.section_id)),
+                sorted(course.translations.values_list('language_code', 'title', 'composition')),
+                course.price,
+                course.published,
+                course.cooking_time,
+                str(course.options),
+            )
+            for course in MenuCourse.objects.filter(menu=menu)
+        ), sorted(map(str, sections.values()))
+
+    def test_unauthorized(self):
+        """Неавторизованный пользователь не может копировать меню"""
+        ans = self.client.post(self.__get_url())
+        self.assertEqual(ans.status_code, 401)
+        self.assertEqual(Menu.objects.count(), 3)
+
+    def test_premium_owner(self):
+        """Хозяин другого ресторана не может копировать меню"""
+        with self.logged_in('premium_owner'):
+            ans = self.client.post(self.__get_url())
+        self.assertEqual(ans.status_code, 403)
+        self.assertEqual(Menu.objects.count(), 3)
+
+    def test_cheap_worker(self):
+        """Работник ресторана копирует меню своего ресторана"""
+        menu = self._data['cheap_menu']
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.__get_url())
+        self.assertEqual(ans.status_code, 201)
+        clone = Menu.objects.get(pk=ans.data['id'])
+        self.assertEqual(clone.restaurant_id, menu.restaurant_id)
+        self.assertFalse(clone.published)
+        self.assertTrue(Menu.objects.get(pk=menu.pk).published)
+        self.assertEqual(
+            sorted(clone.translations.values_list('language_code', 'title')),
+            sorted(menu.translations.values_list('language_code', 'title'))
+        )
+        self.assertEqual(self.__tree(clone), self.__tree(menu))
+        # Разделы копии относятся к копии, а ее блюда не видны посетителям
+        self.assertFalse(MenuCourse.objects.filter(menu=clone).exclude(
+            section__isnull=True
+        ).exclude(section__menu=clone).exists())
+        self.assertFalse(MenuCourse.objects.filter(menu=clone, effective_published=True).exists())
+        self.assertFalse(MenuSection.objects.filter(menu=clone, effective_published=True).exists())
+
+    def test_fixed_queries(self):
+        """Число запросов не зависит от числа разделов и блюд"""
+        menu = self._data['cheap_menu']
+        with CaptureQueriesContext(connection) as queries:
+            clone_menu(menu)
+        expected = len(queries)
+        for number in range(10):
+            section = MenuSection.objects.create(menu=menu, title=f"Section {number}")
+            for course in range(10):
+                MenuCourse.objects.create(menu=menu, section=section, title=f"Course {course}", price=course)
+        with CaptureQueriesContext(connection) as queries:
+            clone = clone_menu(menu)
+        self.assertEqual(len(queries), expected)
+        self.assertEqual(self.__tree(clone), self.__tree(menu))
+
+    def test_interleaved_rows(self):
+        """
+        Ссылки блюд на разделы переназначаются на копии тех же разделов, даже
+        если разделы и блюда меню перемежаются строками других меню, а блюда
+        ссылаются на разделы не в порядке их создания
+        """
+        menu = self._data['cheap_menu']
+        other = self._data['premium_menu']
+        sections = []
+        for number in range(3):
+            sections.append(MenuSection.objects.create(menu=menu, title=f"Section {number}"))
+            MenuSection.objects.create(menu=other, title=f"Other {number}")
+        for number, section in enumerate(reversed(sections)):
+            MenuCourse.objects.create(menu=other, title=f"Other {number}", price=number)
+            MenuCourse.objects.create(menu=menu, section=section, title=f"Course {number}", price=number)
+        clone = clone_menu(menu)
+        self.assertEqual(self.__tree(clone), self.__tree(menu))
+        self.assertCountEqual(
+            MenuCourse.objects.filter(menu=clone, section__isnull=False).values_list(
+                'translations__title', 'section__translations__title'
+            ),
+            MenuCourse.objects.filter(menu=menu, section__isnull=False).values_list(
+                'translations__title', 'section__translations__title'
+            )
+        )
+
+    def test_deleted_keys_not_reused(self):
+        """Копии не получают первичные ключи удаленных строк"""
+        menu = self._data['cheap_menu']
+        deleted = MenuCourse.objects.create(menu=menu, title="Deleted", price=1)
+        deleted_pk = deleted.pk
+        deleted.delete()
+        clone = clone_menu(menu)
+        self.assertTrue(MenuCourse.objects.filter(menu=clone).exists())
+        self.assertFalse(MenuCourse.objects.filter(menu=clone, pk__lte=deleted_pk).exists())
@@ -4,7 +4,15 @@
 
 import datetime
 
-from menus.models import MenuCourse
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from menu_backend.pagination import EstimatedCountPagination
+
+from menus.models import MenuCourse, MenuSection
 from restaurants.tests._fixtures import BaseTestCase
 
 
@@ -79,6 +87,227 @@ class MenuCourseListTest(BaseTestCase):
         self.assertEqual(len(info['results']), 4)
 
 
+class MenuCourseVisibilityQueryTest(BaseTestCase):
+    """
+    Тесты для условия видимости блюд сотрудникам ресторанов
+    """
+
+    def test_single_query(self):
+        """Рестораны сотрудника выбираются подзапросом в запросе блюд"""
+        with self.logged_in('cheap_worker'):
+            # Число блюд, блюда и их переводы
+            with self.assertNumQueries(3) as queries:
+                ans = self.client.get('/api/v1/menu_courses/')
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['count'], 4)
+        self.assertIn('restaurants_restaurantstaff', queries.captured_queries[0]['sql'])
+        self.assertIn('restaurants_restaurantstaff', queries.captured_queries[1]['sql'])
+
+
+class MenuCourseEffectivePublishedTest(BaseTestCase):
+    """
+    Тесты для поддержки поля effective_published блюд и разделов меню
+    """
+
+    URL = '/api/v1/menu_courses/'
+
+    def __visible_ids(self):
+        """Первичные ключи блюд, которые видит неавторизованный пользователь"""
+        ans = self.client.get(self.URL)
+        self.assertEqual(ans.status_code, 200)
+        return {item['id'] for item in ans.json()['results']}
+
+    def test_initial(self):
+        """Поле заполняется при создании блюд"""
+        self.assertEqual(
+            set(MenuCourse.objects.filter(effective_published=True).values_list('pk', flat=True)),
+            {self._data[name].pk for name in ('sparkling_water', 'still_water', 'chocolate_sandwich')}
+        )
+
+    def test_section_unpublished(self):
+        """Блюда неопубликованного раздела не видны посторонним"""
+        section = self._data['drinks_section']
+        section.published = False
+        section.save()
+        self.assertEqual(self.__visible_ids(), {self._data['chocolate_sandwich'].pk})
+        ans = self.client.get(f"{self.URL}{self._data['still_water'].pk}/")
+        self.assertEqual(ans.status_code, 404)
+        ans = self.client.get(f"/api/v1/menu_sections/{section.pk}/")
+        self.assertEqual(ans.status_code, 404)
+        section.published = True
+        section.save()
+        self.assertEqual(len(self.__visible_ids()), 3)
+
+    def test_menu_unpublished(self):
+        """Блюда и разделы неопубликованного меню не видны посторонним"""
+        menu = self._data['cheap_menu']
+        menu.published = False
+        menu.save()
+        self.assertEqual(self.__visible_ids(), set())
+        self.assertFalse(MenuSection.objects.filter(menu=menu, effective_published=True).exists())
+        menu.published = True
+        menu.save()
+        self.assertEqual(len(self.__visible_ids()), 3)
+
+    def test_section_deleted(self):
+        """Блюда удаленного неопубликованного раздела остаются в меню без раздела"""
+        section = self._data['drinks_section']
+        section.published = False
+        section.save()
+        section.delete()
+        self.assertEqual(len(self.__visible_ids()), 3)
+
+    def test_course_without_section(self):
+        """Блюдо без раздела доступно по первичному ключу"""
+        course = self._data['still_water']
+        course.section = None
+        course.save()
+        ans = self.client.get(f"{self.URL}{course.pk}/")
+        self.assertEqual(ans.status_code, 200)
+        self.assertIsNone(ans.json()['section'])
+
+
+def create_courses(test_data, count=60):
+    """
+    Добавляет в дешевое меню count опубликованных блюд, половина из которых
+    входит в раздел десертов
+    """
+    CourseTranslation = MenuCourse._parler_meta.root_model
+    courses = MenuCourse.objects.bulk_create([
+        MenuCourse(
+            menu=test_data['cheap_menu'],
+            section=test_data['desserts_section'] if number % 2 else None,
+            price=number,
+            published=True
+        )
+        for number in range(count)
+    ])
+    CourseTranslation.objects.bulk_create([
+        CourseTranslation(master=course, language_code='en', title=f"Course {course.pk}")
+        for course in courses
+    ])
+    MenuCourse.update_effective_published(MenuCourse.objects.filter(pk__in=[course.pk for course in courses]))
+
+
+class MenuCourseCursorPaginationTest(BaseTestCase):
+    """
+    Тесты для выдачи списка блюд по курсору
+    """
+
+    URL = '/api/v1/menu_courses/'
+
+    def setUp(self):
+        super().setUp()
+        create_courses(self._data)
+
+    def __collect(self, params):
+        """Проходит по всем страницам выдачи по курсору и возвращает список страниц"""
+        pages = []
+        url = self.URL
+        while url:
+            ans = self.client.get(url, params)
+            self.assertEqual(ans.status_code, 200)
+            info = ans.json()
+            self.assertNotIn('count', info)
+            pages.append([item['id'] for item in info['results']])
+            url, params = info['next'], None
+        return pages
+
+    def test_all_pages(self):
+        """Выдача по курсору возвращает те же блюда, что и выдача по номерам страниц"""
+        pages = self.__collect({'pagination': 'cursor'})
+        ids = [pk for page in pages for pk in page]
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(
+            ids,
+            list(MenuCourse.objects.filter(menu__published=True, published=True).values_list('pk', flat=True))
+        )
+
+    def test_filters(self):
+        """Фильтры применяются до разбиения на страницы"""
+        section = self._data['desserts_section']
+        pages = self.__collect({'pagination': 'cursor', 'section': section.pk})
+        ids = [pk for page in pages for pk in page]
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(
+            ids,
+            list(MenuCourse.objects.filter(section=section, published=True).values_list('pk', flat=True))
+        )
+
+    def test_no_offset(self):
+        """Следующая страница выбирается по первичному ключу, а не пропуском строк"""
+        info = self.client.get(self.URL, {'pagination': 'cursor'}).json()
+        with self.assertNumQueries(2) as queries:
+            ans = self.client.get(info['next'])
+        self.assertEqual(ans.status_code, 200)
+        self.assertNotIn('OFFSET', queries.captured_queries[0]['sql'])
+        self.assertEqual(len(ans.json()['results']), 20)
+
+    def test_empty_cursor(self):
+        """Пустой курсор соответствует первой странице"""
+        first = self.client.get(self.URL, {'pagination': 'cursor'}).json()
+        ans = self.client.get(self.URL, {'pagination': 'cursor', 'cursor': ''})
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['results'], first['results'])
+
+    def test_unknown_mode(self):
+        """Неизвестный режим выдачи - ошибка в запросе"""
+        ans = self.client.get(self.URL, {'pagination': 'everything'})
+        self.assertEqual(ans.status_code, 400)
+
+
+class MenuCourseCountFreePaginationTest(BaseTestCase):
+    """
+    Тесты для выдачи списка блюд по номерам страниц без точного числа блюд
+    """
+
+    URL = '/api/v1/menu_courses/'
+
+    def setUp(self):
+        super().setUp()
+        create_courses(self._data)
+
+    def test_nocount(self):
+        """Без подсчета блюд ответ содержит только ссылки на соседние страницы"""
+        # Блюда страницы вместе со следующим и их переводы
+        with self.assertNumQueries(2):
+            ans = self.client.get(self.URL, {'pagination': 'nocount'})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(set(info), {'next', 'previous', 'results'})
+        self.assertEqual(len(info['results']), 20)
+        self.assertIsNone(info['previous'])
+        self.assertIn('page=2', info['next'])
+        ans = self.client.get(self.URL, {'pagination': 'nocount', 'page': 4})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(len(info['results']), 3)
+        self.assertIsNone(info['next'])
+        self.assertIn('page=3', info['previous'])
+        ans = self.client.get(self.URL, {'pagination': 'nocount', 'page': 5})
+        self.assertEqual(ans.status_code, 404)
+
+    def test_estimate(self):
+        """Небольшое число блюд подсчитывается точно"""
+        ans = self.client.get(self.URL, {'pagination': 'estimate', 'section': self._data['desserts_section'].pk})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(info['count'], 31)
+        self.assertFalse(info['count_estimated'])
+        self.assertEqual(len(info['results']), 20)
+
+    def test_estimate_limit(self):
+        """Блюда подсчитываются не дальше предела"""
+        with patch.object(EstimatedCountPagination, 'count_limit', 50):
+            ans = self.client.get(self.URL, {'pagination': 'estimate', 'page': 4})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(info['count'], 50)
+        self.assertTrue(info['count_estimated'])
+        self.assertEqual(len(info['results']), 3)
+        self.assertIsNone(info['next'])
+
+
 class PublishedMenuCourseRetrieveTest(BaseTestCase):
     """
     Тесты для API получения информации об определенном опубликованном блюде
@@ -474,3 +703,343 @@ class PublishedMenuCourseUpdateTest(BaseTestCase):
             ans = self.__put_new_course_data()
         self.assertEqual(ans.status_code, 200)
         self.__verify_course_changed()
+
+
+class MenuCourseSectionOfAnotherMenuTest(BaseTestCase):
+    """
+    Тесты для API добавления и изменения одного блюда: раздел блюда должен
+    относиться к тому же меню, что и блюдо, даже если оба меню принадлежат
+    ресторану пользователя
+    """
+
+    def __get_url(self, pk=None):
+        if pk is None:
+            return '/api/v1/menu_courses/'
+        return f'/api/v1/menu_courses/{pk}/'
+
+    def __verify_section_error(self, ans):
+        """Проверить, что запрос отклонен из-за раздела другого меню"""
+        self.assertEqual(ans.status_code, 400)
+        self.assertEqual(ans.json(), {'section': ["The section belongs to another menu"]})
+
+    def test_create(self):
+        """Нельзя добавить блюдо в раздел другого меню"""
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.__get_url(), {
+                'translations': {'en': {'title': "Pie with jam"}},
+                'menu': self._data['cheap_menu'].pk,
+                'section': self._data['inactive_section'].pk,
+                'price': 45,
+            }, format='json')
+        self.__verify_section_error(ans)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_update(self):
+        """Нельзя перенести блюдо в раздел другого меню запросом PUT"""
+        course = self._data['chocolate_sandwich']
+        with self.logged_in('cheap_worker'):
+            ans = self.client.put(self.__get_url(course.pk), {
+                'translations': {'en': {'title': "Sandwich with chocolate butter"}},
+                'menu': self._data['cheap_menu'].pk,
+                'section': self._data['inactive_section'].pk,
+                'price': 30,
+            }, format='json')
+        self.__verify_section_error(ans)
+        self.assertEqual(MenuCourse.objects.get(pk=course.pk).section_id, self._data['desserts_section'].pk)
+
+    def test_partial_update_menu(self):
+        """Нельзя перенести блюдо в другое меню, оставив его в прежнем разделе"""
+        course = self._data['chocolate_sandwich']
+        with self.logged_in('cheap_worker'):
+            ans = self.client.patch(
+                self.__get_url(course.pk), {'menu': self._data['inactive_menu'].pk}, format='json'
+            )
+        self.__verify_section_error(ans)
+        self.assertEqual(MenuCourse.objects.get(pk=course.pk).menu_id, self._data['cheap_menu'].pk)
+
+    def test_partial_update_menu_and_section(self):
+        """Блюдо переносится в другое меню вместе с разделом этого меню"""
+        course = self._data['chocolate_sandwich']
+        with self.logged_in('cheap_worker'):
+            ans = self.client.patch(self.__get_url(course.pk), {
+                'menu': self._data['inactive_menu'].pk,
+                'section': self._data['inactive_section'].pk,
+            }, format='json')
+        self.assertEqual(ans.status_code, 200)
+        course = MenuCourse.objects.get(pk=course.pk)
+        self.assertEqual(course.menu_id, self._data['inactive_menu'].pk)
+        self.assertEqual(course.section_id, self._data['inactive_section'].pk)
+
+
+class MenuCourseBulkTest(BaseTestCase):
+    """
+    Тесты для массового создания, изменения и удаления блюд
+    """
+
+    URL = '/api/v1/menu_courses/bulk/'
+
+    def __new_courses(self, count=50, menu='cheap_menu', section='desserts_section'):
+        """Данные count новых блюд для массового добавления"""
+        return [
+            {
+                'translations': {
+                    'en': {'title': f"Pie {number}"},
+                    'ru': {'title': f"Пирожок {number}"},
+                },
+                'menu': self._data[menu].pk,
+                'section': self._data[section].pk if section else None,
+                'price': 40 + number,
+                'cooking_time': 'PT2M30S',
+            }
+            for number in range(count)
+        ]
+
+    def test_create(self):
+        """Работник ресторана добавляет блюда одним запросом"""
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.URL, self.__new_courses(), format='json')
+        self.assertEqual(ans.status_code, 201)
+        info = ans.json()
+        self.assertEqual(len(info), 50)
+        self.assertEqual(MenuCourse.objects.count(), 54)
+        course = MenuCourse.objects.get(pk=info[7]['id'])
+        self.assertEqual(course.price, 47)
+        self.assertEqual(course.section, self._data['desserts_section'])
+        self.assertEqual(course.cooking_time.total_seconds(), 150)
+        self.assertTrue(course.effective_published)
+        self.assertEqual(course.title, "Pie 7")
+        course.set_current_language('ru')
+        self.assertEqual(course.title, "Пирожок 7")
+        self.assertEqual(info[7]['translations']['ru']['title'], "Пирожок 7")
+
+    def test_create_queries(self):
+        """Число запросов к базе данных не зависит от числа блюд"""
+        with self.logged_in('cheap_worker'):
+            with self.assertNumQueries(10):
+                ans = self.client.post(self.URL, self.__new_courses(10), format='json')
+            self.assertEqual(ans.status_code, 201)
+            with self.assertNumQueries(10):
+                ans = self.client.post(self.URL, self.__new_courses(100), format='json')
+            self.assertEqual(ans.status_code, 201)
+
+    def test_create_invalid(self):
+        """Если данные одного блюда неверны, то не добавляется ни одно блюдо"""
+        courses = self.__new_courses(5)
+        courses[3]['price'] = 'free'
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.URL, courses, format='json')
+        self.assertEqual(ans.status_code, 400)
+        errors = ans.json()
+        self.assertEqual(errors[:3], [{}, {}, {}])
+        self.assertIn('price', errors[3])
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_create_foreign_section(self):
+        """Раздел блюда должен относиться к меню блюда"""
+        courses = self.__new_courses(2, section='inactive_section')
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.URL, courses, format='json')
+        self.assertEqual(ans.status_code, 400)
+        self.assertIn('section', ans.json()[0])
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_create_other_restaurant(self):
+        """Если одно из меню чужое, то не добавляется ни одно блюдо"""
+        courses = self.__new_courses(3) + self.__new_courses(2, menu='premium_menu', section=None)
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.URL, courses, format='json')
+        self.assertEqual(ans.status_code, 403)
+        with self.logged_in('admin'):
+            ans = self.client.post(self.URL, courses, format='json')
+        self.assertEqual(ans.status_code, 201)
+        self.assertEqual(MenuCourse.objects.count(), 9)
+
+    def test_unauthorized(self):
+        """Неавторизованный пользователь не может добавлять блюда"""
+        ans = self.client.post(self.URL, self.__new_courses(2), format='json')
+        self.assertEqual(ans.status_code, 401)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_not_a_list(self):
+        """Данные массовой операции должны быть непустым списком"""
+        with self.logged_in('cheap_worker'):
+            self.assertEqual(self.client.post(self.URL, {'menu': 1}, format='json').status_code, 400)
+            self.assertEqual(self.client.post(self.URL, [], format='json').status_code, 400)
+            self.assertEqual(self.client.delete(self.URL, ['x'], format='json').status_code, 400)
+
+    def test_update(self):
+        """Работник ресторана изменяет блюда и их переводы одним запросом"""
+        sandwich, water = self._data['chocolate_sandwich'], self._data['sparkling_water']
+        changes = [
+            {'id': sandwich.pk, 'price': 99, 'translations': {'ru': {'title': "Бутерброд"}}},
+            {'id': water.pk, 'published': False},
+        ]
+        with self.logged_in('cheap_worker'):
+            with self.assertNumQueries(10):
+                ans = self.client.patch(self.URL, changes, format='json')
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual([item['id'] for item in ans.json()], [sandwich.pk, water.pk])
+        sandwich = MenuCourse.objects.get(pk=sandwich.pk)
+        self.assertEqual(sandwich.price, 99)
+        sandwich.set_current_language('ru')
+        self.assertEqual(sandwich.title, "Бутерброд")
+        water = MenuCourse.objects.get(pk=water.pk)
+        self.assertFalse(water.published)
+        self.assertFalse(water.effective_published)
+
+    def test_update_other_restaurant(self):
+        """Работник ресторана не может изменить блюда другого ресторана"""
+        changes = [{'id': self._data['chocolate_sandwich'].pk, 'price': 99}]
+        with self.logged_in('premium_worker'):
+            ans = self.client.patch(self.URL, changes, format='json')
+        self.assertEqual(ans.status_code, 403)
+        self.assertNotEqual(MenuCourse.objects.get(pk=changes[0]['id']).price, 99)
+
+    def test_update_move_to_other_restaurant(self):
+        """Блюдо нельзя перенести в меню чужого ресторана"""
+        changes = [{
+            'id': self._data['sparkling_water'].pk,
+            'menu': self._data['premium_menu'].pk,
+            'section': None,
+        }]
+        with self.logged_in('cheap_worker'):
+            ans = self.client.patch(self.URL, changes, format='json')
+        self.assertEqual(ans.status_code, 403)
+        self.assertEqual(
+            MenuCourse.objects.get(pk=changes[0]['id']).menu, self._data['cheap_menu']
+        )
+
+    def test_update_unknown(self):
+        """Изменение несуществующего блюда - ошибка в данных"""
+        changes = [{'id': self._data['still_water'].pk, 'price': 1}, {'id': 1000000, 'price': 1}]
+        with self.logged_in('admin'):
+            ans = self.client.patch(self.URL, changes, format='json')
+        self.assertEqual(ans.status_code, 400)
+        self.assertEqual(ans.json()[0], {})
+        self.assertIn('id', ans.json()[1])
+
+    def test_delete(self):
+        """Работник ресторана удаляет блюда одним запросом"""
+        ids = [self._data['sparkling_water'].pk, self._data['chocolate_sandwich'].pk]
+        with self.logged_in('premium_worker'):
+            ans = self.client.delete(self.URL, ids, format='json')
+        self.assertEqual(ans.status_code, 403)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+        with self.logged_in('cheap_worker'):
+            ans = self.client.delete(self.URL, ids, format='json')
+        self.assertEqual(ans.status_code, 204)
+        self.assertEqual(MenuCourse.objects.count(), 2)
+        self.assertFalse(MenuCourse.objects.filter(pk__in=ids).exists())
+
+
+class MenuCoursePriceAdjustmentTest(BaseTestCase):
+    """
+    Тесты для API массового изменения цен блюд
+    ------------------------------------------
+
+    Все четыре блюда фикстуры относятся к меню дешевого ресторана, их цены -
+    25, 20, 30 и 30.
+    """
+
+    def __get_url(self):
+        return '/api/v1/menu_courses/adjust_prices/'
+
+    def __prices(self):
+        return sorted(MenuCourse.objects.filter(
+            menu__restaurant=self._data['cheap_restaurant']
+        ).values_list('price', flat=True))
+
+    def test_unauthorized(self):
+        """Неавторизованный пользователь не может изменять цены"""
+        ans = self.client.post(self.__get_url(), {'percent': 10}, format='json')
+        self.assertEqual(ans.status_code, 401)
+
+    def test_premium_owner(self):
+        """Хозяин другого ресторана не может изменять цены ресторана"""
+        with self.logged_in('premium_owner'):
+            ans = self.client.post(
+                self.__get_url(),
+                {'restaurant': self._data['cheap_restaurant'].pk, 'percent': 10},
+                format='json'
+            )
+        self.assertEqual(ans.status_code, 403)
+        self.assertEqual(self.__prices(), [20, 25, 30, 30])
+
+    def test_dry_run(self):
+        """Предварительный просмотр возвращает итоги одним запросом и не меняет цены"""
+        with self.logged_in('cheap_worker'):
+            # Загрузить должности пользователя заранее
+            self.client.post(self.__get_url(), {'percent': 10, 'dry_run': True}, format='json')
+            with CaptureQueriesContext(connection) as queries:
+                ans = self.client.post(
+                    self.__get_url(),
+                    {'restaurant': self._data['cheap_restaurant'].pk, 'percent': 10, 'dry_run': True},
+                    format='json'
+                )
+        self.assertEqual(ans.status_code, 200)
+        self.assertTrue(ans.data['dry_run'])
+        self.assertEqual(ans.data['courses'], 4)
+        self.assertEqual(ans.data['restaurants'], 1)
+        self.assertEqual(ans.data['before'], {'total': '105.00', 'min': '20.00', 'max': '30.00', 'avg': '26.25'})
+        self.assertEqual(ans.data['after'], {'total': '115.50', 'min': '22.00', 'max': '33.00', 'avg': '28.88'})
+        self.assertFalse([item for item in queries.captured_queries if item['sql'].startswith('UPDATE')])
+        self.assertEqual(self.__prices(), [20, 25, 30, 30])
+
+    def test_percent(self):
+        """Цены увеличиваются на процент с округлением вверх до целого одним запросом UPDATE"""
+        with self.logged_in('cheap_owner'):
+            with CaptureQueriesContext(connection) as queries:
+                ans = self.client.post(
+                    self.__get_url(),
+                    {
+                        'restaurant': self._data['cheap_restaurant'].pk,
+                        'percent': '10',
+                        'rounding_step': '1',
+                        'rounding': 'up',
+                    },
+                    format='json'
+                )
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['after']['total'], '116.00')
+        self.assertEqual(self.__prices(), [22, 28, 33, 33])
+        updates = [item['sql'] for item in queries.captured_queries if item['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"menus_menucourses"', updates[0])
+
+    def test_amount(self):
+        """Цены уменьшаются на сумму, но не становятся отрицательными"""
+        with self.logged_in('admin'):
+            ans = self.client.post(
+                self.__get_url(),
+                {'restaurant': self._data['cheap_restaurant'].pk, 'amount': '-26'},
+                format='json'
+            )
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(self.__prices(), [0, 0, 4, 4])
+
+    def test_owned_restaurants(self):
+        """Без ресторана цены меняются во всех ресторанах, которыми владеет пользователь"""
+        premium_course = MenuCourse.objects.create(
+            menu=self._data['premium_menu'], title="Oysters", price=Decimal('100.00')
+        )
+        with self.logged_in('cheap_owner'):
+            ans = self.client.post(self.__get_url(), {'amount': '5'}, format='json')
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['courses'], 4)
+        self.assertEqual(self.__prices(), [25, 30, 35, 35])
+        self.assertEqual(MenuCourse.objects.get(pk=premium_course.pk).price, 100)
+        # Работник ресторана не владеет ни одним рестораном
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.__get_url(), {'amount': '5'}, format='json')
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.data['courses'], 0)
+        self.assertEqual(self.__prices(), [25, 30, 35, 35])
+
+    def test_invalid(self):
+        """Должно быть задано ровно одно из полей percent и amount"""
+        with self.logged_in('cheap_owner'):
+            ans = self.client.post(self.__get_url(), {'percent': 10, 'amount': 5}, format='json')
+            self.assertEqual(ans.status_code, 400)
+            ans = self.client.post(self.__get_url(), {}, format='json')
+            self.assertEqual(ans.status_code, 400)
+        self.assertEqual(self.__prices(), [20, 25, 30, 30])
@@ -2,6 +2,7 @@
 Тесты для API для работы с разделами меню
 """
 
+from menus.models import MenuCourse, MenuSection
 from restaurants.tests._fixtures import BaseTestCase
 
 
@@ -68,6 +69,32 @@ class MenuSectionListTest(BaseTestCase):
         self.verify_all_sections(info)
 
 
+class MenuSectionSparseFieldsTest(BaseTestCase):
+    """
+    Тесты для выбора выводимых полей разделов меню параметрами fields и expand
+    """
+
+    URL = '/api/v1/menu_sections/'
+
+    def test_no_expand(self):
+        """С пустым параметром expand блюда раздела не выводятся и не загружаются"""
+        # Число разделов, разделы и их переводы
+        with self.assertNumQueries(3):
+            ans = self.client.get(self.URL, {'expand': ''})
+        self.assertEqual(ans.status_code, 200)
+        for item in ans.json()['results']:
+            self.assertNotIn('published_courses', item)
+
+    def test_fields(self):
+        """Выводятся только перечисленные поля"""
+        section = self._data['drinks_section']
+        ans = self.client.get(f"{self.URL}{section.pk}/", {'fields': 'id,published_courses'})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(set(info), {'id', 'published_courses'})
+        self.assertEqual(len(info['published_courses']), 2)
+
+
 class PublishedMenuSectionRetrieveTest(BaseTestCase):
     """
     Тесты для API получения одиночного раздела опубликованного меню.
@@ -180,3 +207,144 @@ class UnpublishedMenuSectionRetrieveTest(BaseTestCase):
             ans = self.client.get(self.__get_url())
         self.assertEqual(ans.status_code, 200)
         self.verify_inactive_section(ans.json())
+
+
+class MenuSectionBulkTest(BaseTestCase):
+    """
+    Тесты для массового добавления разделов меню вместе с блюдами
+    """
+
+    URL = '/api/v1/menu_sections/bulk/'
+
+    def __new_sections(self, count=5, courses=10, menu='cheap_menu'):
+        """Данные count новых разделов меню, в каждом из которых courses блюд"""
+        return [
+            {
+                'translations': {'en': {'title': f"Section {number}"}},
+                'menu': self._data[menu].pk,
+                'published': True,
+                'courses': [
+                    {
+                        'translations': {
+                            'en': {'title': f"Course {number}.{index}"},
+                            'ru': {'title': f"Блюдо {number}.{index}"},
+                        },
+                        'price': 100 + index,
+                    }
+                    for index in range(courses)
+                ],
+            }
+            for number in range(count)
+        ]
+
+    def test_create(self):
+        """Работник ресторана добавляет разделы с блюдами одним запросом"""
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.URL, self.__new_sections(), format='json')
+        self.assertEqual(ans.status_code, 201)
+        info = ans.json()
+        self.assertEqual(len(info), 5)
+        self.assertEqual(len(info[2]['courses']), 10)
+        self.assertEqual(info[2]['courses'][3]['translations']['ru']['title'], "Блюдо 2.3")
+        section = MenuSection.objects.get(pk=info[2]['id'])
+        self.assertEqual(section.title, "Section 2")
+        self.assertTrue(section.effective_published)
+        course = section.courses.get(pk=info[2]['courses'][3]['id'])
+        self.assertEqual(course.menu, self._data['cheap_menu'])
+        self.assertEqual(course.price, 103)
+        self.assertTrue(course.effective_published)
+        self.assertEqual(MenuSection.objects.count(), 8)
+        self.assertEqual(MenuCourse.objects.count(), 54)
+
+    def test_create_queries(self):
+        """Число запросов к базе данных не зависит от числа разделов и блюд"""
+        with self.logged_in('cheap_worker'):
+            with self.assertNumQueries(14):
+                ans = self.client.post(self.URL, self.__new_sections(2, 2), format='json')
+            self.assertEqual(ans.status_code, 201)
+            with self.assertNumQueries(14):
+                ans = self.client.post(self.URL, self.__new_sections(10, 5), format='json')
+            self.assertEqual(ans.status_code, 201)
+
+    def test_create_invalid_course(self):
+        """Если данные одного блюда неверны, то не добавляется ничего"""
+        sections = self.__new_sections(2, 2)
+        del sections[1]['courses'][1]['price']
+        with self.logged_in('cheap_worker'):
+            ans = self.client.post(self.URL, sections, format='json')
+        self.assertEqual(ans.status_code, 400)
+        self.assertIn('price', ans.json()[1]['courses'][1])
+        self.assertEqual(MenuSection.objects.count(), 3)
+        self.assertEqual(MenuCourse.objects.count(), 4)
+
+    def test_create_other_restaurant(self):
+        """Работник ресторана не может добавить разделы в меню другого ресторана"""
+        with self.logged_in('premium_worker'):
+            ans = self.client.post(self.URL, self.__new_sections(2, 2), format='json')
+        self.assertEqual(ans.status_code, 403)
+        ans = self.client.post(self.URL, self.__new_sections(2, 2), format='json')
+        self.assertEqual(ans.status_code, 401)
+        self.assertEqual(MenuSection.objects.count(), 3)
+
+
+class MenuSectionPublishTest(BaseTestCase):
+    """
+    Тесты для публикации и скрытия списка разделов меню
+    """
+
+    URL = '/api/v1/menu_sections/publish/'
+
+    def test_unpublish(self):
+        """Скрытые разделы и их блюда не видны посторонним"""
+        sections = [self._data['drinks_section'].pk, self._data['desserts_section'].pk]
+        with self.logged_in('cheap_owner'):
+            with self.assertNumQueries(6) as queries:
+                ans = self.client.post(
+                    self.URL, {'sections': sections, 'published': False}, format='json'
+                )
+        self.assertEqual(ans.status_code, 204)
+        updates = [item['sql'] for item in queries.captured_queries if item['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(MenuSection.objects.filter(pk__in=sections, published=True).exists())
+        self.assertFalse(MenuSection.objects.filter(pk__in=sections, effective_published=True).exists())
+        self.assertFalse(MenuCourse.objects.filter(section__in=sections, effective_published=True).exists())
+        self.assertEqual(self.client.get('/api/v1/menu_sections/').json()['count'], 0)
+        self.assertEqual(self.client.get('/api/v1/menu_courses/').json()['count'], 0)
+
+        with self.logged_in('cheap_owner'):
+            ans = self.client.post(self.URL, {'sections': sections, 'published': True}, format='json')
+        self.assertEqual(ans.status_code, 204)
+        self.assertEqual(MenuSection.objects.filter(effective_published=True).count(), 2)
+        self.assertEqual(
+            set(MenuCourse.objects.filter(effective_published=True).values_list('pk', flat=True)),
+            {
+                self._data['sparkling_water'].pk,
+                self._data['still_water'].pk,
+                self._data['chocolate_sandwich'].pk,
+            }
+        )
+
+    def test_unpublished_menu(self):
+        """Раздел неопубликованного меню остается невидимым после публикации"""
+        section = self._data['inactive_section']
+        with self.logged_in('cheap_owner'):
+            ans = self.client.post(self.URL, {'sections': [section.pk], 'published': True}, format='json')
+        self.assertEqual(ans.status_code, 204)
+        section.refresh_from_db()
+        self.assertTrue(section.published)
+        self.assertFalse(section.effective_published)
+
+    def test_other_restaurant(self):
+        """Работник ресторана не может скрыть разделы другого ресторана"""
+        sections = [self._data['drinks_section'].pk]
+        with self.logged_in('premium_worker'):
+            ans = self.client.post(self.URL, {'sections': sections, 'published': False}, format='json')
+        self.assertEqual(ans.status_code, 403)
+        self.assertTrue(MenuSection.objects.get(pk=sections[0]).published)
+
+    def test_unknown(self):
+        """Публикация несуществующего раздела - ошибка в данных"""
+        with self.logged_in('admin'):
+            ans = self.client.post(self.URL, {'sections': [1000000], 'published': True}, format='json')
+        self.assertEqual(ans.status_code, 400)
+        self.assertIn('sections', ans.json())
@@ -2,26 +2,77 @@
 Наборы API-обработчиков для работы с меню, разделами меню и блюдами
 """
 
+from django.db import DataError, IntegrityError, transaction
 from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
 
 from django_filters.rest_framework import DjangoFilterBackend
 
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
 
+from menu_backend.sparse_fields import SparseFieldsViewSetMixin
+from menu_backend.transactions import AtomicWriteViewSetMixin
+
+from menus.bulk import (
+    check_restaurants_permission,
+    create_courses,
+    create_sections,
+    get_bulk_ids,
+    get_bulk_items,
+    preload_menu_objects,
+    set_sections_published,
+    update_courses
+)
+from menus.cloning import clone_menu
+from menus.exporting import export_response
+from menus.importing import JSON_LINES, MenuImport, check_data_format, guess_format
 from menus.models import MenuCourse, MenuSection, Menu
+from menus.prices import adjust_prices, get_editable_courses, new_price_expression
 from menus.permissions import (
+    MenuExportPermission,
     MenuPermission,
     MenuSectionPermission,
     MenuCoursePermission
 )
+from menus.prefetch import prefetch_menus, prefetch_sections
 from menus.serializers import (
     MenuCourseSerializer,
+    PriceAdjustmentSerializer,
+    MenuSectionPublishSerializer,
     MenuSectionSerializer,
+    MenuSectionTreeSerializer,
     MenuSerializer
 )
+from menus.swagger import (
+    swagger_course_adjust_prices,
+    swagger_course_bulk_create,
+    swagger_course_bulk_delete,
+    swagger_course_bulk_update,
+    swagger_menu_clone,
+    swagger_menu_export,
+    swagger_menu_import,
+    swagger_section_bulk_create,
+    swagger_section_publish
+)
+from restaurants.models import RestaurantStaff
 
 
-class MenuCourseViewSet(viewsets.ModelViewSet):
+class PublishConflict(APIException):
+    """
+    Другое меню ресторана опубликовано одновременно с этим. Ограничение на
+    одно опубликованное меню ресторана не позволяет сохранить оба, и запрос
+    можно повторить.
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("Another menu of the restaurant has just been published, try again")
+    default_code = 'publish_conflict'
+
+
+class MenuCourseViewSet(AtomicWriteViewSetMixin, viewsets.ModelViewSet):
     """
     Обработчики для работы с блюдами
     """
@@ -38,22 +89,137 @@ class MenuCourseViewSet(viewsets.ModelViewSet):
         """
         Возвращает список блюд, которые может видеть текущий пользователь.
 
-        Неавторизованный пользователь может видеть только блюда опубликованных
-        меню. Авторизованный пользователь может видеть блюда опубликованных меню
-        и блюда меню своих ресторанов.
+        Неавторизованный пользователь может видеть только опубликованные блюда
+        опубликованных разделов опубликованных меню (поле effective_published).
+        Авторизованный пользователь может видеть также все блюда меню своих
+        ресторанов.
+
+        Меню блюда загружается вместе с ним, чтобы проверка прав доступа к
+        блюду не выполняла запросов к базе данных.
         """
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
-                return MenuCourse.objects.all()
-            restaurant_ids = set(self.request.user.restaurant_staff.values_list('restaurant_id', flat=True))
-            return MenuCourse.objects.filter(
-                Q(menu__published=True, published=True) |
-                Q(menu__restaurant__id__in=restaurant_ids)
-            ).all()
-        return MenuCourse.objects.filter(menu__published=True, published=True).all()
+                queryset = MenuCourse.objects.all()
+            else:
+                queryset = MenuCourse.objects.filter(
+                    Q(effective_published=True) |
+                    RestaurantStaff.works_in(self.request.user, 'menu__restaurant')
+                )
+        else:
+            queryset = MenuCourse.objects.filter(effective_published=True)
+        return queryset.select_related('menu').prefetch_related('translations')
+
+    def __get_bulk_courses(self, ids):
+        """
+        Блюда с первичными ключами ids, которые может видеть текущий
+        пользователь, в виде словаря по первичному ключу. Если какого-то блюда
+        нет, то возвращается ошибка с указанием его места в списке.
+        """
+        courses = self.get_queryset().prefetch_related(None).in_bulk(ids)
+        errors = [{} if pk in courses else {'id': [_("Course not found")]} for pk in ids]
+        if any(errors):
+            raise ValidationError(errors)
+        return courses
+
+    def __bulk_response(self, ids, status_code):
+        """Ответ со списком блюд с первичными ключами ids в том же порядке"""
+        courses = MenuCourse.objects.prefetch_related('translations').in_bulk(ids)
+        serializer = self.get_serializer([courses[pk] for pk in ids], many=True)
+        return Response(serializer.data, status=status_code)
+
+    @swagger_course_bulk_create
+    @swagger_course_bulk_update
+    @swagger_course_bulk_delete
+    @action(detail=False,
+            methods=['post', 'patch', 'delete'],
+            url_path='bulk',
+            pagination_class=None)
+    def bulk(self, request):
+        """
+        Массовые операции с блюдами. Данные запроса - список блюд:
+
+        *   POST - данные новых блюд, как при добавлении одного блюда
+        *   PATCH - первичные ключи блюд (поле id) и изменяемые поля
+        *   DELETE - первичные ключи удаляемых блюд
+
+        Данные всех блюд проверяются до записи, права доступа проверяются один
+        раз для каждого ресторана, а все блюда записываются в одной транзакции.
+        """
+        items = get_bulk_items(request)
+        context = {**self.get_serializer_context(), **preload_menu_objects(items)}
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=items, many=True, context=context)
+            serializer.is_valid(raise_exception=True)
+            check_restaurants_permission(
+                request, {data['menu'].restaurant_id for data in serializer.validated_data}
+            )
+            with transaction.atomic():
+                courses = create_courses(serializer.validated_data)
+            return self.__bulk_response([course.pk for course in courses], status.HTTP_201_CREATED)
+
+        ids = get_bulk_ids(items)
+        courses = self.__get_bulk_courses(ids)
+        check_restaurants_permission(
+            request, {course.menu.restaurant_id for course in courses.values()}
+        )
+        if request.method == 'DELETE':
+            with transaction.atomic():
+                MenuCourse.objects.filter(pk__in=ids).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        changes, errors = [], []
+        for pk, item in zip(ids, items):
+            data = {name: value for name, value in item.items() if name != 'id'}
+            serializer = self.get_serializer(courses[pk], data=data, partial=True, context=context)
+            if serializer.is_valid():
+                changes.append((courses[pk], serializer.validated_data))
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+        if any(errors):
+            raise ValidationError(errors)
+        # Блюда можно переносить только в меню ресторанов пользователя
+        check_restaurants_permission(
+            request, {data['menu'].restaurant_id for _course, data in changes if 'menu' in data}
+        )
+        with transaction.atomic():
+            update_courses(changes)
+        return self.__bulk_response(ids, status.HTTP_200_OK)
+
+    @swagger_course_adjust_prices
+    @action(detail=False,
+            methods=['post'],
+            url_path='adjust_prices')
+    def adjust_prices(self, request):
+        """
+        Изменить цены всех блюд ресторана (или меню ресторана) либо, если
+        ресторан не задан, всех ресторанов, которыми владеет пользователь, на
+        процент или на сумму с округлением (см. `menus.prices`). Возвращает
+        итоговые значения цен до и после изменения; с параметром dry_run цены
+        не изменяются.
+        """
+        serializer = PriceAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if 'restaurant' in data:
+            check_restaurants_permission(request, [data['restaurant']])
+        courses = get_editable_courses(request.user, data.get('restaurant'), data.get('menu'))
+        new_price = new_price_expression(
+            percent=data.get('percent'),
+            amount=data.get('amount'),
+            step=data['rounding_step'],
+            rounding=data['rounding']
+        )
+        try:
+            with transaction.atomic():
+                stats = adjust_prices(courses, new_price, dry_run=data['dry_run'])
+        except DataError:
+            # Новая цена не помещается в поле цены блюда
+            raise ValidationError({'non_field_errors': [_("The new price is too large")]})
+        return Response(stats)
 
 
-class MenuSectionViewSet(viewsets.ModelViewSet):
+class MenuSectionViewSet(AtomicWriteViewSetMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     Обработчики для работы с разделами меню
     """
@@ -70,21 +236,91 @@ class MenuSectionViewSet(viewsets.ModelViewSet):
         """
         Возвращает список разделов меню, которые может видеть текущий пользователь.
 
-        Неавторизованный пользователь может видеть только разделы опубликованных
-        меню. Авторизованный пользователь может видеть разделы опубликованных меню
-        и разделы меню своих ресторанов.
+        Неавторизованный пользователь может видеть только опубликованные разделы
+        опубликованных меню (поле effective_published). Авторизованный
+        пользователь может видеть также все разделы меню своих ресторанов.
+
+        Меню раздела загружается вместе с ним, чтобы проверка прав доступа к
+        разделу не выполняла запросов к базе данных.
         """
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
-                return MenuSection.objects.all()
-            return MenuSection.objects.filter(
-                Q(menu__published=True) |
-                Q(menu__restaurant__id__in=self.request.user.restaurant_staff.values_list('restaurant_id', flat=True))
-            ).all()
-        return MenuSection.objects.filter(menu__published=True).all()
+                queryset = MenuSection.objects.all()
+            else:
+                queryset = MenuSection.objects.filter(
+                    Q(effective_published=True) |
+                    RestaurantStaff.works_in(self.request.user, 'menu__restaurant')
+                )
+        else:
+            queryset = MenuSection.objects.filter(effective_published=True)
+        return prefetch_sections(
+            queryset.select_related('menu'), courses=self.is_field_requested('published_courses')
+        )
+
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return MenuSectionTreeSerializer
+        if self.action == 'publish':
+            return MenuSectionPublishSerializer
+        return super().get_serializer_class()
 
+    @swagger_section_bulk_create
+    @action(detail=False,
+            methods=['post'],
+            url_path='bulk',
+            pagination_class=None)
+    def bulk(self, request):
+        """
+        Добавить список разделов меню вместе с блюдами. Каждый раздел содержит
+        список блюд в поле courses; меню и раздел блюда задаются разделом.
+        Данные всех разделов и блюд проверяются до записи, а разделы, блюда и
+        их переводы добавляются в одной транзакции запросами `bulk_create`.
+        """
+        items = get_bulk_items(request)
+        context = {**self.get_serializer_context(), **preload_menu_objects(items)}
+        serializer = MenuSectionTreeSerializer(data=items, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+        check_restaurants_permission(
+            request, {data['menu'].restaurant_id for data in serializer.validated_data}
+        )
+        with transaction.atomic():
+            sections = create_sections(serializer.validated_data)
+        ids = [section.pk for section in sections]
+        sections = MenuSection.objects.prefetch_related(
+            'translations', 'courses__translations'
+        ).in_bulk(ids)
+        return Response(
+            MenuSectionTreeSerializer([sections[pk] for pk in ids], many=True, context=context).data,
+            status=status.HTTP_201_CREATED
+        )
 
-class MenuViewSet(viewsets.ModelViewSet):
+    @swagger_section_publish
+    @action(detail=False,
+            methods=['post'],
+            url_path='publish')
+    def publish(self, request):
+        """
+        Опубликовать или скрыть список разделов меню. Разделы и видимость их
+        блюд изменяются одним запросом UPDATE к таблице каждой модели.
+        """
+        serializer = MenuSectionPublishSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['sections']
+        sections = dict(
+            self.get_queryset().filter(pk__in=ids).values_list('pk', 'menu__restaurant_id')
+        )
+        unknown = [pk for pk in ids if pk not in sections]
+        if unknown:
+            raise ValidationError({'sections': [
+                _("Menu sections not found: %(ids)s") % {'ids': ', '.join(map(str, unknown))}
+            ]})
+        check_restaurants_permission(request, set(sections.values()))
+        with transaction.atomic():
+            set_sections_published(sections, serializer.validated_data['published'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MenuViewSet(AtomicWriteViewSetMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     Обработчики для работы с разделами меню
     """
@@ -95,6 +331,8 @@ class MenuViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['restaurant']
     http_method_names = ['get', 'head', 'options', 'post', 'put', 'patch', 'delete']
+    # Действия над меню целиком, которые загружают разделы и блюда сами
+    whole_menu_actions = ('import_file', 'export', 'clone')
 
     def get_queryset(self):
         """
@@ -106,9 +344,99 @@ class MenuViewSet(viewsets.ModelViewSet):
         """
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
-                return Menu.objects.all()
-            return Menu.objects.filter(
-                Q(published=True) |
-                Q(restaurant__id__in=self.request.user.restaurant_staff.values_list('restaurant_id', flat=True))
-            ).all()
-        return Menu.objects.filter(published=True).all()
+                queryset = Menu.objects.all()
+            else:
+                queryset = Menu.objects.filter(
+                    Q(published=True) |
+                    RestaurantStaff.works_in(self.request.user, 'restaurant')
+                )
+        else:
+            queryset = Menu.objects.filter(published=True)
+        if self.action in self.whole_menu_actions:
+            return queryset
+        return prefetch_menus(
+            queryset,
+            sections=self.is_field_requested('sections'),
+            extra_courses=self.is_field_requested('extra_published_courses')
+        )
+
+    def __save(self, serializer):
+        """
+        Сохраняет меню. Если одновременно с публикацией этого меню было
+        опубликовано другое меню того же ресторана, то ошибку возвращает
+        ограничение базы данных на одно опубликованное меню ресторана.
+        """
+        try:
+            with transaction.atomic():
+                return serializer.save()
+        except IntegrityError:
+            instance = serializer.instance
+            restaurant = serializer.validated_data.get('restaurant', getattr(instance, 'restaurant', None))
+            published = serializer.validated_data.get('published', getattr(instance, 'published', False))
+            if published and Menu.objects.filter(restaurant=restaurant, published=True).exists():
+                raise PublishConflict()
+            raise
+
+    def perform_create(self, serializer):
+        self.__save(serializer)
+
+    def perform_update(self, serializer):
+        self.__save(serializer)
+
+    @swagger_menu_import
+    @action(detail=True,
+            methods=['post'],
+            url_path='import',
+            parser_classes=[MultiPartParser])
+    def import_file(self, request, pk=None):
+        """
+        Добавить в меню разделы и блюда из файла JSON Lines или CSV (см.
+        `menus.importing`). Формат задается параметром data_format или
+        расширением имени файла. Возвращает отчет об импорте: число строк,
+        добавленных разделов и блюд, время работы и ошибки по номерам строк.
+        """
+        menu = self.get_object()
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': [_("No file was submitted")]})
+        data_format = check_data_format(
+            request.query_params.get('data_format') or guess_format(upload.name)
+        )
+        report = MenuImport(menu).run(upload, data_format)
+        return Response(
+            report,
+            status=status.HTTP_400_BAD_REQUEST if report['errors'] else status.HTTP_200_OK
+        )
+
+    @swagger_menu_export
+    @action(detail=True,
+            methods=['get'],
+            url_path='export',
+            permission_classes=[MenuExportPermission])
+    def export(self, request, pk=None):
+        """
+        Выгрузить меню со всеми разделами (в том числе без блюд), блюдами и
+        переводами в файл JSON Lines (по умолчанию) или CSV (см.
+        `menus.exporting`). Файл передается потоком по мере чтения блюд из базы
+        данных.
+        """
+        menu = self.get_object()
+        data_format = check_data_format(request.query_params.get('data_format') or JSON_LINES)
+        return export_response(Menu.objects.filter(pk=menu.pk), data_format, f"menu_{menu.pk}")
+
+    @swagger_menu_clone
+    @action(detail=True,
+            methods=['post'],
+            url_path='clone')
+    def clone(self, request, pk=None):
+        """
+        Создать неопубликованную копию меню со всеми разделами, блюдами и
+        переводами (см. `menus.cloning`)
+        """
+        clone = clone_menu(self.get_object())
+        clone = prefetch_menus(
+            Menu.objects.filter(pk=clone.pk),
+            sections=self.is_field_requested('sections'),
+            extra_courses=self.is_field_requested('extra_published_courses')
+        ).get()
+        return Response(self.get_serializer(clone).data, status=status.HTTP_201_CREATED)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class RestaurantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurants'
+
+    def ready(self):
+        """
+        Подключение обработчиков сигналов, пересобирающих подготовленные
+        общедоступные меню ресторанов
+        """
+        super().ready()
+        import restaurants.signals  # noqa: F401
@@ -0,0 +1,126 @@
+"""
+Кэширование общедоступных меню ресторанов
+-----------------------------------------
+
+Готовые JSON-документы с общедоступными меню хранятся в кэше по ключу, который
+включает первичный ключ ресторана, язык, версию меню и способ сжатия
+документа, так что каждый сжатый вариант документа хранится отдельно. Меню другой версии по
+этому ключу получить невозможно, поэтому устаревшие документы удаляются из кэша
+только для экономии памяти: это делает `invalidate_public_menus` при изменении
+меню. Для наблюдения за эффективностью кэша можно включить подсчет попаданий
+и промахов (настройка PUBLIC_MENU_CACHE_STATS). Счетчики хранятся в том же
+кэше, и каждый подсчет - еще одно обращение к нему, поэтому по умолчанию
+подсчет выключен.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from restaurants.compression import IDENTITY, get_encodings
+from restaurants.snapshots import get_bundle_key, get_snapshot_languages
+
+
+HITS_KEY = 'public_menu:hits'
+MISSES_KEY = 'public_menu:misses'
+
+
+def public_menu_key(restaurant_id, language, version, encoding=IDENTITY):
+    """
+    Ключ кэша для меню ресторана restaurant_id версии version на языке language,
+    сжатого способом encoding
+    """
+    key = f'public_menu:{restaurant_id}:{language}:{version}'
+    if encoding is not IDENTITY:
+        key += f':{encoding}'
+    return key
+
+
+def _count(key):
+    """
+    Увеличивает счетчик попаданий или промахов, если подсчет включен. Обычно
+    это одно обращение к кэшу, и только первое - два.
+    """
+    if not settings.PUBLIC_MENU_CACHE_STATS:
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счетчика еще нет, или его успел создать другой процесс
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _acount(key):
+    """Асинхронный вариант `_count`"""
+    if not settings.PUBLIC_MENU_CACHE_STATS:
+        return
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def get_cached_public_menu(restaurant_id, language, version, encoding=IDENTITY):
+    """Возвращает меню ресторана из кэша или None, если его там нет"""
+    content = cache.get(public_menu_key(restaurant_id, language, version, encoding))
+    _count(HITS_KEY if content is not None else MISSES_KEY)
+    return content
+
+
+def set_cached_public_menu(restaurant_id, language, version, content, encoding=IDENTITY):
+    """Сохраняет меню ресторана, сжатое способом encoding, в кэше"""
+    cache.set(
+        public_menu_key(restaurant_id, language, version, encoding),
+        content,
+        timeout=settings.PUBLIC_MENU_CACHE_TIMEOUT
+    )
+
+
+async def aget_cached_public_menu(restaurant_id, language, version, encoding=IDENTITY):
+    """Асинхронный вариант `get_cached_public_menu`"""
+    content = await cache.aget(public_menu_key(restaurant_id, language, version, encoding))
+    await _acount(HITS_KEY if content is not None else MISSES_KEY)
+    return content
+
+
+async def aset_cached_public_menu(restaurant_id, language, version, content, encoding=IDENTITY):
+    """Асинхронный вариант `set_cached_public_menu`"""
+    await cache.aset(
+        public_menu_key(restaurant_id, language, version, encoding),
+        content,
+        timeout=settings.PUBLIC_MENU_CACHE_TIMEOUT
+    )
+
+
+def invalidate_public_menus(versions):
+    """
+    Удаляет из кэша меню ресторанов на всех языках из PARLER_LANGUAGES и набор
+    меню на всех этих языках во всех сжатых и несжатом вариантах. Наборы меню
+    на других сочетаниях языков удаляются по истечении времени хранения.
+    Параметр versions - словарь, сопоставляющий первичному ключу ресторана
+    версию его меню, которая стала устаревшей.
+    """
+    cache.delete_many([
+        public_menu_key(restaurant_id, language, version, encoding)
+        for restaurant_id, version in versions.items()
+        for language in get_snapshot_languages() + [get_bundle_key(get_snapshot_languages())]
+        for encoding in [IDENTITY] + get_encodings()
+    ])
+
+
+def get_cache_stats():
+    """Число попаданий и промахов кэша общедоступных меню и доля попаданий"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else None,
+    }
+
+
+def reset_cache_stats():
+    """Обнуляет счетчики попаданий и промахов"""
+    cache.delete_many([HITS_KEY, MISSES_KEY])
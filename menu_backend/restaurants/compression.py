@@ -0,0 +1,91 @@
+"""
+Сжатие общедоступных меню ресторанов
+------------------------------------
+
+JSON-документы с меню хорошо сжимаются, поэтому вместе с каждым подготовленным
+или закэшированным меню хранятся его сжатые варианты: gzip и, если установлен
+пакет Brotli, br. Сжатие выполняется один раз при изменении меню, а при ответе
+на запрос выбирается вариант, который принимает клиент согласно заголовку
+Accept-Encoding.
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Кодировка None означает несжатый документ
+IDENTITY = None
+GZIP = 'gzip'
+BROTLI = 'br'
+
+
+def get_encodings():
+    """
+    Список поддерживаемых способов сжатия в порядке предпочтения: br сжимает
+    JSON лучше, чем gzip
+    """
+    if brotli is None:
+        return [GZIP]
+    return [BROTLI, GZIP]
+
+
+def compress(content, encoding):
+    """Сжимает строку или байтовую строку content способом encoding"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    if encoding == GZIP:
+        # Время сжатия не записывается, чтобы результат зависел только от content
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    if encoding == BROTLI:
+        return brotli.compress(content, mode=brotli.MODE_TEXT)
+    return content
+
+
+def compress_all(content):
+    """
+    Словарь, сопоставляющий каждому поддерживаемому способу сжатия сжатый
+    этим способом документ content
+    """
+    return {encoding: compress(content, encoding) for encoding in get_encodings()}
+
+
+def _parse_accept_encoding(header):
+    """
+    Разбирает заголовок Accept-Encoding и возвращает словарь, сопоставляющий
+    каждому упомянутому в нем способу сжатия его вес q
+    """
+    weights = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(header):
+    """
+    Выбирает способ сжатия ответа по значению заголовка Accept-Encoding.
+    Возвращает способ сжатия с наибольшим весом среди поддерживаемых или None,
+    если клиент не принимает ни одного из них.
+    """
+    weights = _parse_accept_encoding(header or '')
+    best, best_weight = IDENTITY, 0.0
+    for encoding in get_encodings():
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
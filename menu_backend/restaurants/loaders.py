@@ -0,0 +1,285 @@
+"""
+Загрузка общедоступного меню ресторана за фиксированное число запросов
+----------------------------------------------------------------------
+
+Функции `*_to_json` из `restaurants.views` обходят ресторан, меню, разделы
+и блюда по одному объекту за раз, и для каждого объекта выполняются отдельные
+запросы к базе данных, в том числе для получения переводов. Здесь те же данные
+загружаются четырьмя запросами вне зависимости от размера меню: ресторан вместе
+с категорией, опубликованное меню, опубликованные разделы и опубликованные блюда.
+Переводы на нужный язык и на язык по умолчанию присоединяются к каждому запросу
+через `FilteredRelation`.
+
+Функции с префиксом `a` - асинхронные варианты соответствующих функций,
+использующие асинхронные методы ORM. Собирается меню одинаково.
+"""
+
+from django.conf import settings
+from django.db.models import F, FilteredRelation, Q
+
+from parler import appsettings
+
+from menus.models import Menu, MenuCourse, MenuSection
+from restaurants.models import Restaurant
+
+
+RESTAURANT_FIELDS = [
+    'id', 'logo', 'picture', 'category_id', 'stars', 'country', 'city', 'street',
+    'building', 'address_details', 'zip_code', 'longitude', 'latitude', 'phone',
+    'site', 'twitter_profile', 'facebook_profile', 'instagram_profile',
+    'average_receipt',
+]
+
+
+def _translated(queryset, relation, fields, languages, prefix):
+    """
+    Присоединяет к запросу queryset переводы из связи relation на каждый из
+    языков languages и добавляет к результату поля fields этих переводов.
+    Значение поля field перевода на язык code будет доступно под именем
+    '{prefix}_{code}_{field}'.
+    """
+    for code in languages:
+        alias = _alias(prefix, code)
+        queryset = queryset.annotate(**{
+            alias: FilteredRelation(
+                relation,
+                condition=Q(**{f'{relation}__language_code': code})
+            )
+        })
+        queryset = queryset.annotate(**{
+            f'{alias}_{field}': F(f'{alias}__{field}')
+            for field in ['language_code'] + fields
+        })
+    return queryset
+
+
+def _alias(prefix, code):
+    """Имя псевдонима для присоединенной таблицы переводов"""
+    return f"{prefix}_{code.replace('-', '_')}"
+
+
+def _pick(row, prefix, fields, choices):
+    """
+    Выбирает из строки row перевод на первый из языков choices, для которого
+    перевод существует. Так же ведет себя и parler, переходя к языку по
+    умолчанию, если перевода на запрошенный язык нет.
+    """
+    for code in choices:
+        alias = _alias(prefix, code)
+        if row[f'{alias}_language_code'] is not None:
+            return {field: row[f'{alias}_{field}'] for field in fields}
+    return {field: None for field in fields}
+
+
+def _file_url(field_name, name):
+    """URL загруженного файла по его имени, сохраненному в базе данных"""
+    if not name:
+        return None
+    return Restaurant._meta.get_field(field_name).storage.url(name)
+
+
+def get_language_choices(language):
+    """
+    Список языков, переводы на которые нужны для вывода меню на языке language:
+    сам этот язык и языки, к которым parler переходит при отсутствии перевода
+    """
+    return appsettings.PARLER_LANGUAGES.get_active_choices(language)
+
+
+def _course(row, choices):
+    """dict-объект с информацией о блюде, аналогичный `course_to_json`"""
+    obj = _pick(row, 'tr', ['title', 'composition'], choices)
+    obj['price'] = row['price']
+    obj['cooking_time'] = row['cooking_time']
+    return obj
+
+
+def _restaurant_rows(pk, languages):
+    """Запрос строки с данными ресторана и его категории"""
+    queryset = Restaurant.objects.filter(pk=pk)
+    queryset = _translated(queryset, 'translations', ['name', 'description'], languages, 'tr')
+    queryset = _translated(queryset, 'category__translations', ['name'], languages, 'cat')
+    return queryset.values(*RESTAURANT_FIELDS, *queryset.query.annotations)
+
+
+def _menu_rows(restaurant_id, languages):
+    """Запрос строки с опубликованным меню ресторана"""
+    queryset = _translated(
+        Menu.objects.filter(restaurant_id=restaurant_id, published=True),
+        'translations', ['title'], languages, 'tr'
+    )
+    return queryset.values('id', *queryset.query.annotations)
+
+
+def _section_rows(menu_id, languages):
+    """Запрос строк с опубликованными разделами меню"""
+    queryset = _translated(
+        MenuSection.objects.filter(menu_id=menu_id, published=True),
+        'translations', ['title'], languages, 'tr'
+    )
+    return queryset.values('id', *queryset.query.annotations)
+
+
+def _course_rows(menu_id, sections, languages):
+    """
+    Запрос строк с опубликованными блюдами из разделов sections и блюдами меню
+    вне разделов
+    """
+    queryset = _translated(
+        MenuCourse.objects.filter(published=True).filter(
+            Q(section_id__in=[section['id'] for section in sections]) |
+            Q(menu_id=menu_id, section__isnull=True)
+        ),
+        'translations', ['title', 'composition'], languages, 'tr'
+    )
+    return queryset.values('section_id', 'price', 'cooking_time', *queryset.query.annotations)
+
+
+def fetch_restaurant(pk, languages):
+    """
+    Загружает строку с данными ресторана и его категории вместе с переводами
+    на языки languages. Если ресторана нет, то возбуждает Restaurant.DoesNotExist.
+    """
+    return _restaurant_rows(pk, languages).get()
+
+
+def fetch_menu(restaurant_id, languages):
+    """
+    Загружает опубликованное меню ресторана и его опубликованные разделы и блюда.
+    Возвращает тройку (меню, разделы, блюда) или (None, [], []), если у ресторана
+    нет опубликованного меню.
+    """
+    menu = _menu_rows(restaurant_id, languages).first()
+    if menu is None:
+        return None, [], []
+    sections = list(_section_rows(menu['id'], languages))
+    courses = list(_course_rows(menu['id'], sections, languages))
+    return menu, sections, courses
+
+
+async def afetch_restaurant(pk, languages):
+    """Асинхронный вариант `fetch_restaurant`"""
+    return await _restaurant_rows(pk, languages).aget()
+
+
+async def afetch_menu(restaurant_id, languages):
+    """Асинхронный вариант `fetch_menu`"""
+    menu = await _menu_rows(restaurant_id, languages).afirst()
+    if menu is None:
+        return None, [], []
+    sections = [row async for row in _section_rows(menu['id'], languages)]
+    courses = [row async for row in _course_rows(menu['id'], sections, languages)]
+    return menu, sections, courses
+
+
+def build_restaurant(restaurant, menu, sections, courses, language):
+    """
+    Собирает из загруженных строк dict-объект с информацией о ресторане и его
+    меню на языке language, в точности совпадающий с `restaurant_to_json`.
+    """
+    choices = get_language_choices(language)
+    obj = {'id': restaurant['id']}
+    obj.update(_pick(restaurant, 'tr', ['name', 'description'], choices))
+    obj.update({
+        'phone': str(restaurant['phone']),
+        'site': restaurant['site'],
+        'twitter_profile': restaurant['twitter_profile'],
+        'facebook_profile': restaurant['facebook_profile'],
+        'instagram_profile': restaurant['instagram_profile'],
+        'average_receipt': restaurant['average_receipt'],
+    })
+    if restaurant['logo']:
+        obj['logo'] = _file_url('logo', restaurant['logo'])
+    if restaurant['picture']:
+        obj['picture'] = _file_url('picture', restaurant['picture'])
+    if restaurant['category_id']:
+        obj['category'] = _pick(restaurant, 'cat', ['name'], choices)
+    obj['stars'] = restaurant['stars']
+    obj['address'] = {
+        'country': restaurant['country'],
+        'city': restaurant['city'],
+        'street': restaurant['street'],
+        'building': restaurant['building'],
+        'address_details': restaurant['address_details'],
+        'zip_code': restaurant['zip_code'],
+        'latitude': restaurant['latitude'],
+        'longitude': restaurant['longitude']
+    }
+    if menu is not None:
+        by_section = {section['id']: [] for section in sections}
+        extra_courses = []
+        for course in courses:
+            if course['section_id'] is None:
+                extra_courses.append(_course(course, choices))
+            else:
+                by_section[course['section_id']].append(_course(course, choices))
+        obj['menu'] = {
+            'sections': [
+                {
+                    'title': _pick(section, 'tr', ['title'], choices)['title'],
+                    'courses': by_section[section['id']]
+                }
+                for section in sections
+            ],
+            'courses': extra_courses,
+            'title': _pick(menu, 'tr', ['title'], choices)['title'],
+        }
+    return obj
+
+
+def _get_choices(languages):
+    """Языки, переводы на которые нужны для вывода меню на языках languages"""
+    choices = []
+    for language in languages:
+        choices += [code for code in get_language_choices(language) if code not in choices]
+    return choices
+
+
+def load_public_restaurant_languages(pk, languages):
+    """
+    Возвращает словарь, в котором каждому языку из списка languages сопоставлен
+    dict-объект с информацией о ресторане и его текущем меню на этом языке.
+    Переводы на все языки загружаются теми же четырьмя запросами.
+
+    Если ресторана с первичным ключом pk нет, то возбуждает Restaurant.DoesNotExist.
+    """
+    choices = _get_choices(languages)
+    restaurant = fetch_restaurant(pk, choices)
+    menu, sections, courses = fetch_menu(restaurant['id'], choices)
+    return {
+        language: build_restaurant(restaurant, menu, sections, courses, language)
+        for language in languages
+    }
+
+
+def load_public_restaurant(pk, language: str = settings.LANGUAGE_CODE):
+    """
+    Возвращает dict-объект с информацией о ресторане и его текущем меню на языке
+    language. Результат совпадает с результатом `restaurant_to_json`, но
+    загружается четырьмя запросами к базе данных при любом размере меню.
+
+    Если ресторана с первичным ключом pk нет, то возбуждает Restaurant.DoesNotExist.
+    """
+    languages = get_language_choices(language)
+    restaurant = fetch_restaurant(pk, languages)
+    menu, sections, courses = fetch_menu(restaurant['id'], languages)
+    return build_restaurant(restaurant, menu, sections, courses, language)
+
+
+async def aload_public_restaurant_languages(pk, languages):
+    """Асинхронный вариант `load_public_restaurant_languages`"""
+    choices = _get_choices(languages)
+    restaurant = await afetch_restaurant(pk, choices)
+    menu, sections, courses = await afetch_menu(restaurant['id'], choices)
+    return {
+        language: build_restaurant(restaurant, menu, sections, courses, language)
+        for language in languages
+    }
+
+
+async def aload_public_restaurant(pk, language: str = settings.LANGUAGE_CODE):
+    """Асинхронный вариант `load_public_restaurant`"""
+    languages = get_language_choices(language)
+    restaurant = await afetch_restaurant(pk, languages)
+    menu, sections, courses = await afetch_menu(restaurant['id'], languages)
+    return build_restaurant(restaurant, menu, sections, courses, language)
@@ -0,0 +1,97 @@
+"""
+Сравнение скорости JSON-рендереров на большом меню
+"""
+
+import datetime
+import timeit
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from menu_backend.renderers import FastJSONRenderer, orjson
+
+
+def make_menu(courses: int, sections: int):
+    """
+    Общедоступное меню ресторана в том виде, в котором его возвращает
+    `restaurant_to_json`, с courses блюдами в sections разделах
+    """
+    def course(number):
+        return {
+            'title': f"Блюдо номер {number}",
+            'composition': "Мука, яйца, молоко, сахар, соль, сливочное масло",
+            'price': Decimal('350.00') + number,
+            'cooking_time': datetime.timedelta(minutes=5 + number % 40),
+        }
+    return {
+        'id': 1,
+        'name': "Ресторан",
+        'description': "Описание ресторана",
+        'phone': '+79101234567',
+        'site': 'https://example.com',
+        'twitter_profile': None,
+        'facebook_profile': None,
+        'instagram_profile': None,
+        'average_receipt': Decimal('1500.00'),
+        'category': {'name': "Фастфуд"},
+        'stars': 3,
+        'address': {
+            'country': 'RU',
+            'city': "Москва",
+            'street': "Тверская",
+            'building': '1',
+            'address_details': None,
+            'zip_code': '125009',
+            'latitude': Decimal('55.757600000000000'),
+            'longitude': Decimal('37.613800000000000'),
+        },
+        'menu': {
+            'sections': [
+                {
+                    'title': f"Раздел {section}",
+                    'courses': [
+                        course(number) for number in range(section, courses, sections)
+                    ],
+                }
+                for section in range(sections)
+            ],
+            'courses': [],
+            'title': "Основное меню",
+        },
+    }
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает время, за которое стандартный JSONRenderer и FastJSONRenderer
+    кодируют общедоступное меню с заданным числом блюд, и проверяет, что
+    результаты совпадают
+    """
+
+    help = "Compare JSONRenderer and FastJSONRenderer on a large menu"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=500, help="Number of courses")
+        parser.add_argument('--sections', type=int, default=20, help="Number of sections")
+        parser.add_argument('--repeat', type=int, default=200, help="Number of renders")
+
+    def handle(self, *args, **options):
+        data = make_menu(options['courses'], options['sections'])
+        standard, fast = JSONRenderer(), FastJSONRenderer()
+        if standard.render(data) != fast.render(data):
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer")
+        if orjson is None:
+            self.stdout.write("orjson is not installed, FastJSONRenderer falls back to JSONRenderer")
+        times = {}
+        for name, renderer in [('JSONRenderer', standard), ('FastJSONRenderer', fast)]:
+            times[name] = min(timeit.repeat(
+                lambda: renderer.render(data), number=options['repeat'], repeat=3
+            )) / options['repeat']
+            self.stdout.write(f"{name}: {times[name] * 1000:.3f} ms per render")
+        self.stdout.write(
+            f"speedup: {times['JSONRenderer'] / times['FastJSONRenderer']:.1f}x "
+            f"({options['courses']} courses, {len(standard.render(data))} bytes)"
+        )
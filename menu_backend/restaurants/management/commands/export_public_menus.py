@@ -0,0 +1,34 @@
+"""
+Выгрузка общедоступных меню ресторанов в статические файлы
+"""
+
+from django.core.management.base import BaseCommand
+
+from restaurants.static_export import export_public_menus, get_export_root
+
+
+class Command(BaseCommand):
+    """
+    Выгружает общедоступные меню ресторанов в каталог PUBLIC_MENU_EXPORT_ROOT,
+    откуда их отдает nginx. Переписываются только меню, изменившиеся с
+    предыдущей выгрузки.
+    """
+
+    help = "Export public restaurant menus to static files served by nginx"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant', type=int, action='append', dest='restaurant_ids',
+            help="Export only the restaurant with this id (may be repeated)"
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Rewrite menus even if their version has not changed"
+        )
+
+    def handle(self, *args, **options):
+        result = export_public_menus(options['restaurant_ids'], force=options['force'])
+        self.stdout.write(
+            f"{get_export_root()}: written: {result['written']}, "
+            f"removed: {result['removed']}, unchanged: {result['unchanged']}"
+        )
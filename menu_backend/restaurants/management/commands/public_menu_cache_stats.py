@@ -0,0 +1,37 @@
+"""
+Статистика кэша общедоступных меню ресторанов
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from restaurants.cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    """
+    Выводит число попаданий и промахов кэша общедоступных меню ресторанов.
+    Для кэша в памяти процесса счетчики у каждого процесса свои, поэтому
+    команда полезна для общего кэша: файлового, redis или memcached.
+    Счетчики увеличиваются, только если включена настройка
+    PUBLIC_MENU_CACHE_STATS.
+    """
+
+    help = "Show hit/miss counters of the public menu cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help="Reset the counters after showing them"
+        )
+
+    def handle(self, *args, **options):
+        if not settings.PUBLIC_MENU_CACHE_STATS:
+            self.stderr.write("Counting is disabled, set PUBLIC_MENU_CACHE_STATS=1 to enable it")
+        stats = get_cache_stats()
+        hit_rate = '-' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+        self.stdout.write(
+            f"hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {hit_rate}"
+        )
+        if options['reset']:
+            reset_cache_stats()
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2026-10-17 12:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0004_restaurant_average_receipt_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicMenuSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=15, verbose_name='Language')),
+                ('content', models.TextField(verbose_name='JSON document')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='public_snapshots', to='restaurants.restaurant', verbose_name='Restaurant')),
+            ],
+            options={
+                'verbose_name': 'public menu snapshot',
+                'verbose_name_plural': 'public menu snapshots',
+                'db_table': 'restaurants_publicmenusnapshot',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='publicmenusnapshot',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'language'), name='restaurants_publicmenusnapshot_unique_language'),
+        ),
+    ]
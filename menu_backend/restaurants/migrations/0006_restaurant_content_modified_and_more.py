@@ -0,0 +1,24 @@
+# Generated by Django 4.1.5 on 2026-10-17 12:53
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_publicmenusnapshot_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='content_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Public menu modification time'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='content_version',
+            field=models.PositiveBigIntegerField(default=1, verbose_name='Public menu version'),
+        ),
+    ]
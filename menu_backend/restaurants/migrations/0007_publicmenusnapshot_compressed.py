@@ -0,0 +1,23 @@
+# Generated by Django 4.1.5 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0006_restaurant_content_modified_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicmenusnapshot',
+            name='content_br',
+            field=models.BinaryField(blank=True, null=True, verbose_name='JSON document compressed with brotli'),
+        ),
+        migrations.AddField(
+            model_name='publicmenusnapshot',
+            name='content_gzip',
+            field=models.BinaryField(blank=True, null=True, verbose_name='JSON document compressed with gzip'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-17 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0007_publicmenusnapshot_compressed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='restaurantstaff',
+            index=models.Index(fields=['user', 'restaurant'], name='restaurants_staff_user_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.1.5 on 2026-10-17 15:30
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def lowercase_slugs(apps, schema_editor):
+    """
+    Переводит имеющиеся никнеймы ресторанов в нижний регистр. Ресторан,
+    никнейм которого отличается от никнейма другого ресторана только регистром,
+    получает никнейм вида id_<первичный ключ>, а если и он занят, то
+    id_<первичный ключ>_<номер>.
+    """
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    slugs = dict(Restaurant.objects.order_by('pk').values_list('pk', 'slug'))
+    taken = {slug for slug in slugs.values() if slug == slug.lower()}
+    for pk, slug in slugs.items():
+        if slug == slug.lower():
+            continue
+        lowered = slug.lower()
+        if lowered in taken:
+            lowered = f"id_{pk}"
+            number = 0
+            while lowered in taken:
+                number += 1
+                lowered = f"id_{pk}_{number}"
+        taken.add(lowered)
+        Restaurant.objects.filter(pk=pk).update(slug=lowered)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0008_restaurantstaff_user_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='slug',
+            field=models.SlugField(max_length=100, verbose_name='Nickname'),
+        ),
+        migrations.AddConstraint(
+            model_name='restaurant',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('slug'), name='restaurants_restaurant_slug_lower_uniq'),
+        ),
+    ]
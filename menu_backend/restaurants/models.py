@@ -7,13 +7,18 @@
 *   Категория ресторанов
 *   Ресторан
 *   Сотрудник или владелец ресторана
+*   Подготовленное общедоступное меню ресторана
 """
 
 import qrcode
 import logging
+import uuid
 
 from django.conf import settings
-from django.db import models
+from django.db import connections, models, router
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from parler.models import TranslatableModel, TranslatedFields
@@ -57,6 +62,11 @@ class Restaurant(TranslatableModel):
         ordering = ['pk']
         verbose_name = _('restaurant')
         verbose_name_plural = _('restaurants')
+        constraints = [
+            # Никнеймы сравниваются без учета регистра. Никнейм хранится в
+            # нижнем регистре, и этот индекс также ускоряет поиск по нему.
+            models.UniqueConstraint(Lower('slug'), name='restaurants_restaurant_slug_lower_uniq'),
+        ]
 
     translations = TranslatedFields(
         name=models.CharField(
@@ -73,7 +83,6 @@ class Restaurant(TranslatableModel):
     slug = models.SlugField(
         verbose_name=_("Nickname"),
         max_length=100,
-        unique=True,
         blank=False,
         null=False
     )
@@ -172,6 +181,18 @@ class Restaurant(TranslatableModel):
         blank=True, null=True,
         verbose_name=_('Average receipt price')
     )
+    # Версия общедоступного меню ресторана. Увеличивается при любом изменении
+    # данных, из которых собирается общедоступное меню.
+    content_version = models.PositiveBigIntegerField(
+        verbose_name=_('Public menu version'),
+        default=1,
+        blank=False, null=False
+    )
+    content_modified = models.DateTimeField(
+        verbose_name=_('Public menu modification time'),
+        default=timezone.now,
+        blank=False, null=False
+    )
 
     def __str__(self):
         return self.name
@@ -179,25 +200,65 @@ class Restaurant(TranslatableModel):
     def save(self, *args, **kwargs):
         """
         Сохранить данные о ресторане. Если для ресторана не задано сокращенное название
-        для URL то сгенерировать его автоматически на основе его первичного ключа
+        для URL то сгенерировать его автоматически на основе его первичного ключа.
+
+        Новый ресторан без сокращенного названия записывается одним запросом
+        INSERT: его первичный ключ заранее берется из последовательности базы
+        данных. Если СУБД не поддерживает последовательности (SQLite), то
+        ресторан добавляется с временным уникальным названием, которое затем
+        заменяется запросом UPDATE одного поля.
         """
-        if self.pk:
-            if self.slug:
-                self.slug = self.slug.lower()
-            else:
-                self.slug = f"id_{self.pk}"
-            super().save(*args, **kwargs)
-        elif not self.slug:
-            self.slug = "id__"
-            super().save(*args, **kwargs)
+        if self.slug:
+            self.slug = self.slug.lower()
+        elif self.pk:
+            self.slug = f"id_{self.pk}"
+        elif self.__reserve_pk(kwargs.get('using')):
             self.slug = f"id_{self.pk}"
-            super().save()
+            kwargs['force_insert'] = True
         else:
+            self.slug = f"id__{uuid.uuid4().hex}"
             super().save(*args, **kwargs)
+            self.slug = f"id_{self.pk}"
+            Restaurant.objects.filter(pk=self.pk).update(slug=self.slug)
+            return
+        super().save(*args, **kwargs)
+
+    def __reserve_pk(self, using=None):
+        """
+        Присваивает новому ресторану следующее значение последовательности
+        первичных ключей. Возвращает False, если СУБД не PostgreSQL.
+        """
+        connection = connections[using or router.db_for_write(Restaurant, instance=self)]
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s))',
+                [self._meta.db_table, self._meta.pk.column]
+            )
+            self.pk = cursor.fetchone()[0]
+        return True
+
+    @classmethod
+    def bump_content_version(cls, restaurant_ids):
+        """
+        Увеличивает версии общедоступных меню ресторанов с первичными ключами
+        restaurant_ids одним запросом к базе данных, не вызывая сигналов сохранения
+        """
+        cls.objects.filter(pk__in=restaurant_ids).update(
+            content_version=F('content_version') + 1,
+            content_modified=timezone.now()
+        )
 
     @property
     def current_menu(self):
-        """Возвращает текущее активное меню ресторана"""
+        """
+        Возвращает текущее активное меню ресторана. Если опубликованные меню
+        загружены заранее (см. `restaurants.prefetch`), то запрос не выполняется.
+        """
+        if hasattr(self, 'prefetched_published_menus'):
+            menus = self.prefetched_published_menus
+            return menus[0] if menus else None
         return self.menus.filter(published=True).first()
 
     def generate_qrcode(self):
@@ -260,6 +321,10 @@ class RestaurantStaff(models.Model):
         db_table = 'restaurants_restaurantstaff'
         verbose_name = _('restaurant ownership or employment')
         verbose_name_plural = _('restaurant ownerships or employments')
+        indexes = [
+            # Для проверки того, что пользователь работает в ресторане
+            models.Index(fields=['user', 'restaurant'], name='restaurants_staff_user_idx'),
+        ]
 
     user = models.ForeignKey(
         to=User,
@@ -284,3 +349,76 @@ class RestaurantStaff(models.Model):
 
     def __str__(self):
         return f"User {self.user.username} in {self.restaurant.name}"
+
+    @classmethod
+    def works_in(cls, user, restaurant_field):
+        """
+        Условие для запроса объектов, связанных с ресторанами: пользователь user
+        работает в ресторане, на который ссылается поле restaurant_field объекта
+        (например, 'menu__restaurant'). Рестораны пользователя выбираются
+        подзапросом по индексу (user, restaurant), а не загружаются отдельным
+        запросом. Подзапрос не зависит от строк внешнего запроса, поэтому
+        выполняется один раз: PostgreSQL хэширует его результат, а SQLite
+        материализует его во временный индекс.
+        """
+        return Q(**{
+            f'{restaurant_field}__in': cls.objects.filter(user=user).values('restaurant')
+        })
+
+
+class PublicMenuSnapshot(models.Model):
+    """
+    Подготовленное общедоступное меню ресторана
+    -------------------------------------------
+
+    Хранит готовый JSON-документ с информацией о ресторане и его текущем меню
+    на одном из языков, перечисленных в PARLER_LANGUAGES, и его варианты,
+    сжатые gzip и brotli (если пакет Brotli установлен). Документ собирается
+    заново при изменении ресторана, его категории, меню, разделов меню или
+    блюд, поэтому для ответа на запрос общедоступного меню достаточно одного
+    запроса к базе данных.
+    """
+
+    class Meta:
+        ordering = ['pk']
+        db_table = 'restaurants_publicmenusnapshot'
+        verbose_name = _('public menu snapshot')
+        verbose_name_plural = _('public menu snapshots')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['restaurant', 'language'],
+                name='restaurants_publicmenusnapshot_unique_language'
+            )
+        ]
+
+    restaurant = models.ForeignKey(
+        to=Restaurant,
+        verbose_name=_('Restaurant'),
+        related_name='public_snapshots',
+        on_delete=models.CASCADE,
+        blank=False, null=False
+    )
+    language = models.CharField(
+        max_length=15,
+        verbose_name=_('Language'),
+        blank=False, null=False
+    )
+    content = models.TextField(
+        verbose_name=_('JSON document'),
+        blank=False, null=False
+    )
+    content_gzip = models.BinaryField(
+        verbose_name=_('JSON document compressed with gzip'),
+        blank=True, null=True
+    )
+    content_br = models.BinaryField(
+        verbose_name=_('JSON document compressed with brotli'),
+        blank=True, null=True
+    )
+    updated_at = models.DateTimeField(
+        verbose_name=_('Updated at'),
+        auto_now=True
+    )
+
+    def __str__(self):
+        return f"Public menu of restaurant {self.restaurant_id} ({self.language})"
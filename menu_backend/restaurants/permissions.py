@@ -4,7 +4,7 @@
 
 from rest_framework import permissions
 
-from restaurants.models import Restaurant
+from restaurants.roles import get_restaurant_roles
 
 
 class RestaurantCategoryPermission(permissions.BasePermission):
@@ -60,7 +60,7 @@ class RestaurantPermission(permissions.BasePermission):
             return True
         # Редактировать ресторан может администратор или владелец ресторана
         # Более подробная проверка делается в has_object_permission
-        return request.user.is_staff or request.user.restaurant_staff.exists()
+        return request.user.is_staff or get_restaurant_roles(request).has_any()
 
     def has_object_permission(self, request, view, obj):
         """
@@ -68,7 +68,7 @@ class RestaurantPermission(permissions.BasePermission):
         """
         if request.method in permissions.SAFE_METHODS or request.user.is_staff:
             return True
-        return obj.check_owner(request.user)
+        return get_restaurant_roles(request).is_owner(obj.pk)
 
 
 class RestaurantStaffPermission(permissions.BasePermission):
@@ -94,11 +94,8 @@ class RestaurantStaffPermission(permissions.BasePermission):
             # При добавлении нового сотрудника придется извлекать идентификатор
             # ресторана из данных запроса и проверять права для него...
             restaurant_id = request.data.get('restaurant', None)
-            if restaurant_id is None or not Restaurant.objects.filter(pk=restaurant_id).exists():
-                return False
-            restaurant = Restaurant.objects.get(pk=restaurant_id)
-            return restaurant.check_owner(request.user)
-        return request.user.restaurant_staff.exists()
+            return get_restaurant_roles(request).is_owner(restaurant_id)
+        return get_restaurant_roles(request).has_any()
 
     def has_object_permission(self, request, view, obj):
         """
@@ -108,6 +105,7 @@ class RestaurantStaffPermission(permissions.BasePermission):
             return False
         if request.user.is_staff:
             return True
+        roles = get_restaurant_roles(request)
         if request.method in permissions.SAFE_METHODS:
-            return obj.restaurant.check_owner_or_worker(request.user)
-        return obj.restaurant.check_owner(request.user)
+            return roles.is_owner_or_worker(obj.restaurant_id)
+        return roles.is_owner(obj.restaurant_id)
@@ -0,0 +1,38 @@
+"""
+Предварительная загрузка данных ресторанов
+------------------------------------------
+
+Сериализатор ресторана выводит категорию ресторана и текущее меню со всем его
+содержимым. Функция `prefetch_restaurants` добавляет к запросу ресторанов
+предварительную загрузку всех этих данных, после которой страница с любым
+числом ресторанов выводится фиксированным числом запросов. Данные, которые
+не будут выведены (см. `menu_backend.sparse_fields`), можно не загружать.
+"""
+
+from django.db.models import Prefetch
+
+from menus.models import Menu
+from menus.prefetch import prefetch_menus
+
+
+def prefetch_restaurants(queryset, category=True, menu=True):
+    """
+    Добавляет к запросу ресторанов queryset предварительную загрузку переводов,
+    а также, если category равен True, загрузку категорий ресторанов с их
+    переводами и, если menu равен True, текущего меню (свойство
+    `Restaurant.current_menu`) с его содержимым
+    """
+    queryset = queryset.prefetch_related('translations')
+    if category:
+        queryset = queryset.select_related('category').prefetch_related(
+            'category__translations'
+        )
+    if menu:
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                'menus',
+                queryset=prefetch_menus(Menu.objects.filter(published=True)),
+                to_attr='prefetched_published_menus'
+            )
+        )
+    return queryset
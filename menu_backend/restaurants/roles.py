@@ -0,0 +1,95 @@
+"""
+Должности пользователя в ресторанах в пределах одного запроса
+--------------------------------------------------------------
+
+Проверки прав доступа к ресторанам, меню, разделам меню и блюдам сводятся к
+вопросу о том, работает ли пользователь в ресторане и в какой должности. Чтобы
+каждая проверка не выполняла свой запрос к базе данных, должности пользователя
+во всех его ресторанах загружаются одним запросом при первой проверке и
+хранятся в объекте запроса до его завершения.
+"""
+
+from django.utils.functional import cached_property
+
+from restaurants.models import RestaurantStaff
+
+
+OWNER = 'owner'
+WORKER = 'worker'
+
+
+class RestaurantRoles:
+    """
+    Должности пользователя user в ресторанах. Неактивный и неавторизованный
+    пользователь не работает ни в одном ресторане.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def positions(self):
+        """
+        Словарь, сопоставляющий первичному ключу ресторана множество должностей
+        пользователя в нем. Уникальность пары пользователя и ресторана в таблице
+        сотрудников не гарантируется, поэтому должностей может быть несколько.
+        """
+        if not self.user.is_authenticated or not self.user.is_active:
+            return {}
+        positions = {}
+        staff = RestaurantStaff.objects.filter(user=self.user).values_list('restaurant_id', 'position')
+        for restaurant_id, position in staff:
+            positions.setdefault(restaurant_id, set()).add(position)
+        return positions
+
+    def restaurant_ids(self, position=None):
+        """
+        Множество первичных ключей ресторанов, в которых пользователь работает
+        в должности position или в любой должности, если position равен None
+        """
+        return {
+            restaurant_id for restaurant_id, items in self.positions.items()
+            if position is None or position in items
+        }
+
+    def has_any(self):
+        """Возвращает True, если пользователь работает хотя бы в одном ресторане"""
+        return bool(self.positions)
+
+    def is_owner(self, restaurant_id):
+        """Возвращает True, если пользователь - владелец ресторана restaurant_id"""
+        return OWNER in self.positions.get(to_pk(restaurant_id), ())
+
+    def is_owner_or_worker(self, restaurant_id):
+        """
+        Возвращает True, если пользователь - владелец или сотрудник ресторана
+        restaurant_id
+        """
+        return to_pk(restaurant_id) in self.positions
+
+
+def to_pk(value):
+    """
+    Первичный ключ из значения value, которое может быть взято из данных
+    запроса, или None, если значение не является числом
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_restaurant_roles(request):
+    """
+    Должности текущего пользователя запроса request в ресторанах. Объект
+    создается при первом вызове и хранится в запросе, поэтому все проверки прав
+    доступа в пределах запроса выполняют не больше одного запроса к базе данных.
+    """
+    # Запрос Django REST Framework оборачивает запрос Django, и хранить
+    # должности нужно в нем, чтобы они были общими для всех оберток
+    http_request = getattr(request, '_request', request)
+    roles = getattr(http_request, 'restaurant_roles', None)
+    if roles is None or roles.user is not request.user:
+        roles = RestaurantRoles(request.user)
+        http_request.restaurant_roles = roles
+    return roles
@@ -7,6 +7,8 @@ from parler_rest.fields import TranslatedFieldsField
 
 from rest_framework.serializers import ModelSerializer, SlugField, ImageField
 
+from menu_backend.sparse_fields import SparseFieldsSerializerMixin
+
 from restaurants.models import Restaurant, RestaurantCategory, RestaurantStaff
 
 from menus.serializers import MenuSerializer
@@ -21,7 +23,7 @@ class RestaurantCategorySerializer(TranslatableModelSerializer):
         fields = ['id', 'translations']
 
 
-class RestaurantSerializer(TranslatableModelSerializer):
+class RestaurantSerializer(SparseFieldsSerializerMixin, TranslatableModelSerializer):
     """Сериализатор для ресторанов"""
     translations = TranslatedFieldsField(shared_model=Restaurant)
     # Нужно определить явно, чтобы сделать необязательным. Если
@@ -59,6 +61,7 @@ class RestaurantSerializer(TranslatableModelSerializer):
             'category_data',
             'current_menu',
         ]
+        expandable_fields = ['category_data', 'current_menu']
 
     category_data = RestaurantCategorySerializer(source='category', read_only=True)
     current_menu = MenuSerializer(read_only=True)
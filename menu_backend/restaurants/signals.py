@@ -0,0 +1,196 @@
+"""
+Обработчики сигналов, отслеживающие изменения общедоступных меню ресторанов
+---------------------------------------------------------------------------
+
+Общедоступное меню ресторана зависит от самого ресторана, его категории, меню,
+разделов меню и блюд, а также от их переводов. При сохранении или удалении
+любого из этих объектов подготовленные меню соответствующих ресторанов
+пересобираются, версии этих меню увеличиваются, а устаревшие меню удаляются
+из кэша. Если включена настройка PUBLIC_MENU_EXPORT_ON_CHANGE, то измененные
+меню также выгружаются в статические файлы (см. `restaurants.static_export`).
+
+Пересборка откладывается до завершения текущей транзакции, чтобы при удалении
+ресторана или меню со всеми разделами и блюдами, а также при сохранении объекта
+вместе с его переводами меню каждого ресторана собиралось один раз. Вне
+транзакции меню пересобирается сразу при каждом изменении, поэтому API
+изменяет объекты в транзакции (см. `menu_backend.transactions`), админка
+сохраняет объекты в транзакции сама, а прочий код, изменяющий несколько
+объектов, должен использовать `transaction.atomic`.
+"""
+
+import logging
+import threading
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from menus.models import Menu, MenuCourse, MenuSection
+from restaurants.cache import invalidate_public_menus
+from restaurants.models import Restaurant, RestaurantCategory
+from restaurants.snapshots import rebuild_snapshots
+from restaurants.static_export import export_public_menus
+
+
+_pending = threading.local()
+
+
+def _pending_changes():
+    """
+    Еще не обработанные изменения текущего потока. Если транзакция, в которой
+    они сделаны, отменена, то вместе с ней отменена и пересборка меню, поэтому
+    такие изменения забываются.
+    """
+    connection = transaction.get_connection()
+    if not any(func is _flush for sids, func in connection.run_on_commit):
+        _pending.restaurant_ids = set()
+        _pending.masters = defaultdict(set)
+        _pending.owners = {}
+    return _pending
+
+
+def _flush():
+    """Пересобирает меню всех ресторанов, изменения в которых еще не обработаны"""
+    restaurant_ids = getattr(_pending, 'restaurant_ids', set())
+    masters = getattr(_pending, 'masters', {})
+    _pending.restaurant_ids = set()
+    _pending.masters = defaultdict(set)
+    _pending.owners = {}
+    # Рестораны объектов с измененными переводами ищутся одним запросом на
+    # модель. Удаленные объекты здесь уже не найдутся, но о них сообщили
+    # обработчики удаления самих объектов.
+    for model, pks in masters.items():
+        field = 'restaurant_id' if model is Menu else 'menu__restaurant_id'
+        restaurant_ids.update(model.objects.filter(pk__in=pks).values_list(field, flat=True))
+    restaurant_ids.discard(None)
+    if not restaurant_ids:
+        return
+    versions = dict(
+        Restaurant.objects.filter(pk__in=restaurant_ids).values_list('pk', 'content_version')
+    )
+    for restaurant_id in sorted(restaurant_ids):
+        rebuild_snapshots(restaurant_id)
+    # Версия меняется после пересборки, чтобы по новой версии никогда не
+    # отдавалось старое содержимое
+    Restaurant.bump_content_version(restaurant_ids)
+    invalidate_public_menus(versions)
+    if settings.PUBLIC_MENU_EXPORT_ON_CHANGE:
+        try:
+            export_public_menus(restaurant_ids)
+        except OSError:
+            # Изменения уже сохранены, поэтому ошибка записи файлов не должна
+            # приводить к ошибке запроса. Файлы будут обновлены при следующей
+            # выгрузке командой export_public_menus.
+            logging.getLogger('root').exception("Failed to export public menus")
+
+
+def public_menu_changed(*restaurant_ids):
+    """
+    Сообщает об изменении общедоступных меню ресторанов с первичными ключами
+    restaurant_ids. Эту функцию должен вызывать любой код, изменяющий данные
+    меню в обход сигналов сохранения моделей, например через `bulk_create` или
+    `QuerySet.update`.
+    """
+    _pending_changes().restaurant_ids.update(item for item in restaurant_ids if item is not None)
+    transaction.on_commit(_flush)
+
+
+def _master_changed(model, pk):
+    """
+    Сообщает об изменении перевода объекта модели model (меню, раздела меню или
+    блюда) с первичным ключом pk, ресторан которого неизвестен. Ресторан
+    найдется при пересборке меню вместе с ресторанами других таких объектов.
+    """
+    _pending_changes().masters[model].add(pk)
+    transaction.on_commit(_flush)
+
+
+def _restaurant_of(menu_id):
+    """
+    Первичный ключ ресторана, к которому относится меню с первичным ключом
+    menu_id. Результат запоминается до пересборки меню, чтобы при каскадном
+    удалении множества блюд одного меню не искать ресторан для каждого из них.
+    """
+    owners = _pending_changes().owners
+    if menu_id not in owners:
+        owners[menu_id] = Menu.objects.filter(pk=menu_id).values_list('restaurant_id', flat=True).first()
+    return owners[menu_id]
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def restaurant_changed(sender, instance, **kwargs):
+    """Изменен или удален ресторан"""
+    public_menu_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Restaurant._parler_meta.root_model)
+def restaurant_translation_changed(sender, instance, **kwargs):
+    """Изменен или удален перевод названия или описания ресторана"""
+    public_menu_changed(instance.master_id)
+
+
+@receiver(post_save, sender=RestaurantCategory)
+def category_changed(sender, instance, **kwargs):
+    """Изменена категория ресторанов"""
+    public_menu_changed(*instance.restaurants.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=RestaurantCategory)
+def category_deleting(sender, instance, **kwargs):
+    """
+    Удаляется категория ресторанов. После удаления ссылки ресторанов на нее будут
+    очищены, поэтому рестораны нужно найти заранее.
+    """
+    public_menu_changed(*instance.restaurants.values_list('pk', flat=True))
+
+
+@receiver([post_save, post_delete], sender=RestaurantCategory._parler_meta.root_model)
+def category_translation_changed(sender, instance, **kwargs):
+    """Изменен или удален перевод названия категории ресторанов"""
+    public_menu_changed(
+        *Restaurant.objects.filter(category_id=instance.master_id).values_list('pk', flat=True)
+    )
+
+
+@receiver(pre_save, sender=Menu)
+def menu_saving(sender, instance, **kwargs):
+    """
+    Сохраняется меню. Если меню перенесено в другой ресторан, то меню прежнего
+    ресторана тоже изменилось.
+    """
+    if instance.pk:
+        public_menu_changed(_restaurant_of(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Menu)
+def menu_changed(sender, instance, **kwargs):
+    """Изменено или удалено меню"""
+    public_menu_changed(instance.restaurant_id)
+
+
+@receiver([post_save, post_delete], sender=MenuSection)
+@receiver([post_save, post_delete], sender=MenuCourse)
+def menu_item_changed(sender, instance, **kwargs):
+    """Изменен или удален раздел меню или блюдо"""
+    public_menu_changed(_restaurant_of(instance.menu_id))
+
+
+@receiver([post_save, post_delete], sender=Menu._parler_meta.root_model)
+@receiver([post_save, post_delete], sender=MenuSection._parler_meta.root_model)
+@receiver([post_save, post_delete], sender=MenuCourse._parler_meta.root_model)
+def menu_translation_changed(sender, instance, **kwargs):
+    """
+    Изменен или удален перевод меню, раздела меню или блюда. Если объект
+    перевода уже загружен (например, перевод сохраняется вместе с ним), то
+    ресторан берется из объекта, иначе ищется при пересборке меню.
+    """
+    master_field = sender._meta.get_field('master')
+    if not master_field.is_cached(instance):
+        _master_changed(master_field.related_model, instance.master_id)
+    elif isinstance(instance.master, Menu):
+        public_menu_changed(instance.master.restaurant_id)
+    else:
+        public_menu_changed(_restaurant_of(instance.master.menu_id))
@@ -0,0 +1,224 @@
+"""
+Подготовленные общедоступные меню ресторанов
+--------------------------------------------
+
+Общедоступное меню ресторана меняется только тогда, когда сотрудники ресторана
+редактируют ресторан, его меню, разделы меню или блюда, а запрашивается намного
+чаще. Поэтому JSON-документ с меню для каждого языка из PARLER_LANGUAGES
+собирается заранее, сохраняется в модели PublicMenuSnapshot и отдается
+пользователям без обхода меню. Вместе с документом хранятся его сжатые
+варианты (см. `restaurants.compression`). Документы пересобираются
+обработчиками сигналов из `restaurants.signals`.
+
+Клиенты, переключающие язык меню, могут получить меню сразу на нескольких
+языках одним JSON-документом, который составляется из подготовленных меню.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
+from menu_backend.renderers import FastJSONRenderer
+from restaurants.compression import BROTLI, GZIP, IDENTITY, compress, compress_all
+from restaurants.loaders import (
+    aload_public_restaurant,
+    aload_public_restaurant_languages,
+    load_public_restaurant,
+    load_public_restaurant_languages
+)
+from restaurants.models import PublicMenuSnapshot, Restaurant
+
+
+# Поле PublicMenuSnapshot, в котором хранится меню, сжатое каждым способом
+SNAPSHOT_FIELDS = {IDENTITY: 'content', GZIP: 'content_gzip', BROTLI: 'content_br'}
+
+# Признак набора меню на нескольких языках в обозначении языка
+BUNDLE_PREFIX = '*'
+
+
+def get_snapshot_languages():
+    """Список языков, для которых хранятся подготовленные меню"""
+    return [item['code'] for item in settings.PARLER_LANGUAGES[None]]
+
+
+def render_public_menu(data):
+    """Возвращает JSON-документ с данными data в виде строки"""
+    return FastJSONRenderer().render(data).decode('utf-8')
+
+
+def encode_public_menu(content):
+    """
+    Словарь, сопоставляющий JSON-документу content (ключ None) и каждому
+    поддерживаемому способу сжатия соответствующий вариант документа
+    """
+    encoded = compress_all(content)
+    encoded[IDENTITY] = content
+    return encoded
+
+
+def get_bundle_key(languages):
+    """
+    Обозначение языка для набора меню на языках languages, например '*en+ru'.
+    Оно используется вместо языка в ключе кэша и в ETag.
+    """
+    return BUNDLE_PREFIX + '+'.join(languages)
+
+
+def rebuild_snapshots(restaurant_id):
+    """
+    Пересобирает подготовленные меню ресторана на всех языках. Если ресторана уже
+    нет, то ничего не делает (подготовленные меню удаляются вместе с рестораном).
+    Возвращает словарь, сопоставляющий языку словарь с JSON-документом на этом
+    языке и его сжатыми вариантами (см. `encode_public_menu`).
+    """
+    languages = get_snapshot_languages()
+    try:
+        documents = load_public_restaurant_languages(restaurant_id, languages)
+    except Restaurant.DoesNotExist:
+        return {}
+    contents = {
+        language: encode_public_menu(render_public_menu(data))
+        for language, data in documents.items()
+    }
+    PublicMenuSnapshot.objects.bulk_create(
+        [
+            PublicMenuSnapshot(
+                restaurant_id=restaurant_id,
+                language=language,
+                content=encoded[IDENTITY],
+                content_gzip=encoded.get(GZIP),
+                content_br=encoded.get(BROTLI)
+            )
+            for language, encoded in contents.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['restaurant', 'language'],
+        update_fields=['content', 'content_gzip', 'content_br', 'updated_at']
+    )
+    return contents
+
+
+def get_public_menu(restaurant_id, language: str = settings.LANGUAGE_CODE, encoding=IDENTITY):
+    """
+    Возвращает JSON-документ с общедоступным меню ресторана на языке language,
+    сжатый способом encoding (по умолчанию несжатый).
+
+    Обычно документ берется из подготовленных меню одним запросом к базе данных.
+    Если подготовленного меню еще нет, то меню ресторана собирается и сохраняется.
+    Меню на языках, отсутствующих в PARLER_LANGUAGES, не сохраняются и собираются
+    (и сжимаются) при каждом запросе.
+
+    Вместо языка можно указать обозначение набора меню на нескольких языках
+    (см. `get_bundle_key`), тогда возвращается документ `get_public_menu_bundle`.
+
+    Если ресторана нет, то возбуждает Restaurant.DoesNotExist.
+    """
+    if language.startswith(BUNDLE_PREFIX):
+        content = get_public_menu_bundle(restaurant_id, language[1:].split('+'))
+        return content if encoding is IDENTITY else compress(content, encoding)
+    content = PublicMenuSnapshot.objects.filter(
+        restaurant_id=restaurant_id, language=language
+    ).values_list(SNAPSHOT_FIELDS[encoding], flat=True).first()
+    if content is not None:
+        return content if encoding is IDENTITY else bytes(content)
+    if language not in get_snapshot_languages():
+        content = render_public_menu(load_public_restaurant(restaurant_id, language))
+        return content if encoding is IDENTITY else compress(content, encoding)
+    # Сжатого варианта может не быть, если меню собиралось процессом без
+    # поддержки этого способа сжатия, тогда меню тоже пересобирается
+    contents = rebuild_snapshots(restaurant_id)
+    if not contents:
+        raise Restaurant.DoesNotExist
+    return contents[language][encoding]
+
+
+def get_public_menu_bundle(restaurant_id, languages):
+    """
+    Возвращает JSON-документ, сопоставляющий каждому языку из списка languages
+    общедоступное меню ресторана на этом языке. Документ составляется из
+    подготовленных меню, которые загружаются одним запросом. Меню на языках,
+    отсутствующих в PARLER_LANGUAGES, загружаются вместе, так что переводы
+    на все эти языки загружаются одним запросом для каждой модели.
+
+    Если ресторана нет, то возбуждает Restaurant.DoesNotExist.
+    """
+    contents = dict(PublicMenuSnapshot.objects.filter(
+        restaurant_id=restaurant_id, language__in=languages
+    ).values_list('language', 'content'))
+    missing = [language for language in languages if language not in contents]
+    if set(missing) & set(get_snapshot_languages()):
+        rebuilt = rebuild_snapshots(restaurant_id)
+        if not rebuilt:
+            raise Restaurant.DoesNotExist
+        contents.update({
+            language: encoded[IDENTITY]
+            for language, encoded in rebuilt.items() if language in missing
+        })
+        missing = [language for language in missing if language not in contents]
+    if missing:
+        documents = load_public_restaurant_languages(restaurant_id, missing)
+        contents.update({
+            language: render_public_menu(data) for language, data in documents.items()
+        })
+    return _join_bundle(languages, contents)
+
+
+def _join_bundle(languages, contents):
+    """
+    Составляет набор меню на языках languages из JSON-документов contents.
+    Документы вставляются в набор как есть, без повторного разбора.
+    """
+    return '{' + ','.join(
+        f'{json.dumps(language)}:{contents[language]}' for language in languages
+    ) + '}'
+
+
+async def aget_public_menu(restaurant_id, language: str = settings.LANGUAGE_CODE, encoding=IDENTITY):
+    """
+    Асинхронный вариант `get_public_menu`. Пересборка подготовленных меню,
+    которая нужна только при их отсутствии, выполняется синхронно в отдельном
+    потоке, потому что она сохраняет данные в транзакции.
+    """
+    if language.startswith(BUNDLE_PREFIX):
+        content = await aget_public_menu_bundle(restaurant_id, language[1:].split('+'))
+        return content if encoding is IDENTITY else compress(content, encoding)
+    content = await PublicMenuSnapshot.objects.filter(
+        restaurant_id=restaurant_id, language=language
+    ).values_list(SNAPSHOT_FIELDS[encoding], flat=True).afirst()
+    if content is not None:
+        return content if encoding is IDENTITY else bytes(content)
+    if language not in get_snapshot_languages():
+        content = render_public_menu(await aload_public_restaurant(restaurant_id, language))
+        return content if encoding is IDENTITY else compress(content, encoding)
+    contents = await sync_to_async(rebuild_snapshots)(restaurant_id)
+    if not contents:
+        raise Restaurant.DoesNotExist
+    return contents[language][encoding]
+
+
+async def aget_public_menu_bundle(restaurant_id, languages):
+    """Асинхронный вариант `get_public_menu_bundle`"""
+    contents = {
+        language: content
+        async for language, content in PublicMenuSnapshot.objects.filter(
+            restaurant_id=restaurant_id, language__in=languages
+        ).values_list('language', 'content')
+    }
+    missing = [language for language in languages if language not in contents]
+    if set(missing) & set(get_snapshot_languages()):
+        rebuilt = await sync_to_async(rebuild_snapshots)(restaurant_id)
+        if not rebuilt:
+            raise Restaurant.DoesNotExist
+        contents.update({
+            language: encoded[IDENTITY]
+            for language, encoded in rebuilt.items() if language in missing
+        })
+        missing = [language for language in missing if language not in contents]
+    if missing:
+        documents = await aload_public_restaurant_languages(restaurant_id, missing)
+        contents.update({
+            language: render_public_menu(data) for language, data in documents.items()
+        })
+    return _join_bundle(languages, contents)
@@ -0,0 +1,176 @@
+"""
+Выгрузка общедоступных меню ресторанов в статические файлы
+----------------------------------------------------------
+
+Общедоступное меню каждого ресторана на каждом языке из PARLER_LANGUAGES
+записывается в файл `<никнейм>.<язык>.json` в каталоге PUBLIC_MENU_EXPORT_ROOT
+(по умолчанию `static/menus`), а рядом - его вариант, сжатый gzip, с расширением
+`.json.gz`. Эти файлы отдает nginx, не обращаясь к серверу приложений.
+
+Выгрузка инкрементальная: в файле `manifest.json` того же каталога хранятся
+никнейм и версия меню каждого выгруженного ресторана, и файлы переписываются
+только для ресторанов, у которых версия меню или никнейм изменились. Файлы
+записываются во временные файлы и затем атомарно переименовываются, поэтому
+nginx никогда не отдает недописанный файл. Манифест, файл блокировки `.lock` и
+временные файлы лежат в том же каталоге, и nginx их не отдает (см.
+`nginx/nginx.conf`).
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from restaurants.compression import GZIP, IDENTITY
+from restaurants.models import PublicMenuSnapshot, Restaurant
+from restaurants.snapshots import get_snapshot_languages, rebuild_snapshots
+
+
+MANIFEST_NAME = 'manifest.json'
+
+# Число ресторанов, подготовленные меню которых загружаются одним запросом
+BATCH_SIZE = 100
+
+
+def get_export_root():
+    """Каталог, в который выгружаются меню"""
+    return Path(settings.PUBLIC_MENU_EXPORT_ROOT)
+
+
+def get_menu_file_names(slug, language):
+    """Имена файлов с меню ресторана с никнеймом slug на языке language"""
+    return {
+        IDENTITY: f'{slug}.{language}.json',
+        GZIP: f'{slug}.{language}.json.gz',
+    }
+
+
+def _write_atomic(path, data):
+    """Атомарно записывает в файл path байтовую строку data"""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        # Временный файл создается доступным только владельцу, а читать его
+        # должен nginx
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def _remove_files(root, slug, languages):
+    """Удаляет файлы с меню ресторана с никнеймом slug"""
+    for language in languages:
+        for name in get_menu_file_names(slug, language).values():
+            (root / name).unlink(missing_ok=True)
+
+
+@contextmanager
+def _locked(root):
+    """
+    Блокирует каталог root на время выгрузки, чтобы несколько процессов не
+    перезаписывали файлы и манифест одновременно
+    """
+    with open(root / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_manifest(root):
+    """
+    Словарь, сопоставляющий первичному ключу ресторана (строке) никнейм и
+    версию выгруженного меню
+    """
+    try:
+        with open(root / MANIFEST_NAME, 'rb') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _load_contents(restaurant_ids, languages):
+    """
+    Загружает подготовленные меню ресторанов restaurant_ids. Возвращает словарь,
+    сопоставляющий первичному ключу ресторана словарь с меню на каждом языке
+    и его сжатым вариантом. Недостающие подготовленные меню пересобираются.
+    Ресторанов, которых уже нет, в результате нет.
+    """
+    contents = {restaurant_id: {} for restaurant_id in restaurant_ids}
+    rows = PublicMenuSnapshot.objects.filter(
+        restaurant_id__in=restaurant_ids, language__in=languages
+    ).values_list('restaurant_id', 'language', 'content', 'content_gzip')
+    for restaurant_id, language, content, content_gzip in rows:
+        if content_gzip is not None:
+            contents[restaurant_id][language] = {IDENTITY: content, GZIP: bytes(content_gzip)}
+    for restaurant_id in restaurant_ids:
+        if len(contents[restaurant_id]) < len(languages):
+            contents[restaurant_id] = rebuild_snapshots(restaurant_id)
+            if not contents[restaurant_id]:
+                del contents[restaurant_id]
+    return contents
+
+
+def export_public_menus(restaurant_ids=None, force=False):
+    """
+    Выгружает в статические файлы меню ресторанов restaurant_ids или всех
+    ресторанов, если restaurant_ids равен None. Меню, версия которых не
+    изменилась с предыдущей выгрузки, не переписываются, если не указан
+    параметр force. Файлы удаленных ресторанов и файлы с прежними никнеймами
+    ресторанов удаляются.
+
+    Возвращает словарь с числом записанных, удаленных и неизмененных меню.
+    """
+    root = get_export_root()
+    root.mkdir(parents=True, exist_ok=True)
+    languages = get_snapshot_languages()
+    with _locked(root):
+        manifest = _read_manifest(root)
+        queryset = Restaurant.objects.all()
+        if restaurant_ids is None:
+            candidates = set(manifest)
+        else:
+            queryset = queryset.filter(pk__in=restaurant_ids)
+            candidates = {str(restaurant_id) for restaurant_id in restaurant_ids}
+        current = {
+            str(pk): {'slug': slug, 'version': version}
+            for pk, slug, version in queryset.values_list('pk', 'slug', 'content_version')
+        }
+        removed = [key for key in candidates if key in manifest and key not in current]
+        changed = [key for key, entry in current.items() if force or manifest.get(key) != entry]
+        # Файлы с прежними никнеймами удаляются до записи новых файлов, потому
+        # что прежний никнейм одного ресторана мог стать никнеймом другого
+        for key in removed:
+            _remove_files(root, manifest.pop(key)['slug'], languages)
+        for key in changed:
+            if key in manifest and manifest[key]['slug'] != current[key]['slug']:
+                _remove_files(root, manifest.pop(key)['slug'], languages)
+        written = 0
+        for start in range(0, len(changed), BATCH_SIZE):
+            batch = [int(key) for key in changed[start:start + BATCH_SIZE]]
+            for restaurant_id, documents in _load_contents(batch, languages).items():
+                entry = current[str(restaurant_id)]
+                for language, encoded in documents.items():
+                    names = get_menu_file_names(entry['slug'], language)
+                    _write_atomic(root / names[IDENTITY], encoded[IDENTITY].encode('utf-8'))
+                    _write_atomic(root / names[GZIP], encoded[GZIP])
+                manifest[str(restaurant_id)] = entry
+                written += 1
+        _write_atomic(
+            root / MANIFEST_NAME,
+            json.dumps(manifest, sort_keys=True, indent=1).encode('utf-8')
+        )
+    return {
+        'written': written,
+        'removed': len(removed),
+        'unchanged': len(current) - len(changed),
+    }
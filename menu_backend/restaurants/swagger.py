@@ -7,6 +7,7 @@ from django.utils.translation import gettext_lazy as _
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
+from menus.swagger import export_format_parameter
 from restaurants.serializers import RestaurantSerializer
 
 
@@ -29,200 +30,238 @@ swagger_restaurant_by_slug = swagger_auto_schema(
 )
 
 
-swagger_public_menu = swagger_auto_schema(
-    operation_name=_("Get the menu"),
-    operation_description=_("Get the current menu for the specified restaurant"),
-    manual_parameters=[
-        openapi.Parameter(
-            'id',
-            openapi.IN_PATH,
-            description=_("The primary key of the restaurant"),
+# Общедоступное меню ресторана
+public_menu_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'id': openapi.Schema(
             type=openapi.TYPE_INTEGER,
-            required=True
+            description=_("The identifier of the restaurant (same with 'id' parameter)")
         ),
-        openapi.Parameter(
-            'language',
-            openapi.IN_QUERY,
-            description=_("Return the menu at this language"),
+        'name': openapi.Schema(
             type=openapi.TYPE_STRING,
-            required=False
+            description=_("The name of the restaurant")
         ),
-    ],
-    responses = {
-        200: openapi.Schema(
+        'description': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("The description of the restaurant")
+        ),
+        'phone': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("The contact phone number of the restaurant")
+        ),
+        'site': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("The restaurant's site url")
+        ),
+        'twitter_profile': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("Restaurant's Twitter profile url")
+        ),
+        'facebook_profile': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("Restaurant's Facebook profile url")
+        ),
+        'instagram_profile': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("Restaurant's Instagram profile url")
+        ),
+        'average_receipt': openapi.Schema(
+            type=openapi.TYPE_NUMBER,
+            description=_("Average receipt price")
+        ),
+        'logo': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("The URL of restaurant's logo image, if available")
+        ),
+        'picture': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description=_("The URL of restaurant's picture, if available")
+        ),
+        'stars': openapi.Schema(
+            type=openapi.TYPE_INTEGER,
+            description=_("Number of stars. Greater value means greater quality and greater prices. Worst value is 1 while the value 0 means information is not available.")
+        ),
+        'category': openapi.Schema(
             type=openapi.TYPE_OBJECT,
+            description=_("Restaurant category"),
             properties={
-                'id': openapi.Schema(
-                    type=openapi.TYPE_INTEGER,
-                    description=_("The identifier of the restaurant (same with 'id' parameter)")
-                ),
                 'name': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("The name of the restaurant")
-                ),
-                'description': openapi.Schema(
+                    description=_("Category name. It may be somewhat like 'italian', 'chinese', etc."),
+                )
+            }
+        ),
+        'address': openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            description=_("Restaurant address"),
+            properties={
+                'country': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("The description of the restaurant")
+                    description=_("Country name")
                 ),
-                'phone': openapi.Schema(
+                'city': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("The contact phone number of the restaurant")
+                    description=_("City name")
                 ),
-                'site': openapi.Schema(
+                'street': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("The restaurant's site url")
+                    description=_("Street name")
                 ),
-                'twitter_profile': openapi.Schema(
+                'building': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("Restaurant's Twitter profile url")
+                    description=_("Building number")
                 ),
-                'facebook_profile': openapi.Schema(
+                'address_details': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("Restaurant's Facebook profile url")
+                    description=_("Address details like entrance number, level number, etc.")
                 ),
-                'instagram_profile': openapi.Schema(
+                'zip_code': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("Restaurant's Instagram profile url")
+                    description=_("Zip/postal code")
                 ),
-                'average_receipt': openapi.Schema(
+                'latitude': openapi.Schema(
                     type=openapi.TYPE_NUMBER,
-                    description=_("Average receipt price")
-                ),
-                'logo': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    description=_("The URL of restaurant's logo image, if available")
+                    description=_("Latitude if available")
                 ),
-                'picture': openapi.Schema(
+                'longitude': openapi.Schema(
+                    type=openapi.TYPE_NUMBER,
+                    description=_("Longitude if available")
+                )
+            }
+        ),
+        'menu': openapi.Schema(
+            description=_("Restaurant's menu"),
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'title': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=_("The URL of restaurant's picture, if available")
-                ),
-                'stars': openapi.Schema(
-                    type=openapi.TYPE_INTEGER,
-                    description=_("Number of stars. Greater value means greater quality and greater prices. Worst value is 1 while the value 0 means information is not available.")
-                ),
-                'category': openapi.Schema(
-                    type=openapi.TYPE_OBJECT,
-                    description=_("Restaurant category"),
-                    properties={
-                        'name': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("Category name. It may be somewhat like 'italian', 'chinese', etc."),
-                        )
-                    }
+                    description=_("Menu title")
                 ),
-                'address': openapi.Schema(
-                    type=openapi.TYPE_OBJECT,
-                    description=_("Restaurant address"),
-                    properties={
-                        'country': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("Country name")
-                        ),
-                        'city': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("City name")
-                        ),
-                        'street': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("Street name")
-                        ),
-                        'building': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("Building number")
-                        ),
-                        'address_details': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("Address details like entrance number, level number, etc.")
-                        ),
-                        'zip_code': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("Zip/postal code")
-                        ),
-                        'latitude': openapi.Schema(
-                            type=openapi.TYPE_NUMBER,
-                            description=_("Latitude if available")
-                        ),
-                        'longitude': openapi.Schema(
-                            type=openapi.TYPE_NUMBER,
-                            description=_("Longitude if available")
-                        )
-                    }
-                ),
-                'menu': openapi.Schema(
-                    description=_("Restaurant's menu"),
-                    type=openapi.TYPE_OBJECT,
-                    properties={
-                        'title': openapi.Schema(
-                            type=openapi.TYPE_STRING,
-                            description=_("Menu title")
-                        ),
-                        'sections': openapi.Schema(
-                            type=openapi.TYPE_ARRAY,
-                            description=_("Menu sections"),
-                            items=openapi.Items(
-                                type=openapi.TYPE_OBJECT,
-                                properties={
-                                    'title': openapi.Schema(
-                                        type=openapi.TYPE_STRING,
-                                        description=_("Menu section title")
-                                    ),
-                                    'courses': openapi.Schema(
-                                        type=openapi.TYPE_ARRAY,
-                                        description=_("Menu courses within this section"),
-                                        items=openapi.Items(
-                                            type=openapi.TYPE_OBJECT,
-                                            properties={
-                                                'title': openapi.Schema(
-                                                    type=openapi.TYPE_STRING,
-                                                    description=_("Course name")
-                                                ),
-                                                'composition': openapi.Schema(
-                                                    type=openapi.TYPE_STRING,
-                                                    description=_("Course composition description")
-                                                ),
-                                                'price': openapi.Schema(
-                                                    type=openapi.TYPE_INTEGER,
-                                                    description=_("Course price")
-                                                ),
-                                                'cooking_time': openapi.Schema(
-                                                    type=openapi.TYPE_STRING,
-                                                    description=_("Cooking time")
-                                                ),
-                                            }
-                                        )
-                                    )
-                                }
-                            )
-                        ),
-                        'courses': openapi.Schema(
-                            type=openapi.TYPE_ARRAY,
-                            description=_("Menu courses not belonging to any section"),
-                            items=openapi.Items(
-                                type=openapi.TYPE_OBJECT,
-                                properties={
-                                    'title': openapi.Schema(
-                                        type=openapi.TYPE_STRING,
-                                        description=_("Course name")
-                                    ),
-                                    'composition': openapi.Schema(
-                                        type=openapi.TYPE_STRING,
-                                        description=_("Course composition description")
-                                    ),
-                                    'price': openapi.Schema(
-                                        type=openapi.TYPE_INTEGER,
-                                        description=_("Course price")
-                                    ),
-                                    'cooking_time': openapi.Schema(
-                                        type=openapi.TYPE_STRING,
-                                        description=_("Cooking time")
-                                    ),
-                                }
+                'sections': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    description=_("Menu sections"),
+                    items=openapi.Items(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'title': openapi.Schema(
+                                type=openapi.TYPE_STRING,
+                                description=_("Menu section title")
+                            ),
+                            'courses': openapi.Schema(
+                                type=openapi.TYPE_ARRAY,
+                                description=_("Menu courses within this section"),
+                                items=openapi.Items(
+                                    type=openapi.TYPE_OBJECT,
+                                    properties={
+                                        'title': openapi.Schema(
+                                            type=openapi.TYPE_STRING,
+                                            description=_("Course name")
+                                        ),
+                                        'composition': openapi.Schema(
+                                            type=openapi.TYPE_STRING,
+                                            description=_("Course composition description")
+                                        ),
+                                        'price': openapi.Schema(
+                                            type=openapi.TYPE_INTEGER,
+                                            description=_("Course price")
+                                        ),
+                                        'cooking_time': openapi.Schema(
+                                            type=openapi.TYPE_STRING,
+                                            description=_("Cooking time")
+                                        ),
+                                    }
+                                )
                             )
-                        )
-                    }
+                        }
+                    )
+                ),
+                'courses': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    description=_("Menu courses not belonging to any section"),
+                    items=openapi.Items(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'title': openapi.Schema(
+                                type=openapi.TYPE_STRING,
+                                description=_("Course name")
+                            ),
+                            'composition': openapi.Schema(
+                                type=openapi.TYPE_STRING,
+                                description=_("Course composition description")
+                            ),
+                            'price': openapi.Schema(
+                                type=openapi.TYPE_INTEGER,
+                                description=_("Course price")
+                            ),
+                            'cooking_time': openapi.Schema(
+                                type=openapi.TYPE_STRING,
+                                description=_("Cooking time")
+                            ),
+                        }
+                    )
                 )
             }
+        )
+    }
+)
+
+
+swagger_public_menu = swagger_auto_schema(
+    operation_name=_("Get the menu"),
+    operation_description=_("Get the current menu for the specified restaurant"),
+    manual_parameters=[
+        openapi.Parameter(
+            'id',
+            openapi.IN_PATH,
+            description=_("The primary key of the restaurant"),
+            type=openapi.TYPE_INTEGER,
+            required=True
+        ),
+        openapi.Parameter(
+            'language',
+            openapi.IN_QUERY,
+            description=_(
+                "Return the menu at this language. Use '*' or a comma-separated "
+                "list of languages to get an object mapping each language to "
+                "the menu at this language"
+            ),
+            type=openapi.TYPE_STRING,
+            required=False
+        ),
+    ],
+    responses = {
+        200: public_menu_schema,
+        404: openapi.Response(_("Restaurant not found"))
+    }
+)
+
+
+swagger_public_menu_by_slug = swagger_auto_schema(
+    operation_name=_("Get the menu by restaurant's nickname"),
+    operation_description=_("Get the current menu for the restaurant with the specified nickname"),
+    manual_parameters=[
+        openapi.Parameter(
+            'slug',
+            openapi.IN_PATH,
+            description=_("The nickname of the restaurant"),
+            type=openapi.TYPE_STRING,
+            required=True
+        ),
+        openapi.Parameter(
+            'language',
+            openapi.IN_QUERY,
+            description=_(
+                "Return the menu at this language. Use '*' or a comma-separated "
+                "list of languages to get an object mapping each language to "
+                "the menu at this language"
+            ),
+            type=openapi.TYPE_STRING,
+            required=False
         ),
+    ],
+    responses = {
+        200: public_menu_schema,
         404: openapi.Response(_("Restaurant not found"))
     }
 )
@@ -249,3 +288,18 @@ swagger_qrcode = swagger_auto_schema(
     }
 )
 
+
+swagger_restaurant_export = swagger_auto_schema(
+    operation_summary=_("Export all menus of the restaurant to a file"),
+    operation_description=_(
+        "Stream all menus of the restaurant (including menus without courses) "
+        "with their sections, courses and all translations as a JSON Lines or "
+        "CSV file, one menu, section or course record per line"
+    ),
+    manual_parameters=[export_format_parameter],
+    responses={
+        200: openapi.Response(_("The exported file")),
+        400: openapi.Response(_("Unknown data format")),
+        403: openapi.Response(_("No permission to export the menus")),
+    }
+)
@@ -7,6 +7,8 @@ from contextlib import contextmanager
 
 import datetime
 
+from django.core.cache import cache
+
 from rest_framework.test import APITestCase
 
 from restaurants.models import Restaurant, RestaurantCategory
@@ -273,6 +275,9 @@ class BaseTestCase(APITestCase):
     def setUp(self):
         """Создает данные для тестирования"""
         super().setUp()
+        # parler хранит переводы в кэше, а первичные ключи объектов повторяются
+        # от теста к тесту, поэтому кэш от предыдущего теста нужно очистить
+        cache.clear()
         self._data = populate_test_data()
 
     def tearDown(self):
@@ -2,7 +2,49 @@
 Тесты для API работы с ресторанами
 """
 
-from restaurants.tests._fixtures import BaseTestCase
+import datetime
+import gzip
+import json
+import tempfile
+import uuid
+
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITransactionTestCase
+
+from menu_backend.renderers import FastJSONRenderer
+
+from menus.models import Menu, MenuCourse, MenuSection
+from restaurants.cache import get_cache_stats, public_menu_key
+from restaurants.compression import choose_encoding
+from restaurants.loaders import aload_public_restaurant, load_public_restaurant
+from restaurants.models import PublicMenuSnapshot, Restaurant
+from restaurants.snapshots import (
+    aget_public_menu_bundle,
+    get_public_menu_bundle,
+    rebuild_snapshots,
+    render_public_menu
+)
+from restaurants.static_export import export_public_menus
+from restaurants.tests._fixtures import BaseTestCase, cleanup_test_data, populate_test_data
+from restaurants.views import (
+    AsyncUnauthorizedRestaurantBySlugView,
+    AsyncUnauthorizedRestaurantView,
+    restaurant_to_json
+)
 
 
 class PublicRestaurantTestCase(BaseTestCase):
@@ -172,3 +214,762 @@ class PublicRestaurantTestCase(BaseTestCase):
             [item['price'] for item in info['courses']],
             [20, 25]
         )
+
+
+class PublicRestaurantQueriesTestCase(BaseTestCase):
+    """
+    Тесты для загрузки общедоступного меню ресторана фиксированным числом запросов
+    """
+
+    def setUp(self):
+        """Добавляет в меню дешевого ресторана много разделов и блюд"""
+        super().setUp()
+        menu = self._data['cheap_menu']
+        SectionTranslation = MenuSection._parler_meta.root_model
+        CourseTranslation = MenuCourse._parler_meta.root_model
+        sections = MenuSection.objects.bulk_create([
+            MenuSection(menu=menu, published=(number % 5 != 0))
+            for number in range(15)
+        ])
+        SectionTranslation.objects.bulk_create([
+            SectionTranslation(master=section, language_code=code, title=f"Section {section.pk} {code}")
+            for section in sections
+            for code in ('en', 'ru')
+        ])
+        courses = MenuCourse.objects.bulk_create([
+            MenuCourse(
+                menu=menu,
+                section=sections[number % 15] if number % 20 else None,
+                price=number,
+                published=(number % 7 != 0),
+                cooking_time=datetime.timedelta(seconds=number)
+            )
+            for number in range(200)
+        ])
+        CourseTranslation.objects.bulk_create([
+            CourseTranslation(
+                master=course, language_code=code,
+                title=f"Course {course.pk} {code}",
+                composition=f"Composition {course.pk} {code}"
+            )
+            for course in courses
+            # Часть блюд переведена только на английский
+            for code in (('en', 'ru') if course.pk % 3 else ('en', ))
+        ])
+
+    def __get_url(self, restaurant='cheap_restaurant'):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/{self._data[restaurant].pk}/"
+
+    def test_same_as_restaurant_to_json(self):
+        """Загрузчик возвращает те же данные, что и restaurant_to_json"""
+        for restaurant in ('cheap_restaurant', 'premium_restaurant'):
+            for language in ('en', 'ru', 'de'):
+                with self.subTest(restaurant=restaurant, language=language):
+                    expected = restaurant_to_json(
+                        Restaurant.objects.get(pk=self._data[restaurant].pk),
+                        language
+                    )
+                    self.assertEqual(
+                        load_public_restaurant(self._data[restaurant].pk, language),
+                        expected
+                    )
+
+    def test_query_count(self):
+        """Число запросов не зависит от размера меню"""
+        for language in ('en', 'ru'):
+            with self.subTest(language=language), self.assertNumQueries(4):
+                info = load_public_restaurant(self._data['cheap_restaurant'].pk, language)
+            self.assertEqual(len(info['menu']['sections']), 14)
+
+    def test_not_found(self):
+        """Для несуществующего ресторана возвращается ошибка 404"""
+        ans = self.client.get("/api/v1/public/restaurants/100500/")
+        self.assertEqual(ans.status_code, 404)
+
+
+class PublicMenuSnapshotTestCase(BaseTestCase):
+    """
+    Тесты для подготовленных общедоступных меню ресторанов
+    """
+
+    def __get_url(self):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/"
+
+    def test_snapshot_served(self):
+        """Подготовленное меню отдается запросом версии меню и одним запросом к нему"""
+        self.client.get(self.__get_url(), {'language': 'ru'})
+        self.assertEqual(
+            PublicMenuSnapshot.objects.filter(restaurant=self._data['cheap_restaurant']).count(),
+            2
+        )
+        # Без кэша меню берется из подготовленных меню
+        cache.clear()
+        with self.assertNumQueries(2):
+            ans = self.client.get(self.__get_url(), {'language': 'ru'})
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['name'], "Придорожное кафе")
+
+    def test_snapshot_rebuilt_on_course_change(self):
+        """При изменении блюда подготовленное меню пересобирается"""
+        self.client.get(self.__get_url())
+        course = self._data['chocolate_sandwich']
+        with self.captureOnCommitCallbacks(execute=True):
+            course.set_current_language('en')
+            course.title = "Sandwich with peanut butter"
+            course.save()
+        ans = self.client.get(self.__get_url())
+        self.assertEqual(
+            ans.json()['menu']['sections'][1]['courses'][0]['title'],
+            "Sandwich with peanut butter"
+        )
+
+    def test_snapshot_rebuilt_on_menu_delete(self):
+        """При удалении меню подготовленное меню пересобирается"""
+        self.client.get(self.__get_url())
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.filter(pk=self._data['cheap_menu'].pk).delete()
+        ans = self.client.get(self.__get_url())
+        self.assertNotIn('menu', ans.json())
+
+    def test_snapshot_rebuilt_on_category_change(self):
+        """При изменении категории подготовленное меню пересобирается"""
+        self.client.get(self.__get_url())
+        category = self._data['category']
+        with self.captureOnCommitCallbacks(execute=True):
+            category.set_current_language('en')
+            category.name = "Street food"
+            category.save()
+        ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.json()['category']['name'], "Street food")
+
+    def test_unknown_language_not_stored(self):
+        """Меню на языках, отсутствующих в настройках, не сохраняется"""
+        ans = self.client.get(self.__get_url(), {'language': 'de'})
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['name'], "A good place to eat")
+        self.assertFalse(PublicMenuSnapshot.objects.filter(language='de').exists())
+
+
+class PublicMenuRebuildPerRequestTestCase(APITransactionTestCase):
+    """
+    Тесты пересборки общедоступного меню при изменении данных запросом. В
+    отличие от остальных тестов запросы не обернуты в общую транзакцию теста,
+    поэтому число пересборок такое же, как при работе сервера.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self._data = populate_test_data()
+
+    def tearDown(self):
+        cleanup_test_data(self._data)
+        super().tearDown()
+
+    def test_patch_with_translations(self):
+        """Изменение блюда вместе с переводами пересобирает меню один раз"""
+        restaurant = self._data['cheap_restaurant']
+        course = self._data['chocolate_sandwich']
+        self.client.force_authenticate(self._data['cheap_worker'])
+        with mock.patch(
+            'restaurants.signals.rebuild_snapshots', wraps=rebuild_snapshots
+        ) as rebuild:
+            ans = self.client.patch(
+                f"/api/v1/menu_courses/{course.pk}/",
+                {
+                    'price': 35,
+                    'translations': {
+                        'en': {'title': "Sandwich with peanut butter"},
+                        'ru': {'title': "Бутерброд с арахисовым маслом"},
+                    },
+                },
+                format='json'
+            )
+        self.assertEqual(ans.status_code, 200)
+        rebuild.assert_called_once_with(restaurant.pk)
+        ans = self.client.get(f"/api/v1/public/restaurants/{restaurant.pk}/", {'language': 'ru'})
+        self.assertEqual(
+            ans.json()['menu']['sections'][1]['courses'][0]['title'],
+            "Бутерброд с арахисовым маслом"
+        )
+
+    def test_delete_courses_with_translations(self):
+        """
+        При удалении блюд вместе с переводами ресторан не ищется отдельно для
+        каждого блюда или перевода
+        """
+        restaurant = self._data['cheap_restaurant']
+        menu = self._data['cheap_menu']
+        with transaction.atomic():
+            for number in range(30):
+                course = menu.courses.create(
+                    section=self._data['drinks_section'], title=f"Course {number}", price=10
+                )
+                course.set_current_language('ru')
+                course.title = f"Блюдо {number}"
+                course.save()
+        with mock.patch(
+            'restaurants.signals.rebuild_snapshots', wraps=rebuild_snapshots
+        ) as rebuild, CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                MenuCourse.objects.filter(menu=menu).delete()
+        rebuild.assert_called_once_with(restaurant.pk)
+        lookups = [
+            item['sql'] for item in queries.captured_queries
+            if 'FROM "menus_menucourses" INNER JOIN "menus_menu"' in item['sql']
+        ]
+        self.assertLessEqual(len(lookups), 1, lookups)
+
+    def test_rollback(self):
+        """Изменения в отмененной транзакции не пересобирают меню после следующей"""
+        course = self._data['chocolate_sandwich']
+        premium = self._data['premium_restaurant']
+        with mock.patch(
+            'restaurants.signals.rebuild_snapshots', wraps=rebuild_snapshots
+        ) as rebuild:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                course.price = 35
+                course.save()
+                raise RuntimeError()
+            with transaction.atomic():
+                premium.save()
+        rebuild.assert_called_once_with(premium.pk)
+
+
+class PublicMenuVersionTestCase(BaseTestCase):
+    """
+    Тесты для заголовков ETag и Last-Modified общедоступного меню ресторана
+    """
+
+    def __get_url(self):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/"
+
+    def test_headers(self):
+        """Ответ содержит заголовки ETag и Last-Modified"""
+        ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.status_code, 200)
+        self.assertTrue(ans['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', ans)
+
+    def test_etag_depends_on_language(self):
+        """Меню на разных языках имеют разные ETag"""
+        ans_en = self.client.get(self.__get_url())
+        ans_ru = self.client.get(self.__get_url(), {'language': 'ru'})
+        self.assertNotEqual(ans_en['ETag'], ans_ru['ETag'])
+
+    def test_if_none_match(self):
+        """Если меню не изменилось, то возвращается ответ 304 без сборки меню"""
+        etag = self.client.get(self.__get_url())['ETag']
+        with self.assertNumQueries(1):
+            ans = self.client.get(self.__get_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(ans.status_code, 304)
+        self.assertEqual(ans['ETag'], etag)
+        self.assertEqual(ans.content, b'')
+
+    def test_if_modified_since(self):
+        """Если меню не изменилось с указанного момента, то возвращается ответ 304"""
+        last_modified = self.client.get(self.__get_url())['Last-Modified']
+        ans = self.client.get(self.__get_url(), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(ans.status_code, 304)
+
+    def test_head(self):
+        """На запрос HEAD отвечаем по одной версии меню"""
+        etag = self.client.get(self.__get_url())['ETag']
+        with self.assertNumQueries(1):
+            ans = self.client.head(self.__get_url())
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans['ETag'], etag)
+
+    def test_version_bumped(self):
+        """При изменении блюда версия меню увеличивается и ETag меняется"""
+        etag = self.client.get(self.__get_url())['ETag']
+        course = self._data['chocolate_sandwich']
+        with self.captureOnCommitCallbacks(execute=True):
+            course.price = 35
+            course.save()
+        ans = self.client.get(self.__get_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(ans.status_code, 200)
+        self.assertNotEqual(ans['ETag'], etag)
+
+    def test_not_found(self):
+        """Для несуществующего ресторана возвращается ошибка 404"""
+        ans = self.client.head("/api/v1/public/restaurants/100500/")
+        self.assertEqual(ans.status_code, 404)
+
+
+class PublicMenuCacheTestCase(BaseTestCase):
+    """
+    Тесты для кэширования общедоступного меню ресторана
+    """
+
+    def __get_url(self):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/"
+
+    def __get_key(self, language='en'):
+        """Ключ кэша для текущей версии меню дешевого ресторана"""
+        restaurant = Restaurant.objects.get(pk=self._data['cheap_restaurant'].pk)
+        return public_menu_key(restaurant.pk, language, restaurant.content_version)
+
+    @override_settings(PUBLIC_MENU_CACHE_STATS=True)
+    def test_cache_hit(self):
+        """Повторный запрос меню обслуживается из кэша"""
+        first = self.client.get(self.__get_url())
+        with self.assertNumQueries(1):
+            second = self.client.get(self.__get_url())
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        stats = get_cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_invalidation(self):
+        """При изменении меню устаревшая версия удаляется из кэша"""
+        self.client.get(self.__get_url())
+        key = self.__get_key()
+        self.assertIsNotNone(cache.get(key))
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.get(pk=self._data['cheap_menu'].pk).save()
+        self.assertIsNone(cache.get(key))
+        self.assertNotEqual(self.__get_key(), key)
+
+    def test_unknown_language(self):
+        """Меню на неизвестном языке отдается и кэшируется как меню на языке по умолчанию"""
+        first = self.client.get(self.__get_url())
+        with self.assertNumQueries(1):
+            second = self.client.get(self.__get_url(), {'language': 'no-such-language'})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIsNone(cache.get(self.__get_key('no-such-language')))
+
+    @override_settings(PUBLIC_MENU_CACHE_STATS=True)
+    def test_stats_command(self):
+        """Команда выводит и обнуляет счетчики попаданий и промахов"""
+        self.client.get(self.__get_url())
+        self.client.get(self.__get_url())
+        out = StringIO()
+        call_command('public_menu_cache_stats', '--reset', stdout=out)
+        self.assertEqual(out.getvalue().strip(), "hits: 1, misses: 1, hit rate: 50.0%")
+        self.assertEqual(get_cache_stats()['hits'], 0)
+
+    def test_stats_disabled(self):
+        """Без настройки PUBLIC_MENU_CACHE_STATS запрос меню из кэша - одно обращение к кэшу"""
+        self.client.get(self.__get_url())
+        with mock.patch('restaurants.cache.cache', wraps=cache) as wrapped:
+            ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(len(wrapped.method_calls), 1)
+        self.assertEqual(get_cache_stats(), {'hits': 0, 'misses': 0, 'hit_rate': None})
+
+
+class PublicMenuCompressionTestCase(BaseTestCase):
+    """
+    Тесты для сжатия общедоступного меню ресторана
+    """
+
+    def __get_url(self):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/"
+
+    def test_gzip(self):
+        """Клиенту, принимающему gzip, меню отдается сжатым"""
+        plain = self.client.get(self.__get_url(), {'language': 'ru'})
+        ans = self.client.get(self.__get_url(), {'language': 'ru'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', ans['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(ans.content)), plain.json())
+        self.assertNotEqual(ans['ETag'], plain['ETag'])
+
+    def test_identity(self):
+        """Без заголовка Accept-Encoding меню отдается несжатым"""
+        ans = self.client.get(self.__get_url())
+        self.assertNotIn('Content-Encoding', ans)
+        self.assertIn('Accept-Encoding', ans['Vary'])
+        self.assertEqual(ans.json()['name'], "A good place to eat")
+
+    def test_precompressed(self):
+        """Сжатое меню хранится вместе с подготовленным меню"""
+        self.client.get(self.__get_url())
+        snapshot = PublicMenuSnapshot.objects.get(
+            restaurant_id=self._data['cheap_restaurant'].pk, language='en'
+        )
+        self.assertEqual(gzip.decompress(bytes(snapshot.content_gzip)).decode(), snapshot.content)
+        with self.assertNumQueries(2):
+            ans = self.client.get(self.__get_url(), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(ans.content, bytes(snapshot.content_gzip))
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.__get_url(), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(cached.content, ans.content)
+
+    def test_if_none_match(self):
+        """ETag сжатого меню подходит только для сжатого меню"""
+        etag = self.client.get(self.__get_url(), HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        ans = self.client.get(
+            self.__get_url(), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(ans.status_code, 304)
+        ans = self.client.get(self.__get_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(ans.status_code, 200)
+
+    def test_choose_encoding(self):
+        """Способ сжатия выбирается по весам из заголовка Accept-Encoding"""
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(choose_encoding('deflate'), None)
+        self.assertEqual(choose_encoding('gzip;q=0'), None)
+        self.assertEqual(choose_encoding('*'), choose_encoding('br, gzip'))
+        self.assertEqual(choose_encoding(''), None)
+        self.assertEqual(choose_encoding(None), None)
+
+
+class PublicMenuExportTestCase(BaseTestCase):
+    """
+    Тесты для выгрузки общедоступных меню ресторанов в статические файлы
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.__root = tempfile.TemporaryDirectory()
+        self.__settings = override_settings(PUBLIC_MENU_EXPORT_ROOT=self.__root.name)
+        self.__settings.enable()
+
+    def tearDown(self):
+        self.__settings.disable()
+        self.__root.cleanup()
+        super().tearDown()
+
+    def __read(self, name):
+        """Содержимое выгруженного файла"""
+        return (Path(self.__root.name) / name).read_bytes()
+
+    def test_export(self):
+        """Меню всех ресторанов выгружаются на всех языках вместе со сжатыми вариантами"""
+        result = export_public_menus()
+        self.assertEqual(result, {'written': 2, 'removed': 0, 'unchanged': 0})
+        ans = self.client.get(
+            f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/",
+            {'language': 'ru'}
+        )
+        self.assertEqual(self.__read('some-cafe.ru.json'), ans.content)
+        self.assertEqual(gzip.decompress(self.__read('some-cafe.ru.json.gz')), ans.content)
+        premium_slug = Restaurant.objects.get(pk=self._data['premium_restaurant'].pk).slug
+        self.assertTrue(self.__read(f'{premium_slug}.en.json'))
+
+    def test_incremental(self):
+        """Повторно выгружаются только изменившиеся меню"""
+        course = self._data['chocolate_sandwich']
+        with self.captureOnCommitCallbacks(execute=True):
+            course.price = 35
+            course.save()
+        export_public_menus()
+        with self.captureOnCommitCallbacks(execute=True):
+            course.price = 45
+            course.save()
+        result = export_public_menus()
+        self.assertEqual(result, {'written': 1, 'removed': 0, 'unchanged': 1})
+        self.assertIn(b'45', self.__read('some-cafe.en.json'))
+        self.assertEqual(export_public_menus()['written'], 0)
+        self.assertEqual(export_public_menus(force=True)['written'], 2)
+
+    def test_slug_changed_and_deleted(self):
+        """Файлы с прежним никнеймом и файлы удаленного ресторана удаляются"""
+        export_public_menus()
+        restaurant = Restaurant.objects.get(pk=self._data['cheap_restaurant'].pk)
+        restaurant.slug = 'other-cafe'
+        restaurant.save()
+        export_public_menus()
+        self.assertFalse((Path(self.__root.name) / 'some-cafe.en.json').exists())
+        self.assertTrue(self.__read('other-cafe.en.json'))
+        Restaurant.objects.filter(pk=self._data['premium_restaurant'].pk).delete()
+        self.assertEqual(export_public_menus()['removed'], 1)
+        self.assertEqual(
+            sorted(path.name for path in Path(self.__root.name).glob('*.json')),
+            ['manifest.json', 'other-cafe.en.json', 'other-cafe.ru.json']
+        )
+
+    def test_on_change(self):
+        """При включенной настройке меню выгружается при каждом изменении"""
+        with override_settings(PUBLIC_MENU_EXPORT_ON_CHANGE=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                course = self._data['chocolate_sandwich']
+                course.price = 35
+                course.save()
+        self.assertIn(b'35', self.__read('some-cafe.en.json'))
+
+    def test_command(self):
+        """Команда выводит число записанных, удаленных и неизмененных меню"""
+        out = StringIO()
+        call_command('export_public_menus', stdout=out)
+        self.assertTrue(out.getvalue().strip().endswith("written: 2, removed: 0, unchanged: 0"))
+
+
+class PublicMenuBundleTestCase(BaseTestCase):
+    """
+    Тесты для получения общедоступного меню ресторана сразу на нескольких языках
+    """
+
+    def __get_url(self):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/"
+
+    def test_all_languages(self):
+        """Параметр language=* возвращает меню на всех языках"""
+        ans = self.client.get(self.__get_url(), {'language': '*'})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(list(info), ['en', 'ru'])
+        for language in ['en', 'ru']:
+            expected = self.client.get(self.__get_url(), {'language': language}).json()
+            self.assertEqual(info[language], expected)
+
+    def test_language_list(self):
+        """Список языков через запятую возвращает меню на этих языках в том же порядке"""
+        ans = self.client.get(self.__get_url(), {'language': 'ru,en'})
+        self.assertEqual(list(ans.json()), ['ru', 'en'])
+        ans = self.client.get(self.__get_url(), {'language': 'ru,'})
+        self.assertEqual(list(ans.json()), ['ru'])
+
+    def test_unknown_language(self):
+        """В списке языков нельзя указывать неизвестные языки"""
+        ans = self.client.get(self.__get_url(), {'language': 'en,xx'})
+        self.assertEqual(ans.status_code, 400)
+
+    def test_queries(self):
+        """Набор меню составляется из подготовленных меню одним запросом"""
+        self.client.get(self.__get_url())
+        cache.clear()
+        with self.assertNumQueries(2):
+            ans = self.client.get(self.__get_url(), {'language': '*'})
+        self.assertEqual(ans.status_code, 200)
+        with self.assertNumQueries(1):
+            self.client.get(self.__get_url(), {'language': '*'})
+
+    def test_not_snapshotted(self):
+        """Меню на языках без подготовленных меню загружаются вместе"""
+        restaurant_id = self._data['cheap_restaurant'].pk
+        PublicMenuSnapshot.objects.all().delete()
+        with self.assertNumQueries(5):
+            content = get_public_menu_bundle(restaurant_id, ['de', 'fr'])
+        self.assertEqual(
+            json.loads(content),
+            {
+                'de': json.loads(render_public_menu(load_public_restaurant(restaurant_id, 'de'))),
+                'fr': json.loads(render_public_menu(load_public_restaurant(restaurant_id, 'fr'))),
+            }
+        )
+
+    def test_etag(self):
+        """Набор меню имеет свой ETag и поддерживает ответ 304"""
+        etag = self.client.get(self.__get_url(), {'language': '*'})['ETag']
+        self.assertNotEqual(etag, self.client.get(self.__get_url())['ETag'])
+        ans = self.client.get(self.__get_url(), {'language': '*'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(ans.status_code, 304)
+
+    def test_invalidation(self):
+        """При изменении меню набор меню на всех языках удаляется из кэша"""
+        self.client.get(self.__get_url(), {'language': '*'})
+        course = self._data['chocolate_sandwich']
+        with self.captureOnCommitCallbacks(execute=True):
+            course.price = 35
+            course.save()
+        info = self.client.get(self.__get_url(), {'language': '*'}).json()
+        prices = [item['price'] for item in info['ru']['menu']['courses']] + [
+            item['price']
+            for section in info['ru']['menu']['sections']
+            for item in section['courses']
+        ]
+        self.assertIn(35, prices)
+
+
+class AsyncPublicMenuTestCase(BaseTestCase):
+    """
+    Тесты для асинхронного варианта API общедоступного меню ресторана
+    """
+
+    def __get_url(self):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/"
+
+    async def __get(self, view_class, data=None, headers=None):
+        """Ответ асинхронного представления view_class на GET-запрос с заголовками headers"""
+        request = AsyncRequestFactory().get(self.__get_url(), data, **(headers or {}))
+        if view_class is AsyncUnauthorizedRestaurantBySlugView:
+            return await view_class.as_view()(request, slug='Some-Cafe')
+        return await view_class.as_view()(request, pk=self._data['cheap_restaurant'].pk)
+
+    async def test_same_as_sync(self):
+        """Асинхронное представление отдает то же меню с теми же заголовками"""
+        for language in ['en', 'ru', 'de', '*']:
+            ans = await self.__get(AsyncUnauthorizedRestaurantView, {'language': language})
+            self.assertEqual(ans.status_code, 200)
+            expected = await sync_to_async(self.client.get)(
+                self.__get_url(), {'language': language}
+            )
+            self.assertEqual(ans.content, expected.content)
+            self.assertEqual(ans['ETag'], expected['ETag'])
+            self.assertEqual(ans['Content-Type'], 'application/json')
+
+    async def test_by_slug(self):
+        """Асинхронное представление по никнейму ресторана"""
+        ans = await self.__get(AsyncUnauthorizedRestaurantBySlugView)
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(json.loads(ans.content)['name'], "A good place to eat")
+
+    async def test_gzip_and_304(self):
+        """Сжатие и ответ 304 работают так же, как в синхронном представлении"""
+        ans = await self.__get(AsyncUnauthorizedRestaurantView, headers={'accept-encoding': 'gzip'})
+        self.assertEqual(ans['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', ans['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(ans.content))['name'], "A good place to eat")
+        ans = await self.__get(
+            AsyncUnauthorizedRestaurantView,
+            headers={'accept-encoding': 'gzip', 'if-none-match': ans['ETag']}
+        )
+        self.assertEqual(ans.status_code, 304)
+
+    async def test_not_snapshotted(self):
+        """Без подготовленных меню меню собирается асинхронными запросами"""
+        restaurant_id = self._data['cheap_restaurant'].pk
+        await PublicMenuSnapshot.objects.all().adelete()
+        data = await aload_public_restaurant(restaurant_id, 'ru')
+        self.assertEqual(data, await sync_to_async(load_public_restaurant)(restaurant_id, 'ru'))
+        content = await aget_public_menu_bundle(restaurant_id, ['de'])
+        self.assertEqual(list(json.loads(content)), ['de'])
+
+    async def test_errors(self):
+        """Неизвестный ресторан и неизвестный язык в списке"""
+        request = AsyncRequestFactory().get("/api/v1/public/restaurants/100500/")
+        ans = await AsyncUnauthorizedRestaurantView.as_view()(request, pk=100500)
+        self.assertEqual(ans.status_code, 404)
+        ans = await self.__get(AsyncUnauthorizedRestaurantView, {'language': 'en,xx'})
+        self.assertEqual(ans.status_code, 400)
+
+    async def test_not_found_same_as_sync(self):
+        """Для неизвестного ресторана возвращается та же ошибка 404 в JSON"""
+        cases = [
+            (AsyncUnauthorizedRestaurantView, "/api/v1/public/restaurants/100500/", {'pk': 100500}),
+            (
+                AsyncUnauthorizedRestaurantBySlugView,
+                "/api/v1/public/restaurants/by_slug/no-such-cafe/",
+                {'slug': 'no-such-cafe'}
+            ),
+        ]
+        for view_class, url, kwargs in cases:
+            with self.subTest(url=url):
+                ans = await view_class.as_view()(AsyncRequestFactory().get(url), **kwargs)
+                expected = await sync_to_async(self.client.get)(url)
+                self.assertEqual(ans.status_code, 404)
+                self.assertEqual(expected.status_code, 404)
+                self.assertEqual(ans['Content-Type'], 'application/json')
+                self.assertEqual(json.loads(ans.content), expected.json())
+
+
+class FastJSONRendererTestCase(BaseTestCase):
+    """
+    Тесты для быстрого JSON-рендерера
+    """
+
+    def test_same_as_json_renderer(self):
+        """Быстрый рендерер выводит то же, что и стандартный"""
+        data = {
+            'price': Decimal('350.50'),
+            'latitude': Decimal('55.757600000000000'),
+            'cooking_time': datetime.timedelta(minutes=15, seconds=30),
+            'created': datetime.datetime(2023, 1, 2, 3, 4, 5, 678900, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2023, 1, 2),
+            'title': gettext_lazy("Restaurant not found"),
+            'text': "Меню\u2028ресторана\u2029",
+            'items': {1: (1, 2), 'set': ['a']},
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'huge': 2 ** 70,
+            'empty': None,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4')
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_public_menu(self):
+        """Общедоступное меню кодируется так же, как стандартным рендерером"""
+        restaurant = Restaurant.objects.get(pk=self._data['cheap_restaurant'].pk)
+        data = restaurant_to_json(restaurant, 'ru')
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_without_orjson(self):
+        """Без orjson используется стандартный рендерер"""
+        data = {'price': Decimal('1.5'), 'cooking_time': datetime.timedelta(minutes=1)}
+        with mock.patch('menu_backend.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_api_response(self):
+        """Быстрый рендерер используется для ответов API"""
+        ans = self.client.get('/api/v1/restaurants/')
+        self.assertEqual(ans.status_code, 200)
+        self.assertIsInstance(ans.accepted_renderer, FastJSONRenderer)
+
+    def test_benchmark(self):
+        """Команда сравнения рендереров проверяет совпадение результатов"""
+        out = StringIO()
+        call_command('benchmark_json_renderers', '--courses', '50', '--repeat', '2', stdout=out)
+        self.assertIn("speedup", out.getvalue())
+
+
+class PublicRestaurantBySlugTestCase(BaseTestCase):
+    """
+    Тесты для API общедоступного меню ресторана по никнейму ресторана
+    """
+
+    def __get_url(self, slug='some-cafe'):
+        """URL для запроса информации о ресторане"""
+        return f"/api/v1/public/restaurants/by_slug/{slug}/"
+
+    def test_by_slug(self):
+        """Меню по никнейму совпадает с меню по первичному ключу"""
+        ans = self.client.get(self.__get_url(), {'language': 'ru'})
+        self.assertEqual(ans.status_code, 200)
+        expected = self.client.get(
+            f"/api/v1/public/restaurants/{self._data['cheap_restaurant'].pk}/",
+            {'language': 'ru'}
+        )
+        self.assertEqual(ans.content, expected.content)
+        self.assertEqual(ans['ETag'], expected['ETag'])
+
+    def test_case_insensitive(self):
+        """Никнейм может быть указан в любом регистре"""
+        ans = self.client.get(self.__get_url('Some-Cafe'))
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['name'], "A good place to eat")
+
+    def test_query_count(self):
+        """Ресторан по никнейму и версия его меню читаются одним запросом"""
+        self.client.get(self.__get_url())
+        with self.assertNumQueries(1):
+            ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.status_code, 200)
+
+    def test_slug_changed(self):
+        """После изменения никнейма прежний никнейм больше не действует"""
+        self.client.get(self.__get_url())
+        restaurant = Restaurant.objects.get(pk=self._data['cheap_restaurant'].pk)
+        restaurant.slug = 'other-cafe'
+        restaurant.save()
+        self.assertEqual(self.client.get(self.__get_url()).status_code, 404)
+        self.assertEqual(self.client.get(self.__get_url('other-cafe')).status_code, 200)
+
+    def test_slug_changed_elsewhere(self):
+        """Никнейм, измененный без сигналов сохранения, тоже перестает действовать"""
+        self.client.get(self.__get_url())
+        Restaurant.objects.filter(pk=self._data['cheap_restaurant'].pk).update(slug='other-cafe')
+        self.assertEqual(self.client.get(self.__get_url()).status_code, 404)
+
+    def test_not_found(self):
+        """Для несуществующего никнейма возвращается ошибка 404"""
+        ans = self.client.get(self.__get_url('no-such-cafe'))
+        self.assertEqual(ans.status_code, 404)
@@ -2,6 +2,11 @@
 Тесты для стандартных REST API для работы с персоналом ресторанов
 """
 
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from restaurants.tests._fixtures import BaseTestCase
 
 
@@ -748,3 +753,118 @@ class RestaurantStaffRestaurantFilterTest(BaseTestCase):
             self.__verify_cheap_worker(results[1])
         else:
             self.fail(f"Неизвестная должность работника {results[0]['position']}")
+
+
+# Запрос, выбирающий данные из таблицы сотрудников ресторанов (первое FROM
+# в запросе относится к этой таблице)
+STAFF_QUERY = re.compile(r'SELECT (?:(?! FROM ).)* FROM "restaurants_restaurantstaff"')
+
+
+class RestaurantRolesQueriesTest(BaseTestCase):
+    """
+    Тесты числа запросов должностей пользователя при проверке прав доступа
+    """
+
+    def __count_roles_queries(self, username, method, url, data=None):
+        """
+        Выполняет запрос от имени пользователя username и возвращает ответ и
+        число запросов, выбирающих данные из таблицы сотрудников ресторанов (не
+        считая подзапросов)
+        """
+        with self.logged_in(username):
+            with CaptureQueriesContext(connection) as queries:
+                ans = getattr(self.client, method)(url, data, format='json')
+        count = sum(
+            1 for query in queries.captured_queries
+            if STAFF_QUERY.match(query['sql'])
+        )
+        return ans, count
+
+    def test_course(self):
+        """Изменение блюда сотрудником ресторана"""
+        ans, count = self.__count_roles_queries(
+            'cheap_worker', 'patch',
+            f"/api/v1/menu_courses/{self._data['chocolate_sandwich'].pk}/", {'price': 40}
+        )
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(count, 1)
+
+    def test_course_create(self):
+        """Добавление блюда сотрудником чужого ресторана запрещено"""
+        ans, count = self.__count_roles_queries(
+            'premium_worker', 'post', "/api/v1/menu_courses/",
+            {
+                'translations': {'en': {'title': "Tea"}},
+                'menu': self._data['cheap_menu'].pk,
+                'price': 10,
+            }
+        )
+        self.assertEqual(ans.status_code, 403)
+        self.assertEqual(count, 1)
+
+    def test_restaurant(self):
+        """Изменение ресторана владельцем"""
+        ans, count = self.__count_roles_queries(
+            'cheap_owner', 'patch',
+            f"/api/v1/restaurants/{self._data['cheap_restaurant'].pk}/", {'stars': 4}
+        )
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(count, 1)
+
+    def test_staff_list(self):
+        """Список сотрудников ресторанов пользователя"""
+        ans, count = self.__count_roles_queries('cheap_worker', 'get', "/api/v1/restaurant_staff/")
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['count'], 2)
+        # Должности пользователя, число сотрудников и сами сотрудники
+        self.assertEqual(count, 3)
+
+    def test_my_restaurants(self):
+        """Список ресторанов владельца"""
+        ans, count = self.__count_roles_queries('cheap_owner', 'get', "/api/v1/users/my_restaurants/")
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['count'], 1)
+        self.assertEqual(count, 1)
+
+
+class RestaurantRolesDuplicateStaffTest(BaseTestCase):
+    """
+    Тесты прав пользователя, у которого несколько записей о работе в одном
+    ресторане
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Запись о работе в должности сотрудника добавлена после записи о
+        # работе в должности владельца ресторана
+        self._data['cheap_restaurant'].restaurant_staff.create(
+            user=self._data['cheap_owner'], position='worker'
+        )
+
+    def test_restaurant_update(self):
+        """Владелец ресторана может изменить ресторан"""
+        with self.logged_in('cheap_owner'):
+            ans = self.client.patch(
+                f"/api/v1/restaurants/{self._data['cheap_restaurant'].pk}/",
+                {'stars': 4}, format='json'
+            )
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['stars'], 4)
+
+    def test_staff_update(self):
+        """Владелец ресторана может изменить должность сотрудника"""
+        staff = self._data['cheap_restaurant'].restaurant_staff.get(user=self._data['cheap_worker'])
+        with self.logged_in('cheap_owner'):
+            ans = self.client.patch(
+                f"/api/v1/restaurant_staff/{staff.pk}/", {'position': 'owner'}, format='json'
+            )
+        self.assertEqual(ans.status_code, 200)
+
+    def test_my_restaurants(self):
+        """Ресторан есть в списке ресторанов владельца"""
+        with self.logged_in('cheap_owner'):
+            ans = self.client.get("/api/v1/users/my_restaurants/")
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in ans.json()['results']], [self._data['cheap_restaurant'].pk]
+        )
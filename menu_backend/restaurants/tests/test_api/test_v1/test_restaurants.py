@@ -2,9 +2,21 @@
 Тесты для стандартных REST API для работы с ресторанами
 """
 
+import json
+
+from unittest.mock import patch
+
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.renderers import JSONRenderer
+
 from restaurants.tests._fixtures import BaseTestCase
 
+from menus.models import Menu, MenuCourse, MenuSection
 from restaurants.models import Restaurant
+from restaurants.serializers import RestaurantSerializer
+from restaurants.viewsets import RestaurantViewSet
 
 
 class RestaurantRetrieveTest(BaseTestCase):
@@ -142,6 +154,182 @@ class RestaurantListTest(BaseTestCase):
         self.verify_restaurant_list(info['results'])
 
 
+class RestaurantListQueriesTest(BaseTestCase):
+    """
+    Тесты числа запросов к базе данных при выводе ресторанов с большими меню
+    """
+
+    def setUp(self):
+        super().setUp()
+        restaurants = [
+            Restaurant.objects.create(
+                name=f"Restaurant {number}",
+                slug=f'restaurant-{number}',
+                stars=3,
+                country='Russia',
+                city='Moscow',
+                building=str(number),
+                zip_code='123456',
+            )
+            for number in range(20)
+        ]
+        MenuTranslation = Menu._parler_meta.root_model
+        SectionTranslation = MenuSection._parler_meta.root_model
+        CourseTranslation = MenuCourse._parler_meta.root_model
+        menus = Menu.objects.bulk_create([
+            Menu(restaurant=restaurant, published=True) for restaurant in restaurants
+        ])
+        MenuTranslation.objects.bulk_create([
+            MenuTranslation(master=menu, language_code=code, title=f"Menu {menu.pk} {code}")
+            for menu in menus
+            for code in ('en', 'ru')
+        ])
+        sections = MenuSection.objects.bulk_create([
+            MenuSection(menu=menu, published=True)
+            for menu in menus
+            for _ in range(10)
+        ])
+        SectionTranslation.objects.bulk_create([
+            SectionTranslation(master=section, language_code=code, title=f"Section {section.pk} {code}")
+            for section in sections
+            for code in ('en', 'ru')
+        ])
+        courses = MenuCourse.objects.bulk_create([
+            MenuCourse(
+                menu=menu,
+                # Каждое десятое блюдо не входит ни в один раздел
+                section=sections[index * 10 + number % 10] if number % 10 else None,
+                price=number,
+                published=(number % 7 != 0),
+            )
+            for index, menu in enumerate(menus)
+            for number in range(200)
+        ])
+        CourseTranslation.objects.bulk_create([
+            CourseTranslation(master=course, language_code=code, title=f"Course {course.pk} {code}")
+            for course in courses
+            for code in ('en', 'ru')
+        ])
+        self.restaurant_ids = [restaurant.pk for restaurant in restaurants]
+
+    def test_list(self):
+        """
+        Страница ресторанов с меню из 200 блюд выводится фиксированным числом
+        запросов, и результат совпадает с выводом каждого ресторана по отдельности
+        """
+        with self.assertNumQueries(12):
+            ans = self.client.get("/api/v1/restaurants/")
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(info['count'], 22)
+        self.assertEqual(len(info['results']), 20)
+        for item in info['results']:
+            expected = json.loads(
+                JSONRenderer().render(RestaurantSerializer(Restaurant.objects.get(pk=item['id'])).data)
+            )
+            self.assertEqual(item, expected)
+        menu = info['results'][-1]['current_menu']
+        courses = sum(
+            len(section['published_courses']) for section in menu['sections']
+        ) + len(menu['extra_published_courses'])
+        self.assertEqual(courses, 171)
+
+    def test_cursor(self):
+        """При выдаче по курсору страницы выводятся фиксированным числом запросов"""
+        with self.assertNumQueries(11):
+            ans = self.client.get("/api/v1/restaurants/", {'pagination': 'cursor'})
+        self.assertEqual(ans.status_code, 200)
+        info = ans.json()
+        self.assertEqual(len(info['results']), 20)
+        with self.assertNumQueries(10):
+            ans = self.client.get(info['next'])
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in ans.json()['results']], self.restaurant_ids[-2:]
+        )
+
+    def test_retrieve(self):
+        """Ресторан с меню из 200 блюд выводится фиксированным числом запросов"""
+        restaurant_id = self.restaurant_ids[0]
+        with self.assertNumQueries(10):
+            ans = self.client.get(f"/api/v1/restaurants/{restaurant_id}/")
+        self.assertEqual(ans.status_code, 200)
+        with self.assertNumQueries(10):
+            ans = self.client.get("/api/v1/restaurants/by_slug/Restaurant-0/")
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json()['id'], restaurant_id)
+
+
+class RestaurantSparseFieldsTest(BaseTestCase):
+    """
+    Тесты для выбора выводимых полей ресторанов параметрами fields и expand
+    """
+
+    URL = "/api/v1/restaurants/"
+
+    def test_default(self):
+        """Без параметров выводятся все поля, в том числе текущее меню"""
+        ans = self.client.get(self.URL)
+        self.assertEqual(ans.status_code, 200)
+        for item in ans.json()['results']:
+            self.assertIn('current_menu', item)
+            self.assertIn('category_data', item)
+
+    def test_no_expand(self):
+        """С пустым параметром expand вложенные объекты не выводятся и не загружаются"""
+        # Число ресторанов, рестораны и их переводы
+        with self.assertNumQueries(3):
+            ans = self.client.get(self.URL, {'expand': ''})
+        self.assertEqual(ans.status_code, 200)
+        for item in ans.json()['results']:
+            self.assertNotIn('current_menu', item)
+            self.assertNotIn('category_data', item)
+            self.assertIn('translations', item)
+            self.assertIn('stars', item)
+
+    def test_fields(self):
+        """Выводятся только перечисленные поля"""
+        with self.assertNumQueries(3):
+            ans = self.client.get(self.URL, {'fields': 'id, slug,stars,city,logo'})
+        self.assertEqual(ans.status_code, 200)
+        for item in ans.json()['results']:
+            self.assertEqual(set(item), {'id', 'slug', 'stars', 'city', 'logo'})
+
+    def test_fields_and_expand(self):
+        """Вложенные объекты выводятся, если перечислены в fields или expand"""
+        ans = self.client.get(self.URL, {'fields': 'id,category_data', 'expand': 'current_menu'})
+        self.assertEqual(ans.status_code, 200)
+        for item in ans.json()['results']:
+            self.assertEqual(set(item), {'id', 'category_data', 'current_menu'})
+        self.assertEqual(
+            ans.json()['results'][0]['current_menu']['id'],
+            self._data['cheap_restaurant'].current_menu.pk
+        )
+
+    def test_retrieve(self):
+        """Параметры учитываются при получении одного ресторана"""
+        restaurant = self._data['cheap_restaurant']
+        ans = self.client.get(f"{self.URL}{restaurant.pk}/", {'expand': 'category_data'})
+        self.assertEqual(ans.status_code, 200)
+        self.assertNotIn('current_menu', ans.json())
+        self.assertEqual(ans.json()['category_data']['id'], restaurant.category.pk)
+        ans = self.client.get(f"{self.URL}by_slug/{restaurant.slug}/", {'fields': 'id'})
+        self.assertEqual(ans.status_code, 200)
+        self.assertEqual(ans.json(), {'id': restaurant.pk})
+
+    def test_update(self):
+        """При изменении ресторана параметры не ограничивают изменяемые поля"""
+        restaurant = self._data['cheap_restaurant']
+        with self.logged_in('cheap_owner'):
+            ans = self.client.patch(
+                f"{self.URL}{restaurant.pk}/?fields=id", {'stars': 5}, format='json'
+            )
+        self.assertEqual(ans.status_code, 200)
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.stars, 5)
+        self.assertIn('current_menu', ans.json())
+
+
 class RestaurantCreateTest(BaseTestCase):
     """
     Тесты для API создания нового ресторана
@@ -930,3 +1118,120 @@ class RestaurantCreateTestWithExistingSlug(BaseTestCase):
         self.assertEqual(ans.status_code, 400)
         # Проверяем, что ресторан не был добавлен
         self.assertEqual(Restaurant.objects.count(), 2)
+
+
+class RestaurantSlugTest(BaseTestCase):
+    """
+    Тесты для присвоения никнеймов ресторанам и их уникальности без учета
+    регистра
+    """
+
+    URL = "/api/v1/restaurants/"
+
+    def __create(self, **kwargs):
+        """Добавить ресторан и вернуть список выполненных запросов к таблице ресторанов"""
+        with CaptureQueriesContext(connection) as queries:
+            restaurant = Restaurant.objects.create(
+                name="Ресторан", stars=3, country='Russia', city='Moscow',
+                street='Tverskaya', building='1', zip_code='125009', **kwargs
+            )
+        return restaurant, [
+            item['sql'] for item in queries.captured_queries
+            if item['sql'].startswith(('INSERT INTO "restaurants_restaurant" ', 'UPDATE "restaurants_restaurant" '))
+        ]
+
+    def test_generated_slug(self):
+        """Новый ресторан без никнейма добавляется одной записью строки"""
+        restaurant, queries = self.__create()
+        self.assertEqual(restaurant.slug, f"id_{restaurant.pk}")
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).slug, f"id_{restaurant.pk}")
+        self.assertTrue(queries[0].startswith('INSERT'))
+        # На SQLite временный никнейм заменяется запросом, изменяющим одно поле
+        for sql in queries[1:]:
+            self.assertRegex(sql, r'^UPDATE "restaurants_restaurant" SET "slug" = \S+ WHERE')
+        self.assertLessEqual(len(queries), 2)
+
+    def test_lowercase(self):
+        """Никнейм ресторана хранится в нижнем регистре"""
+        restaurant, queries = self.__create(slug='New-Cafe')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).slug, 'new-cafe')
+
+    def test_constraint(self):
+        """База данных не допускает никнеймы, отличающиеся только регистром"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Restaurant.objects.filter(pk=self._data['premium_restaurant'].pk).update(slug='Some-Cafe')
+
+    def test_concurrent_create(self):
+        """Если никнейм заняли после проверки, то возвращается ошибка в данных"""
+        with patch.object(RestaurantViewSet, '_RestaurantViewSet__check_slug', return_value=True):
+            with self.logged_in('some_user'):
+                ans = self.client.post(
+                    self.URL,
+                    {
+                        'translations': {'en': {'name': "Another cafe"}},
+                        'slug': 'SOME-CAFE',
+                        'stars': 3,
+                        'country': 'Russia',
+                        'city': 'Moscow',
+                        'street': 'Tverskaya',
+                        'building': '2',
+                        'zip_code': '125009',
+                    },
+                    format='json'
+                )
+        self.assertEqual(ans.status_code, 400)
+        # Ответ такой же, как при занятом никнейме, обнаруженном проверкой
+        self.assertEqual(ans.json(), {'detail': "A restaurant with such slug string already exists"})
+        self.assertEqual(Restaurant.objects.count(), 2)
+
+
+class RestaurantExportTest(BaseTestCase):
+    """
+    Тесты для выгрузки всех меню ресторана в файл
+    """
+
+    def __get_url(self):
+        return f"/api/v1/restaurants/{self._data['cheap_restaurant'].pk}/export/"
+
+    def test_some_user(self):
+        """Посторонний пользователь не может выгрузить меню ресторана"""
+        with self.logged_in('some_user'):
+            ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.status_code, 403)
+
+    def test_cheap_owner(self):
+        """Хозяин ресторана выгружает все меню ресторана, включая неопубликованные"""
+        restaurant = self._data['cheap_restaurant']
+        empty = restaurant.menus.create(title="Empty menu")
+        with self.logged_in('cheap_owner'):
+            ans = self.client.get(self.__get_url())
+        self.assertEqual(ans.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(ans.streaming_content).decode('utf-8').splitlines()]
+        ids = {}
+        for row in rows:
+            ids.setdefault(row['type'], []).append(row['id'])
+        self.assertEqual(
+            sorted(ids['menu']),
+            sorted(restaurant.menus.values_list('pk', flat=True))
+        )
+        self.assertIn(empty.pk, ids['menu'])
+        self.assertEqual(
+            sorted(ids['section']),
+            sorted(MenuSection.objects.filter(menu__restaurant=restaurant).values_list('pk', flat=True))
+        )
+        self.assertEqual(
+            sorted(ids['course']),
+            sorted(MenuCourse.objects.filter(menu__restaurant=restaurant).values_list('pk', flat=True))
+        )
+        inactive = next(
+            row for row in rows if row['type'] == 'menu' and row['id'] == self._data['inactive_menu'].pk
+        )
+        self.assertFalse(inactive['published'])
+        self.assertEqual(inactive['translations']['ru']['title'], "Неактивное меню")
+
+    def test_not_found(self):
+        """Для несуществующего ресторана возвращается ошибка 404"""
+        with self.logged_in('cheap_owner'):
+            ans = self.client.get("/api/v1/restaurants/100500/export/")
+        self.assertEqual(ans.status_code, 404)
@@ -1,12 +1,29 @@
 from django.conf import settings
-from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import gettext_lazy as _
+from django.views import View
 
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.views import APIView
-from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 
+from restaurants.cache import (
+    aget_cached_public_menu,
+    aset_cached_public_menu,
+    get_cached_public_menu,
+    set_cached_public_menu
+)
+from restaurants.compression import choose_encoding
 from restaurants.models import Restaurant
-from restaurants.swagger import swagger_public_menu
+from restaurants.snapshots import (
+    aget_public_menu,
+    get_bundle_key,
+    get_public_menu,
+    get_snapshot_languages
+)
+from restaurants.swagger import swagger_public_menu, swagger_public_menu_by_slug
 
 
 def course_to_json(course, language: str = settings.LANGUAGE_CODE):
@@ -105,27 +122,244 @@ def restaurant_to_json(restaurant, language: str = settings.LANGUAGE_CODE):
     return obj
 
 
+def get_public_menu_language(request):
+    """
+    Получить язык общедоступного меню из параметров GET-запроса. Значение '*'
+    означает набор меню на всех языках, а список языков через запятую - набор
+    меню на этих языках. Для набора возвращается его обозначение (см.
+    `get_bundle_key`). Если в списке есть неизвестный язык, то возбуждает
+    ParseError. Вместо одного неизвестного языка возвращается язык по
+    умолчанию, как и прежде отдавалось меню на нем, поэтому ключи кэша и ETag
+    принимают только значения из настроек.
+    """
+    language = request.GET.get('language', settings.LANGUAGE_CODE)
+    if not isinstance(language, str):
+        language = language[0]
+    if language == '*':
+        return get_bundle_key(get_snapshot_languages())
+    if ',' not in language:
+        return language if language in get_snapshot_languages() else settings.LANGUAGE_CODE
+    languages = []
+    for code in language.split(','):
+        code = code.strip()
+        if not code or code in languages:
+            continue
+        if code not in get_snapshot_languages():
+            raise ParseError(_("Unknown language: {}").format(code))
+        languages.append(code)
+    return get_bundle_key(languages)
+
+
+def get_public_menu_etag(pk, version, language, encoding):
+    """ETag общедоступного меню ресторана pk версии version на языке language"""
+    etag = f"{pk}-{version}-{language}"
+    if encoding is not None:
+        # Сжатые варианты меню - разные представления, и у них разные ETag
+        etag += f"-{encoding}"
+    return quote_etag(etag)
+
+
+def public_menu_response(content, encoding):
+    """Ответ с общедоступным меню content, сжатым способом encoding"""
+    response = HttpResponse(content, content_type='application/json', status=200)
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    return response
+
+
 class UnauthorizedRestaturantView(APIView):
     """
     Просмотр неавторизованным пользователем информации о ресторане. Поддерживает
-    только метод GET, который возвращает информацию о ресторане и меню этого ресторана.
+    метод GET, который возвращает информацию о ресторане и меню этого ресторана,
+    и метод HEAD.
+
+    Ответ содержит заголовки ETag и Last-Modified, вычисляемые по версии
+    общедоступного меню ресторана. Если меню не менялось с момента предыдущего
+    запроса, то на запрос с заголовком If-None-Match или If-Modified-Since
+    возвращается ответ 304 без содержимого. Меню каждой версии хранится в кэше.
+
+    Параметр language=* или список языков через запятую позволяет получить
+    меню сразу на нескольких языках в виде объекта, ключи которого - языки.
+
+    Меню отдается сжатым gzip или brotli, если клиент принимает такое сжатие
+    согласно заголовку Accept-Encoding. Сжатые варианты меню готовятся заранее
+    вместе с самим меню, поэтому при ответе на запрос ничего не сжимается.
     """
 
     permission_classes = [AllowAny]
 
-    def __get_language(self, request):
+    def _get_version(self, pk):
         """
-        Получить язык из параметров GET-запроса
+        Возвращает тройку из первичного ключа ресторана pk, версии его меню и
+        времени последнего изменения меню. Если ресторана нет, то возбуждает Http404.
         """
-        language = request.GET.get('language', settings.LANGUAGE_CODE)
-        if not isinstance(language, str):
-            language = language[0]
-        return language
+        version = Restaurant.objects.filter(pk=pk).values_list(
+            'content_version', 'content_modified'
+        ).first()
+        if version is None:
+            raise Http404
+        content_version, content_modified = version
+        return pk, content_version, int(content_modified.timestamp())
+
+    def __conditional_response(self, request, pk, language, encoding, version, last_modified):
+        """
+        Возвращает ответ на запрос, который можно дать по одной версии меню
+        без его содержимого: ответ 304, если меню не изменилось, либо пустой
+        ответ на запрос HEAD. Иначе возвращает None. Заголовки ETag,
+        Last-Modified и Vary записываются в self.headers.
+        """
+        etag = get_public_menu_etag(pk, version, language, encoding)
+        self.headers.update({
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified),
+            'Vary': 'Accept-Encoding',
+        })
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None and request.method == 'HEAD':
+            response = public_menu_response(b'', encoding)
+        return response
+
+    def _public_menu(self, request, **kwargs):
+        """
+        Возвращает ответ с меню ресторана, найденного методом _get_version по
+        параметрам URL kwargs
+        """
+        language = get_public_menu_language(request)
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        pk, version, last_modified = self._get_version(**kwargs)
+        response = self.__conditional_response(
+            request, pk, language, encoding, version, last_modified
+        )
+        if response is not None:
+            return response
+        content = get_cached_public_menu(pk, language, version, encoding)
+        if content is None:
+            try:
+                content = get_public_menu(pk, language, encoding)
+            except Restaurant.DoesNotExist:
+                raise Http404
+            set_cached_public_menu(pk, language, version, content, encoding)
+        return public_menu_response(content, encoding)
 
     @swagger_public_menu
     def get(self, request, pk: int):
         """Возврат информации о меню ресторана"""
-        language = self.__get_language(request)
-        restaurant = get_object_or_404(Restaurant, pk=pk)
-        data = restaurant_to_json(restaurant, language)
-        return Response(data, status=200)
+        return self._public_menu(request, pk=pk)
+
+    def head(self, request, **kwargs):
+        """Проверка версии меню ресторана без получения самого меню"""
+        language = get_public_menu_language(request)
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        pk, version, last_modified = self._get_version(**kwargs)
+        return self.__conditional_response(
+            request, pk, language, encoding, version, last_modified
+        )
+
+
+class UnauthorizedRestaurantBySlugView(UnauthorizedRestaturantView):
+    """
+    Просмотр неавторизованным пользователем информации о ресторане по никнейму
+    ресторана, который закодирован в QR коде ресторана. Никнейм может быть указан
+    в любом регистре. Ресторан ищется по никнейму тем же запросом, которым
+    читается версия меню.
+    """
+
+    def _get_version(self, slug):
+        """
+        Возвращает тройку из первичного ключа ресторана с никнеймом slug, версии
+        его меню и времени последнего изменения меню. Если ресторана нет, то
+        возбуждает Http404.
+        """
+        version = Restaurant.objects.filter(slug=slug.lower()).values_list(
+            'pk', 'content_version', 'content_modified'
+        ).first()
+        if version is None:
+            raise Http404
+        pk, content_version, content_modified = version
+        return pk, content_version, int(content_modified.timestamp())
+
+    @swagger_public_menu_by_slug
+    def get(self, request, slug: str):
+        """Возврат информации о меню ресторана"""
+        return self._public_menu(request, slug=slug)
+
+
+class AsyncUnauthorizedRestaurantView(View):
+    """
+    Асинхронный вариант UnauthorizedRestaturantView для работы под ASGI.
+    Версия меню, подготовленные меню и кэш читаются асинхронными методами ORM
+    и кэша, поэтому один процесс сервера обслуживает одновременно множество
+    медленных соединений, не занимая поток на каждое из них.
+
+    Представление не использует Django REST Framework, потому что его
+    представления синхронные. Ответы совпадают с ответами синхронного
+    представления, в том числе ошибки 400 и 404 возвращаются в JSON.
+    """
+
+    async def _get_version(self, pk):
+        """Асинхронный вариант `UnauthorizedRestaturantView._get_version`"""
+        version = await Restaurant.objects.filter(pk=pk).values_list(
+            'content_version', 'content_modified'
+        ).afirst()
+        if version is None:
+            raise Http404
+        content_version, content_modified = version
+        return pk, content_version, int(content_modified.timestamp())
+
+    async def _public_menu(self, request, **kwargs):
+        """
+        Возвращает ответ с меню ресторана, найденного методом _get_version по
+        параметрам URL kwargs, или пустой ответ на запрос HEAD
+        """
+        try:
+            language = get_public_menu_language(request)
+        except ParseError as error:
+            return JsonResponse({'detail': error.detail}, status=400)
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        try:
+            pk, version, last_modified = await self._get_version(**kwargs)
+        except Http404:
+            return JsonResponse({'detail': NotFound.default_detail}, status=404)
+        etag = get_public_menu_etag(pk, version, language, encoding)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            content = b''
+            if request.method != 'HEAD':
+                content = await aget_cached_public_menu(pk, language, version, encoding)
+                if content is None:
+                    try:
+                        content = await aget_public_menu(pk, language, encoding)
+                    except Restaurant.DoesNotExist:
+                        return JsonResponse({'detail': NotFound.default_detail}, status=404)
+                    await aset_cached_public_menu(pk, language, version, content, encoding)
+            response = public_menu_response(content, encoding)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    async def get(self, request, pk: int):
+        """Возврат информации о меню ресторана"""
+        return await self._public_menu(request, pk=pk)
+
+    async def head(self, request, **kwargs):
+        """Проверка версии меню ресторана без получения самого меню"""
+        return await self._public_menu(request, **kwargs)
+
+
+class AsyncUnauthorizedRestaurantBySlugView(AsyncUnauthorizedRestaurantView):
+    """Асинхронный вариант UnauthorizedRestaurantBySlugView"""
+
+    async def _get_version(self, slug):
+        """Асинхронный вариант `UnauthorizedRestaurantBySlugView._get_version`"""
+        version = await Restaurant.objects.filter(slug=slug.lower()).values_list(
+            'pk', 'content_version', 'content_modified'
+        ).afirst()
+        if version is None:
+            raise Http404
+        pk, content_version, content_modified = version
+        return pk, content_version, int(content_modified.timestamp())
+
+    async def get(self, request, slug: str):
+        """Возврат информации о меню ресторана"""
+        return await self._public_menu(request, slug=slug)
@@ -3,6 +3,7 @@
 должностями пользователей ресторанов.
 """
 
+from django.db import IntegrityError, transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
@@ -11,9 +12,18 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from menu_backend.sparse_fields import SparseFieldsViewSetMixin
+from menu_backend.transactions import AtomicWriteViewSetMixin
+
+from menus.exporting import export_response
+from menus.importing import JSON_LINES, check_data_format
+from menus.models import Menu
+from menus.permissions import MenuExportPermission
+
 from restaurants.models import (
     Restaurant,
     RestaurantStaff,
@@ -24,15 +34,28 @@ from restaurants.permissions import (
     RestaurantStaffPermission,
     RestaurantCategoryPermission
 )
+from restaurants.prefetch import prefetch_restaurants
+from restaurants.roles import get_restaurant_roles
 from restaurants.serializers import (
     RestaurantSerializer,
     RestaurantStaffSerializer,
     RestaurantCategorySerializer
 )
-from restaurants.swagger import swagger_qrcode, swagger_restaurant_by_slug
+from restaurants.swagger import (
+    swagger_qrcode,
+    swagger_restaurant_by_slug,
+    swagger_restaurant_export
+)
+
 
+class SlugTaken(APIException):
+    """Никнейм ресторана уже принадлежит другому ресторану"""
+    status_code = 400
+    default_detail = _("A restaurant with such slug string already exists")
+    default_code = 'slug_taken'
 
-class RestaurantCategoryViewSet(viewsets.ModelViewSet):
+
+class RestaurantCategoryViewSet(AtomicWriteViewSetMixin, viewsets.ModelViewSet):
     """
     Набор API-обработчиков для управления категориями ресторанов.
 
@@ -50,7 +73,7 @@ class RestaurantCategoryViewSet(viewsets.ModelViewSet):
         return RestaurantCategory.objects.all()
 
 
-class RestaurantViewSet(viewsets.ModelViewSet):
+class RestaurantViewSet(AtomicWriteViewSetMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     Набор API-обработчиков для управления ресторанами
     """
@@ -61,6 +84,22 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['category']
     http_method_names = ['get', 'head', 'options', 'post', 'put', 'patch', 'delete']
+    # Действия над всеми меню ресторана, которые загружают меню сами
+    whole_restaurant_actions = ('export',)
+
+    def get_queryset(self):
+        """
+        Список ресторанов вместе с предварительно загруженными категориями и
+        текущими меню, если они будут выведены, чтобы страница ресторанов
+        выводилась фиксированным числом запросов
+        """
+        if self.action in self.whole_restaurant_actions:
+            return Restaurant.objects.all()
+        return prefetch_restaurants(
+            Restaurant.objects.all(),
+            category=self.is_field_requested('category_data'),
+            menu=self.is_field_requested('current_menu')
+        )
 
     def __check_slug(self, slug, instance=None):
         """
@@ -79,32 +118,50 @@ class RestaurantViewSet(viewsets.ModelViewSet):
             return False
         if instance and slug.lower() == instance.slug.lower():
             return True
-        if Restaurant.objects.filter(slug__iexact=slug).exists():
+        # Никнеймы хранятся в нижнем регистре, поэтому поиск без учета
+        # регистра - поиск по индексу на равенство
+        if Restaurant.objects.filter(slug=slug.lower()).exists():
             return False
         return True
 
+    def __save(self, serializer):
+        """
+        Сохраняет ресторан. Если такой никнейм успел занять другой ресторан
+        после проверки, то ошибку возвращает уникальный индекс базы данных.
+        """
+        try:
+            with transaction.atomic():
+                return serializer.save()
+        except IntegrityError:
+            slug = serializer.validated_data.get('slug')
+            if slug and Restaurant.objects.filter(slug=slug.lower()).exists():
+                raise SlugTaken()
+            raise
+
+    def perform_create(self, serializer):
+        """
+        Сделать пользователя, добавившего ресторан, владельцем этого ресторана
+        """
+        restaurant = self.__save(serializer)
+        user = self.request.user
+        if user.is_authenticated and user.is_active:
+            RestaurantStaff.objects.create(restaurant=restaurant, position='owner', user=user)
+
+    def perform_update(self, serializer):
+        self.__save(serializer)
+
     def create(self, request):
         """
-        При создании нового ресторана сделать пользователя, добавившего
-        ресторан, в список владельцев этого ресторана
+        При создании нового ресторана проверяем, что его никнейм не используется
+        другим рестораном. Пользователь, добавивший ресторан, становится его
+        владельцем (см. perform_create).
         """
         # Проверяем, что если никнейм ресторана задан, то он еще не принадлежит
         # другому ресторану
         slug = request.data.get('slug', None)
         if not self.__check_slug(slug):
-            return Response(
-                {'detail': _("A restaurant with such slug string already exists")},
-                status=400
-            )
-        response = super().create(request)
-        if response.status_code == 201:
-            # Находим созданный ресторан по возвращаемому значению ключа
-            restaurant = Restaurant.objects.get(pk=response.data['id'])
-            # И добавляем пользователя-создателя в список владельцев
-            user = request.user
-            if user.is_authenticated and user.is_active:
-                restaurant.restaurant_staff.create(position='owner', user=user)
-        return response
+            raise SlugTaken()
+        return super().create(request)
 
     def update(self, request, pk: int, **kwargs):
         """
@@ -116,10 +173,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
         # другому ресторану
         slug = request.data.get('slug', None)
         if not self.__check_slug(slug, instance=restaurant):
-            return Response(
-                {'detail': _("A restaurant with such slug string already exists")},
-                status=400
-            )
+            raise SlugTaken()
         return super().update(request, pk=pk, **kwargs)
 
     def partial_update(self, request, pk: int, **kwargs):
@@ -132,10 +186,7 @@ class RestaurantViewSet(viewsets.ModelViewSet):
         # другому ресторану
         slug = request.data.get('slug', None)
         if not self.__check_slug(slug, instance=restaurant):
-            return Response(
-                {'detail': _("A restaurant with such slug string already exists")},
-                status=400
-            )
+            raise SlugTaken()
         return super().partial_update(request, pk=pk, **kwargs)
 
     @swagger_qrcode
@@ -164,8 +215,26 @@ class RestaurantViewSet(viewsets.ModelViewSet):
         Получить информацию о ресторане по его никнейму, который может быть
         указан в любом регистре.
         """
-        restaurant = get_object_or_404(Restaurant, slug=slug.lower())
-        return Response(RestaurantSerializer(restaurant).data)
+        restaurant = get_object_or_404(self.get_queryset(), slug=slug.lower())
+        return Response(self.get_serializer(restaurant).data)
+
+    @swagger_restaurant_export
+    @action(detail=True,
+            methods=['get'],
+            url_path='export',
+            permission_classes=[MenuExportPermission])
+    def export(self, request, pk: int):
+        """
+        Выгрузить все меню ресторана (в том числе без блюд) с разделами,
+        блюдами и всеми переводами в файл JSON Lines (по умолчанию) или CSV
+        (см. `menus.exporting`). Каждая строка файла - запись меню, раздела или
+        блюда.
+        """
+        restaurant = self.get_object()
+        data_format = check_data_format(request.query_params.get('data_format') or JSON_LINES)
+        return export_response(
+            Menu.objects.filter(restaurant=restaurant), data_format, f"restaurant_{restaurant.pk}"
+        )
 
 
 class RestaurantStaffViewSet(viewsets.ModelViewSet):
@@ -189,7 +258,5 @@ class RestaurantStaffViewSet(viewsets.ModelViewSet):
             return RestaurantStaff.objects.filter(id__in=set())
         if self.request.user.is_staff:
             return RestaurantStaff.objects.all()
-        restaurant_ids = set(
-            self.request.user.restaurant_staff.values_list('restaurant_id', flat=True)
-        )
+        restaurant_ids = get_restaurant_roles(self.request).restaurant_ids()
         return RestaurantStaff.objects.filter(restaurant__id__in=restaurant_ids)
@@ -14,6 +14,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from restaurants.models import Restaurant
+from restaurants.prefetch import prefetch_restaurants
+from restaurants.roles import OWNER, get_restaurant_roles
 from restaurants.serializers import RestaurantSerializer
 
 from users.models import User
@@ -119,13 +121,8 @@ class MyRestaurantsView(APIView):
     @swagger_user_restaurants
     def get(self, request):
         """Получение пользователем списка своих ресторанов"""
-        user = self.request.user
-        restaurant_ids = set(
-            user.restaurant_staff.filter(position='owner').values_list(
-                'restaurant_id', flat=True
-            )
-        )
-        restaurants = Restaurant.objects.filter(id__in=restaurant_ids).all()
+        restaurant_ids = get_restaurant_roles(request).restaurant_ids(OWNER)
+        restaurants = prefetch_restaurants(Restaurant.objects.filter(id__in=restaurant_ids))
         results = [RestaurantSerializer(item).data for item in restaurants]
         return Response(
             {
@@ -146,13 +143,8 @@ class MyProblemsView(APIView):
     @swagger_user_problems
     def get(self, request):
         """Получение пользователем списка проблем в данных своих ресторанов"""
-        user = self.request.user
-        restaurant_ids = set(
-            user.restaurant_staff.filter(position='owner').values_list(
-                'restaurant_id', flat=True
-            )
-        )
-        restaurants = Restaurant.objects.filter(id__in=restaurant_ids).all()
+        restaurant_ids = get_restaurant_roles(request).restaurant_ids(OWNER)
+        restaurants = prefetch_restaurants(Restaurant.objects.filter(id__in=restaurant_ids))
         problems = []
         for restaurant in restaurants:
             problems += restaurant.get_problems()